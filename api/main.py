@@ -1,22 +1,41 @@
+import asyncio
+import functools
+import json
 import os
 import shutil
 import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
 import numpy as np
 import faiss
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import Depends, FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from app.pdf_loader import load_pdf
-from app.text_splitter import split_text
-from app.embeddings import EmbeddingGenerator
-from app.retriever import FAISSRetriever
-from app.rag_pipeline import RAGPipeline
-from app.llm_providers import get_llm_provider
+from app.pdf_loader import document_id
+from app.models import model_registry
+from app.rag_pipeline import RAGPipeline, is_partial
+from app.llm_providers import DEFAULT_MODELS, provider_registry
+from app.llm_providers.registry import key_fingerprint
+from app.collection_manager import DEFAULT_COLLECTION, Collection, CollectionManager
+from app.jobs import IngestJobQueue
+from app.limits import Overloaded, RequestLimiter
+from app.metrics import HTTP_REQUEST_SECONDS, REGISTRY
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models and the index load in the background; the server answers
+    # /health at once and the other routes once warm-up is done
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
 
 # ✅ CREATE APP ONCE
-app = FastAPI(title="PDF RAG QA Bot")
+app = FastAPI(title="PDF RAG QA Bot", lifespan=lifespan)
 
 # ✅ ADD CORS ON THIS APP
 app.add_middleware(
@@ -28,60 +47,595 @@ app.add_middleware(
 )
 
 PDF_DIR = "data/raw_pdfs"
+EMBEDDING_CACHE_DIR = "vector_store/embedding_cache"
 os.makedirs(PDF_DIR, exist_ok=True)
 
-# Load components ONCE
-retriever = FAISSRetriever(embedding_dim=384)
-embedder = EmbeddingGenerator()
-rag = RAGPipeline(retriever=retriever, provider="huggingface")
+# "int8" or "onnx" are faster on CPU-only nodes; check parity with scripts/embedding_backends.py
+EMBEDDING_BACKEND = "torch"
+# Load the default LLM during warm-up (False: on the first question that needs it)
+WARM_UP_LLM = True
+# Loaded collection indexes beyond this are unloaded, least recently used first
+MAX_RESIDENT_INDEX_BYTES = 2 * 1024**3
+
+# Components are built ONCE, by warm_up() (see lifespan above)
+collection_manager = None
+default_collection = None
+embedder = None
+ingest_jobs = None
+rag = None
+warmup = {"status": "starting", "ready": False, "components": {}, "error": None}
+
+def warm_up():
+    global collection_manager, default_collection, embedder, ingest_jobs, rag
+    start_time = time.perf_counter()
+
+    def loaded(component: str, since: float):
+        warmup["components"][component] = {"status": "ready", "seconds": round(time.perf_counter() - since, 3)}
+
+    try:
+        step = time.perf_counter()
+        # Each collection has its own index, chunk store and answer cache; every
+        # upload adds one small segment, merged in the background. Repeated and
+        # reworded questions reuse earlier answers until the documents change.
+        collection_manager = CollectionManager(
+            embedding_dim=384,
+            max_resident_bytes=MAX_RESIDENT_INDEX_BYTES,
+            answer_cache_options={"max_entries": 1024, "ttl_seconds": 3600, "similarity_threshold": 0.95}
+        )
+        # The default collection stays loaded (never released)
+        default_collection = collection_manager.acquire(DEFAULT_COLLECTION)
+        loaded("index", step)
+
+        step = time.perf_counter()
+        # One embedding model per process, shared by ingestion, retrieval and the answer cache;
+        # only chunks go through the embedding cache, questions use the model directly
+        embedder = model_registry.embedder(cache_dir=EMBEDDING_CACHE_DIR, backend=EMBEDDING_BACKEND)
+        query_embedder = embedder.uncached()
+        query_embedder.embed_texts(["warm-up"])  # first forward pass allocates
+        loaded("embedder", step)
+
+        # Uploads are indexed by a background worker pool; several uploads share embedding batches
+        ingest_jobs = IngestJobQueue(embedder, default_collection.retriever, extract_workers=2, embed_batch_size=256)
+        # Concurrent questions (for any collection) are embedded together, max 32 per
+        # batch, 5 ms wait; chunks are ranked by BM25 + cosine so exact part/clause
+        # numbers are found
+        rag = RAGPipeline(
+            retriever=default_collection.retriever,
+            provider="huggingface",
+            query_batching=True,
+            max_batch_size=32,
+            max_wait_ms=5.0,
+            answer_cache=default_collection.answer_cache,
+            hybrid=True,
+            embedder=query_embedder
+        )
+        register_component_metrics()
+
+        # Ready to serve: a question that needs the LLM before it is loaded waits for it
+        warmup.update(status="ready", ready=True)
+        print(f"Ready in {time.perf_counter() - start_time:.1f}s")
+    except Exception as e:
+        warmup.update(status="failed", error=str(e))
+        print(f"Warm-up failed: {e}")
+        return
+
+    if WARM_UP_LLM:
+        step = time.perf_counter()
+        warmup["components"]["llm"] = {"status": "loading"}
+        try:
+            provider_registry.get(provider=rag.provider, api_key=rag.api_key, model=rag.model)
+            loaded("llm", step)
+        except Exception as e:
+            warmup["components"]["llm"] = {"status": "failed", "error": str(e)}
+            print(f"LLM warm-up failed: {e}")
+
+def require_ready():
+    if not warmup["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service not ready ({warmup['status']}), see /health/ready",
+            headers={"Retry-After": "5"}
+        )
+
+# CPU-heavy stages run on small dedicated pools (retrieval on the batcher's
+# thread) so the event loop stays free however many requests are in flight
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm")
+INGEST_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+# Loading a cold collection (or saving an evicted one) reads and writes index files
+INDEX_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="index")
+# Drives /ask/batch generators; their LLM calls run in the pipeline's own pool
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="batch")
+
+# Requests beyond active + waiting get an immediate 429
+ask_limiter = RequestLimiter(max_active=16, max_waiting=256)
+upload_limiter = RequestLimiter(max_active=2, max_waiting=8)
+batch_limiter = RequestLimiter(max_active=2, max_waiting=4)
+
+async def run_in(executor: ThreadPoolExecutor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+def register_component_metrics():
+    # Gauges read at scrape time, so nothing is updated on the request path;
+    # per-collection values cover the collections currently loaded
+    def per_collection(value) -> dict:
+        return {(c.name,): value(c) for c in collection_manager.resident()}
+
+    REGISTRY.gauge("rag_index_chunks", "Live chunks in the index", ("collection",)).set_function(
+        lambda: per_collection(lambda c: len(c.retriever)))
+    REGISTRY.gauge("rag_index_segments", "Saved index segments", ("collection",)).set_function(
+        lambda: per_collection(lambda c: len(c.retriever.segments)))
+    REGISTRY.gauge("rag_index_memory_bytes", "Approximate RAM of the loaded index", ("collection",)).set_function(
+        lambda: per_collection(lambda c: c.retriever.memory_bytes()))
+    REGISTRY.gauge("rag_documents", "Indexed documents", ("collection",)).set_function(
+        lambda: per_collection(lambda c: len(c.retriever.list_documents())))
+    REGISTRY.gauge("rag_answer_cache_entries", "Answers in the cache", ("collection",)).set_function(
+        lambda: per_collection(lambda c: len(c.answer_cache)))
+    REGISTRY.counter(
+        "rag_answer_cache_lookups_total", "Answer cache lookups by result", ("collection", "result")
+    ).set_function(lambda: {
+        (c.name, result): count for c in collection_manager.resident() for result, count in c.answer_cache.hits.items()
+    })
+
+REGISTRY.gauge(
+    "rag_limiter_active", "Requests holding a limiter slot", ("limiter",)
+).set_function(lambda: {
+    ("ask",): ask_limiter.active, ("upload",): upload_limiter.active, ("batch",): batch_limiter.active
+})
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Route templates (/jobs/{job_id}) keep the label set small
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    )
+    return response
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 class QuestionRequest(BaseModel):
     question: str
+    collection: str = DEFAULT_COLLECTION
     provider: str = "huggingface"
     api_key: str | None = None
     model: str | None = None
 
+class BatchQuestionRequest(BaseModel):
+    questions: list[str]
+    collection: str = DEFAULT_COLLECTION
+    provider: str = "huggingface"
+    api_key: str | None = None
+    model: str | None = None
+    top_k: int = 3
+    use_cache: bool = True
+
 class AnswerResponse(BaseModel):
     answer: str
+    # Some index shards did not answer; the answer is not cached
+    partial: bool = False
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the PDF RAG QA Bot API"}
 
 @app.get("/health")
-def health_check():
-    return {"status": "ok"}
+async def health_check():
+    """
+    Liveness: the process is up (models may still be loading).
+    """
+    return {"status": "ok", "ready": warmup["ready"]}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness: 200 once the index and embedding model are loaded, 503 before.
+    """
+    content = {
+        "status": warmup["status"],
+        "components": warmup["components"],
+        "error": warmup["error"],
+    }
+    return JSONResponse(status_code=200 if warmup["ready"] else 503, content=content)
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text format: per-stage query latency, cache hits,
+    index size, ingest throughput and LLM tokens.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
-@app.post("/ask", response_model=AnswerResponse)
-def ask_question(request: QuestionRequest):
+def acquire_collection(name: str, create: bool = False) -> Collection:
     try:
-        llm = get_llm_provider(
-            provider=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
-        rag.llm = llm
-        answer = rag.answer_question(request.question)
-        return {"answer": answer}
-    except Exception as e:
+        return collection_manager.acquire(name, create=create)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
-@app.post("/upload-pdf")
-def upload_pdf(file: UploadFile = File(...)):
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {name}")
+
+@contextmanager
+def collection_in_use(name: str, create: bool = False):
+    """
+    Pin a collection for a blocking handler (it is not evicted meanwhile).
+    """
+    collection = acquire_collection(name, create)
+    try:
+        yield collection
+    finally:
+        collection_manager.release(collection)
+
+@asynccontextmanager
+async def use_collection(name: str):
+    """
+    Async version of collection_in_use(); loading and eviction run off the event loop.
+    """
+    collection = await run_in(INDEX_EXECUTOR, acquire_collection, name)
+    try:
+        yield collection
+    finally:
+        await run_in(INDEX_EXECUTOR, collection_manager.release, collection)
+
+@app.get("/collections", dependencies=[Depends(require_ready)])
+def list_collections():
+    return {
+        "collections": collection_manager.list_collections(),
+        "resident_bytes": collection_manager.resident_bytes(),
+        "max_resident_bytes": collection_manager.max_resident_bytes,
+    }
+
+def cache_namespace(request: QuestionRequest | BatchQuestionRequest) -> tuple:
+    # Answers are only shared between requests that use the same LLM
+    provider = request.provider.lower()
+    return (provider, request.model or DEFAULT_MODELS.get(provider), key_fingerprint(request.api_key))
+
+@app.post("/ask", response_model=AnswerResponse, dependencies=[Depends(require_ready)])
+async def ask_question(request: QuestionRequest):
+    async with use_collection(request.collection) as collection:
+        # Exact repeats are answered before anything is embedded (or queued)
+        answer_cache = collection.answer_cache
+        namespace = cache_namespace(request)
+        generation = answer_cache.generation
+        answer = answer_cache.get(request.question, namespace)
+        if answer is not None:
+            return {"answer": answer}
+
+        async with ask_limiter:
+            try:
+                # Providers are cached and passed per request; the shared pipeline is never mutated
+                llm = await run_in(
+                    LLM_EXECUTOR,
+                    provider_registry.get,
+                    provider=request.provider,
+                    api_key=request.api_key,
+                    model=request.model
+                )
+                results, query_embedding = await asyncio.wrap_future(
+                    rag.batcher.submit(request.question, retriever=collection.retriever)
+                )
+
+                answer = answer_cache.get(request.question, namespace, query_embedding)
+                if answer is None:
+                    answer = await run_in(LLM_EXECUTOR, rag.generate_answer, request.question, results, llm=llm)
+                    if is_partial(results):
+                        return {"answer": answer, "partial": True}
+                    answer_cache.put(request.question, answer, namespace, query_embedding, generation)
+                return {"answer": answer}
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class StreamHold:
+    """
+    Collection pin and limiter slot held for a streaming response, released exactly once.
+    """
+    def __init__(self, collection: Collection):
+        self.collection = collection
+        self.limiter = None
+        self._released = False
+
+    async def admit(self, limiter: RequestLimiter):
+        await limiter.__aenter__()
+        self.limiter = limiter
+
+    async def release(self):
+        if self._released:
+            return
+        self._released = True
+        if self.limiter is not None:
+            await self.limiter.__aexit__(None, None, None)
+        await run_in(INDEX_EXECUTOR, collection_manager.release, self.collection)
+
+class HeldStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that releases its StreamHold however the response ends,
+    including a client that disconnects before the body is iterated.
+    """
+    def __init__(self, content, hold: StreamHold, **kwargs):
+        super().__init__(content, **kwargs)
+        self.hold = hold
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.hold.release()
+
+@app.post("/ask/stream", dependencies=[Depends(require_ready)])
+async def ask_question_stream(request: QuestionRequest):
+    """
+    Server-Sent Events: one "retrieval" event with the matched chunks,
+    then "token" events as the answer is generated, then "done"
+    (or "error" if generation fails part way).
+    A cached answer is sent as a single token with "cached": true.
+    """
+    # The collection stays pinned until the stream ends
+    hold = StreamHold(await run_in(INDEX_EXECUTOR, acquire_collection, request.collection))
+    try:
+        answer_cache = hold.collection.answer_cache
+        namespace = cache_namespace(request)
+        generation = answer_cache.generation
+        cached = answer_cache.get(request.question, namespace)
+        if cached is not None:
+            async def cached_events():
+                yield sse_event("retrieval", {"results": [], "cached": True})
+                yield sse_event("token", {"text": cached})
+                yield sse_event("done", {})
+            return HeldStreamingResponse(cached_events(), hold, media_type="text/event-stream")
+
+        # Admission happens before the response starts, so overload is still a 429
+        await hold.admit(ask_limiter)
+        try:
+            llm = await run_in(
+                LLM_EXECUTOR,
+                provider_registry.get,
+                provider=request.provider,
+                api_key=request.api_key,
+                model=request.model
+            )
+            results, query_embedding = await asyncio.wrap_future(
+                rag.batcher.submit(request.question, retriever=hold.collection.retriever)
+            )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        # Includes cancellation when the client goes away before the response starts
+        await hold.release()
+        raise
+
+    async def events():
+        try:
+            cached = answer_cache.get(request.question, namespace, query_embedding)
+            yield sse_event("retrieval", {
+                "results": [{"score": r["score"], "text": r["text"][:200]} for r in results],
+                "cached": cached is not None,
+                "partial": is_partial(results),
+            })
+
+            if cached is not None:
+                yield sse_event("token", {"text": cached})
+            else:
+                tokens = rag.stream_answer(request.question, results, llm=llm)
+                answer = []
+                while True:
+                    # Each next() may block on the model, so it runs off the event loop
+                    token = await run_in(LLM_EXECUTOR, next, tokens, None)
+                    if token is None:
+                        break
+                    answer.append(token)
+                    yield sse_event("token", {"text": token})
+                if not is_partial(results):
+                    answer_cache.put(request.question, "".join(answer), namespace, query_embedding, generation)
+
+            yield sse_event("done", {})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return HeldStreamingResponse(events(), hold, media_type="text/event-stream")
+
+@app.post("/ask/batch", dependencies=[Depends(require_ready)])
+async def ask_question_batch(request: BatchQuestionRequest):
+    """
+    Answer many questions in one request, streamed back as NDJSON: one
+    line per question, in completion order, each carrying its "index" in
+    the request. Questions are embedded and searched in batches and the
+    LLM calls overlap, so this is much faster than one /ask per question.
+    A failed question gets an "error" line; the others still complete.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+
+    # The collection stays pinned until the stream ends
+    hold = StreamHold(await run_in(INDEX_EXECUTOR, acquire_collection, request.collection))
+    try:
+        await hold.admit(batch_limiter)
+        try:
+            llm = await run_in(
+                LLM_EXECUTOR,
+                provider_registry.get,
+                provider=request.provider,
+                api_key=request.api_key,
+                model=request.model
+            )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await hold.release()
+        raise
+
+    answers = rag.answer_batch(
+        request.questions,
+        top_k=request.top_k,
+        llm=llm,
+        retriever=hold.collection.retriever,
+        answer_cache=hold.collection.answer_cache if request.use_cache else None,
+        namespace=cache_namespace(request)
+    )
+
+    async def lines():
+        try:
+            while True:
+                # Each next() may embed a block or wait on the model, so it runs off the event loop
+                record = await run_in(BATCH_EXECUTOR, next, answers, None)
+                if record is None:
+                    break
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return HeldStreamingResponse(lines(), hold, media_type="application/x-ndjson")
+
+def pdf_dir(collection: str) -> str:
+    # Each collection keeps its uploads apart, so equal file names do not clash
+    path = PDF_DIR if collection == DEFAULT_COLLECTION else os.path.join(PDF_DIR, collection)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def save_upload(file: UploadFile, collection: str) -> str:
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-    save_path = os.path.join(PDF_DIR, file.filename)
+    save_path = os.path.join(pdf_dir(collection), file.filename)
     with open(save_path, "wb") as f:
         shutil.copyfileobj(file.file, f)
+    return save_path
+
+def remove_pdf_file(document: dict, collection: str):
+    # Only delete the stored file if it still holds this exact document
+    path = os.path.join(pdf_dir(collection), document["filename"])
+    if os.path.exists(path) and document_id(path) == document["doc_id"]:
+        os.remove(path)
 
-    text = load_pdf(save_path)
-    chunks = split_text(text)
-    if not chunks:
-        raise HTTPException(status_code=400, detail="No text found in PDF")
+def job_response(message: str, job: dict) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        "message": message,
+        "job_id": job["job_id"],
+        "doc_id": job["doc_id"],
+        "collection": job["collection"],
+        "status": job["status"],
+    })
 
-    embeddings = embedder.embed_texts(chunks).numpy()
-    retriever.add_embeddings(embeddings, chunks)
-    retriever.save()
+@app.post("/upload-pdf", dependencies=[Depends(require_ready)])
+async def upload_pdf(file: UploadFile = File(...), collection: str = Query(DEFAULT_COLLECTION)):
+    """
+    Upload into a collection (?collection=name); it is created if needed.
+    """
+    async with upload_limiter:
+        return await run_in(INGEST_EXECUTOR, ingest_upload, file, collection)
 
-    return {"message": "PDF uploaded and indexed successfully", "chunks_added": len(chunks)}
\ No newline at end of file
+def ingest_upload(file: UploadFile, collection_name: str):
+    collection = acquire_collection(collection_name, create=True)
+    job = None
+    try:
+        save_path = save_upload(file, collection_name)
+
+        # Same content = same ID, so a re-upload is not embedded again
+        doc_id = document_id(save_path)
+        if collection.retriever.has_document(doc_id):
+            return {"message": "PDF already indexed", "doc_id": doc_id, "collection": collection_name, "chunks_added": 0}
+
+        # Indexing runs in the background; poll /jobs/{job_id} for progress.
+        # The collection stays pinned until the job ends.
+        job = ingest_jobs.submit(
+            save_path,
+            doc_id,
+            on_done=lambda job: collection_manager.release(collection),
+            retriever=collection.retriever,
+            collection=collection_name
+        )
+    finally:
+        if job is None:
+            collection_manager.release(collection)
+    return job_response("PDF uploaded, indexing started", job)
+
+@app.get("/jobs", dependencies=[Depends(require_ready)])
+def list_jobs():
+    return {"jobs": ingest_jobs.list_jobs()}
+
+@app.get("/jobs/{job_id}", dependencies=[Depends(require_ready)])
+def get_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/documents", dependencies=[Depends(require_ready)])
+def list_documents(collection: str = Query(DEFAULT_COLLECTION)):
+    with collection_in_use(collection) as c:
+        return {"collection": collection, "documents": c.retriever.list_documents()}
+
+@app.delete("/documents/{doc_id}", dependencies=[Depends(require_ready)])
+async def delete_document(doc_id: str, collection: str = Query(DEFAULT_COLLECTION)):
+    async with upload_limiter:
+        return await run_in(INGEST_EXECUTOR, remove_document, doc_id, collection)
+
+def remove_document(doc_id: str, collection_name: str) -> dict:
+    with collection_in_use(collection_name) as collection:
+        retriever = collection.retriever
+        document = retriever.get_document(doc_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        chunks_removed = retriever.delete_document(doc_id)
+        retriever.save()
+        remove_pdf_file(document, collection_name)
+
+    return {"message": "Document deleted", "doc_id": doc_id, "chunks_removed": chunks_removed}
+
+@app.put("/documents/{doc_id}", dependencies=[Depends(require_ready)])
+async def replace_document(doc_id: str, file: UploadFile = File(...), collection: str = Query(DEFAULT_COLLECTION)):
+    async with upload_limiter:
+        return await run_in(INGEST_EXECUTOR, replace_upload, doc_id, file, collection)
+
+def replace_upload(doc_id: str, file: UploadFile, collection_name: str):
+    collection = acquire_collection(collection_name)
+    retriever = collection.retriever
+    job = None
+    try:
+        document = retriever.get_document(doc_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        save_path = save_upload(file, collection_name)
+        new_doc_id = document_id(save_path)
+        if new_doc_id == doc_id:
+            return {"message": "Document unchanged", "doc_id": doc_id, "chunks_added": 0, "chunks_removed": 0}
+
+        def remove_old_file():
+            if document["filename"] != file.filename:
+                remove_pdf_file(document, collection_name)
+
+        if retriever.has_document(new_doc_id):
+            chunks_removed = retriever.delete_document(doc_id)
+            retriever.save()
+            remove_old_file()
+            return {"message": "Document replaced", "doc_id": new_doc_id, "chunks_added": 0, "chunks_removed": chunks_removed}
+
+        def on_done(job: dict):
+            collection_manager.release(collection)
+            if job["status"] == "done":
+                remove_old_file()
+
+        # The job indexes the new version first and deletes the old one in the same save
+        job = ingest_jobs.submit(
+            save_path,
+            new_doc_id,
+            replaces=doc_id,
+            on_done=on_done,
+            retriever=retriever,
+            collection=collection_name
+        )
+    finally:
+        # Once a job is queued, it releases the collection when it ends
+        if job is None:
+            collection_manager.release(collection)
+    return job_response("PDF uploaded, replacement started", job)
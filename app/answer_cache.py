@@ -0,0 +1,179 @@
+"""
+Semantic cache of generated answers.
+
+Most questions are asked again, often with small wording changes. The
+cache keeps recent answers and looks them up two ways:
+
+- exact: the normalized question text, checked before anything is
+  embedded, so a repeated question costs a dict lookup;
+- semantic: the question embedding is matched against a small inner-product
+  index of cached questions, and a hit above `similarity_threshold` reuses
+  that answer without calling the LLM.
+
+Entries expire after `ttl_seconds` and the least recently used ones are
+evicted beyond `max_entries`. Answers depend on the indexed documents, so
+the whole cache is dropped when the retriever's generation changes
+(documents added or deleted, segments compacted or rebuilt). Callers read
+`generation` before they retrieve and pass it to put(), so an answer
+built from the index as it was before a write is never cached after it.
+
+`namespace` separates answers of different LLMs (provider, model, key).
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+from app.retriever import FAISSRetriever
+
+
+def normalize_question(question: str) -> str:
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s?!.]+$", "", question)
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        retriever: FAISSRetriever,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.95
+    ):
+        """
+        Args:
+            retriever (FAISSRetriever): answers are valid for its current generation only
+            max_entries (int): most answers kept (least recently used are evicted)
+            ttl_seconds (float): how long an answer stays valid
+            similarity_threshold (float): minimum cosine similarity for a semantic hit
+        """
+        self.retriever = retriever
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(retriever.embedding_dim))
+        self._entries = OrderedDict()  # entry id -> entry, least recently used first
+        self._exact = {}               # (namespace, normalized question) -> entry id
+        self._next_id = 0
+        self._generation = retriever.generation
+        self.hits = {"exact": 0, "semantic": 0, "miss": 0}
+
+    def get(self, question: str, namespace=None, query_embedding: np.ndarray | None = None) -> str | None:
+        """
+        Cached answer for the question, or None.
+
+        Without `query_embedding` only the exact-match lookup is done.
+        """
+        with self._lock:
+            self._check_generation()
+
+            entry_id = self._exact.get((namespace, normalize_question(question)))
+            if entry_id is not None and self._is_fresh(entry_id):
+                self.hits["exact"] += 1
+                return self._touch(entry_id)
+
+            if query_embedding is not None and self._index.ntotal:
+                query = self._normalized(query_embedding)
+                k = min(8, self._index.ntotal)
+                scores, ids = self._index.search(query, k)
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if score < self.similarity_threshold:
+                        break
+                    entry_id = int(entry_id)
+                    if self._entries[entry_id]["namespace"] == namespace and self._is_fresh(entry_id):
+                        self.hits["semantic"] += 1
+                        return self._touch(entry_id)
+
+            if query_embedding is not None:
+                self.hits["miss"] += 1
+            return None
+
+    @property
+    def generation(self) -> int:
+        """
+        Index generation to pass to put() for answers retrieved from now on.
+        """
+        return self.retriever.generation
+
+    def put(
+        self,
+        question: str,
+        answer: str,
+        namespace=None,
+        query_embedding: np.ndarray | None = None,
+        generation: int | None = None
+    ):
+        """
+        Args:
+            generation (int | None): `generation` read before the answer's chunks were
+                                     retrieved; the answer is dropped if the index changed since
+        """
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return
+
+            key = (namespace, normalize_question(question))
+            if key in self._exact:
+                self._remove(self._exact[key])
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "key": key,
+                "namespace": namespace,
+                "answer": answer,
+                "expires": time.monotonic() + self.ttl_seconds,
+            }
+            self._exact[key] = entry_id
+            if query_embedding is not None:
+                self._index.add_with_ids(
+                    self._normalized(query_embedding), np.array([entry_id], dtype=np.int64)
+                )
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_generation(self):
+        if self.retriever.generation != self._generation:
+            self._clear()
+            self._generation = self.retriever.generation
+
+    def _clear(self):
+        self._index.reset()
+        self._entries.clear()
+        self._exact.clear()
+
+    def _is_fresh(self, entry_id: int) -> bool:
+        if self._entries[entry_id]["expires"] > time.monotonic():
+            return True
+        self._remove(entry_id)
+        return False
+
+    def _touch(self, entry_id: int) -> str:
+        self._entries.move_to_end(entry_id)
+        return self._entries[entry_id]["answer"]
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._exact.pop(entry["key"], None)
+        self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    @staticmethod
+    def _normalized(query_embedding: np.ndarray) -> np.ndarray:
+        query = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        return query
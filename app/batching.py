@@ -0,0 +1,146 @@
+"""
+Cross-request micro-batching for query retrieval.
+
+A single /ask embeds one question and searches with one query vector,
+which leaves the transformer and FAISS mostly idle. The QueryBatcher
+collects questions that arrive within `max_wait_ms` of each other (up to
+`max_batch_size`), embeds them in one forward pass, runs one search over
+the stacked query matrix, and hands each caller its own hits.
+
+A lone request waits at most `max_wait_ms` extra; under load the batch
+fills up before the deadline and throughput goes up instead.
+
+Questions for different collections share the embedding pass; each
+collection's retriever is then searched with its own questions only.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from app.embeddings import EmbeddingGenerator
+from app.metrics import QUERY_BATCH_SIZE, span
+from app.retriever import FAISSRetriever
+
+
+class QueryBatcher:
+    def __init__(
+        self,
+        embedder: EmbeddingGenerator,
+        retriever: FAISSRetriever,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        hybrid: bool = False
+    ):
+        """
+        Args:
+            hybrid (bool): fuse the BM25 keyword ranking with the cosine ranking
+        """
+        self.embedder = embedder
+        self.retriever = retriever
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.hybrid = hybrid
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, question: str, top_k: int = 3, retriever: FAISSRetriever | None = None) -> Future:
+        """
+        Queue a question for the next batch.
+
+        Args:
+            retriever (FAISSRetriever | None): index to search (defaults to the batcher's)
+
+        Returns:
+            Future: resolves to (hits, query_embedding), hits being {"score", "text"} dicts
+        """
+        future = Future()
+        if retriever is None:
+            retriever = self.retriever
+        self._queue.put((question, top_k, retriever, future))
+        return future
+
+    def retrieve(self, question: str, top_k: int = 3, retriever: FAISSRetriever | None = None) -> list[dict]:
+        """
+        Blocking version of submit().
+        """
+        return self.submit(question, top_k, retriever).result()[0]
+
+    def _collect(self) -> list[tuple]:
+        # Block for the first request, then take whatever arrives before the deadline
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _settle(future: Future, result=None, exception: Exception | None = None):
+        # A future can only be settled once; a failure here must never stop the worker
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Callers that gave up (e.g. a disconnected /ask) have cancelled their
+            # futures; the rest are marked running so they can no longer be cancelled
+            batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._process(batch)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        self._settle(future, exception=e)
+
+    def _process(self, batch: list[tuple]):
+        questions = [question for question, _, _, _ in batch]
+
+        # Stage timings are observed once per batch
+        QUERY_BATCH_SIZE.observe(len(batch))
+        try:
+            with span("embed"):
+                query_embeddings = self.embedder.embed_texts(questions).numpy()
+        except Exception as e:
+            for *_, future in batch:
+                self._settle(future, exception=e)
+            return
+
+        groups = {}  # id(retriever) -> positions in the batch
+        for i, (_, _, retriever, _) in enumerate(batch):
+            groups.setdefault(id(retriever), []).append(i)
+
+        for positions in groups.values():
+            retriever = batch[positions[0]][2]
+            top_k = max(batch[i][1] for i in positions)
+            try:
+                with span("search"):
+                    results = retriever.search_batch(
+                        query_embeddings[positions],
+                        top_k=top_k,
+                        query_texts=[questions[i] for i in positions] if self.hybrid else None
+                    )
+            except Exception as e:
+                for i in positions:
+                    self._settle(batch[i][3], exception=e)
+                continue
+
+            for i, hits in zip(positions, results):
+                _, k, _, future = batch[i]
+                self._settle(future, (hits[:k], query_embeddings[i]))
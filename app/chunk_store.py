@@ -0,0 +1,180 @@
+"""
+SQLite-backed store for chunk texts.
+
+A chunk's ID is the ID of its FAISS vector. Texts stay on disk and are
+fetched by ID only when a search returns them, so startup time and resident
+memory do not grow with the corpus. Appends are plain INSERTs; old rows are
+never rewritten. Changes become durable on commit(), which
+FAISSRetriever.save() calls before it writes the new segment.
+
+Chunks also record the document they came from. The documents table maps
+a document ID (SHA-256 of the PDF bytes) to its filename and chunk count,
+so a document can be found, skipped on re-upload, or deleted by ID.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Older SQLite builds allow at most 999 parameters per statement
+MAX_QUERY_IDS = 900
+
+
+class ChunkStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        # One connection shared by the API worker threads, guarded by a lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, text TEXT NOT NULL)")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")]
+        if "doc_id" not in columns:
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN doc_id TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "doc_id TEXT PRIMARY KEY, filename TEXT, num_chunks INTEGER, added_at REAL)"
+        )
+        self._conn.commit()
+
+        self._size = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def import_pickle(self, pkl_path: str):
+        """
+        One-time migration from the old chunks.pkl list.
+        """
+        with open(pkl_path, "rb") as f:
+            chunks = pickle.load(f)
+        self.add(range(len(chunks)), chunks)
+        self.commit()
+        print(f"Migrated {len(chunks)} chunks from {pkl_path} to {self.db_path}")
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx: int) -> str:
+        return self.get_many([idx])[0]
+
+    def get_many(self, ids: list[int]) -> list[str | None]:
+        """
+        Fetch texts by chunk ID, in the order of `ids` (None if unknown).
+        """
+        ids = [int(i) for i in ids]
+        texts = self._select_by_id("text", ids)
+        return [texts.get(i) for i in ids]
+
+    def get_doc_ids(self, ids: list[int]) -> list[str | None]:
+        """
+        Document ID of each chunk, in the order of `ids` (None if unknown or unset).
+        """
+        ids = [int(i) for i in ids]
+        doc_ids = self._select_by_id("doc_id", ids)
+        return [doc_ids.get(i) for i in ids]
+
+    def _select_by_id(self, column: str, ids: list[int]) -> dict:
+        """
+        {id: column value} for the known ids, in statements of at most MAX_QUERY_IDS ids.
+        """
+        values = {}
+        with self._lock:
+            for start in range(0, len(ids), MAX_QUERY_IDS):
+                batch = ids[start:start + MAX_QUERY_IDS]
+                placeholders = ",".join("?" * len(batch))
+                values.update(self._conn.execute(
+                    f"SELECT id, {column} FROM chunks WHERE id IN ({placeholders})", batch
+                ))
+        return values
+
+    def add(self, ids, chunks: list[str], doc_id: str | None = None):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chunks (id, text, doc_id) VALUES (?, ?, ?)",
+                ((int(i), text, doc_id) for i, text in zip(ids, chunks))
+            )
+            self._size += len(chunks)
+
+    def add_document(self, doc_id: str, filename: str, num_chunks: int):
+        """
+        Mark a document as fully indexed.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, filename, num_chunks, added_at) VALUES (?, ?, ?, ?)",
+                (doc_id, filename, num_chunks, time.time())
+            )
+
+    def get_document(self, doc_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_id, filename, num_chunks, added_at FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return self._document_row(row) if row else None
+
+    def list_documents(self, filename: str | None = None) -> list[dict]:
+        query = "SELECT doc_id, filename, num_chunks, added_at FROM documents"
+        args = ()
+        if filename is not None:
+            query += " WHERE filename = ?"
+            args = (filename,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY added_at", args).fetchall()
+        return [self._document_row(row) for row in rows]
+
+    @staticmethod
+    def _document_row(row) -> dict:
+        doc_id, filename, num_chunks, added_at = row
+        return {"doc_id": doc_id, "filename": filename, "num_chunks": num_chunks, "added_at": added_at}
+
+    def delete_all_documents(self):
+        """
+        Forget every registered document (the chunks are kept until delete_range()).
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+
+    def drop_orphan_documents(self):
+        """
+        Remove documents that no longer have any chunks (e.g. after a reset).
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE num_chunks > 0 AND doc_id NOT IN "
+                "(SELECT DISTINCT doc_id FROM chunks WHERE doc_id IS NOT NULL)"
+            )
+
+    def delete_document(self, doc_id: str) -> list[int]:
+        """
+        Remove a document and its chunks. Returns the removed chunk IDs.
+        """
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM chunks WHERE doc_id = ?", (doc_id,))]
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._size -= len(ids)
+        return ids
+
+    def delete_range(self, start_id: int, end_id: int | None = None):
+        """
+        Drop every chunk with start_id <= ID < end_id (no upper bound if None).
+        """
+        with self._lock:
+            if end_id is None:
+                cursor = self._conn.execute("DELETE FROM chunks WHERE id >= ?", (start_id,))
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM chunks WHERE id >= ? AND id < ?", (start_id, end_id)
+                )
+            self._size -= cursor.rowcount
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
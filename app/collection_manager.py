@@ -0,0 +1,209 @@
+"""
+Named collections, each with its own index and chunk store.
+
+    vector_store/                      the "default" collection (existing data)
+    vector_store/collections/<name>/   every other collection
+
+Only recently used collections stay loaded. When the loaded indexes
+together take more than `max_resident_bytes`, the least recently used
+ones are saved and closed, and are loaded again from disk on their next
+use. A collection is pinned while a request or an ingest job is using
+it (acquire/release) and is never evicted while pinned, so only one
+FAISSRetriever ever writes to a collection's files.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from app.answer_cache import AnswerCache
+from app.retriever import FAISSRetriever
+
+DEFAULT_COLLECTION = "default"
+COLLECTION_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Collection:
+    def __init__(self, name: str, retriever: FAISSRetriever, answer_cache: AnswerCache | None = None):
+        self.name = name
+        self.retriever = retriever
+        self.answer_cache = answer_cache
+        self.pins = 0
+
+
+class CollectionManager:
+    def __init__(
+        self,
+        base_dir: str = "vector_store",
+        embedding_dim: int = 384,
+        max_resident_bytes: int = 2 * 1024**3,
+        background_compaction: bool = True,
+        answer_cache_options: dict | None = None
+    ):
+        """
+        Args:
+            base_dir (str): store of the default collection; others live in base_dir/collections
+            max_resident_bytes (int): memory budget for loaded indexes
+            background_compaction (bool): merge each loaded collection's segments in the background
+            answer_cache_options (dict | None): AnswerCache arguments; None disables answer caching
+        """
+        self.base_dir = base_dir
+        self.collections_dir = os.path.join(base_dir, "collections")
+        self.embedding_dim = embedding_dim
+        self.max_resident_bytes = max_resident_bytes
+        self.background_compaction = background_compaction
+        self.answer_cache_options = answer_cache_options
+
+        self._resident = OrderedDict()  # name -> Collection, least recently used first
+        self._lock = threading.Lock()
+        self._loading = {}              # name -> lock, so one collection is never loaded twice
+        self._closing = {}              # name -> event set once an evicted instance is closed
+
+    # ---------- API ----------
+
+    def acquire(self, name: str, create: bool = False) -> Collection:
+        """
+        Load (or reuse) a collection and pin it until release().
+
+        Args:
+            create (bool): create the collection if it does not exist
+
+        Raises:
+            ValueError: invalid name
+            KeyError: unknown collection and create is False
+        """
+        if not COLLECTION_NAME_RE.match(name):
+            raise ValueError("Collection names use letters, digits, '-' and '_' (at most 64)")
+
+        collection = self._pin(name)
+        if collection is not None:
+            return collection
+
+        with self._lock:
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        with load_lock:
+            try:
+                # Another request may have loaded it while we waited
+                collection = self._pin(name)
+                if collection is not None:
+                    return collection
+                if not create and not self.exists(name):
+                    raise KeyError(name)
+
+                with self._lock:
+                    closing = self._closing.get(name)
+                if closing is not None:
+                    # An evicted instance is still saving; load after it is done
+                    closing.wait()
+
+                collection = self._load(name)
+                with self._lock:
+                    collection.pins += 1
+                    self._resident[name] = collection
+                    evicted = self._evict()
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+
+        self._close(evicted)
+        return collection
+
+    def release(self, collection: Collection):
+        with self._lock:
+            collection.pins -= 1
+            evicted = self._evict()
+        self._close(evicted)
+
+    def exists(self, name: str) -> bool:
+        if name == DEFAULT_COLLECTION:
+            return True
+        return os.path.isdir(self.store_dir(name))
+
+    def store_dir(self, name: str) -> str:
+        if name == DEFAULT_COLLECTION:
+            return self.base_dir
+        return os.path.join(self.collections_dir, name)
+
+    def list_collections(self) -> list[dict]:
+        names = {DEFAULT_COLLECTION}
+        if os.path.isdir(self.collections_dir):
+            names.update(n for n in os.listdir(self.collections_dir) if COLLECTION_NAME_RE.match(n))
+
+        with self._lock:
+            resident = dict(self._resident)
+
+        collections = []
+        for name in sorted(names):
+            collection = resident.get(name)
+            collections.append({
+                "name": name,
+                "resident": collection is not None,
+                "chunks": len(collection.retriever) if collection else None,
+                "memory_bytes": collection.retriever.memory_bytes() if collection else None,
+            })
+        return collections
+
+    def resident(self) -> list[Collection]:
+        with self._lock:
+            return list(self._resident.values())
+
+    def resident_bytes(self) -> int:
+        return sum(c.retriever.memory_bytes() for c in self.resident())
+
+    # ---------- internals ----------
+
+    def _pin(self, name: str) -> Collection | None:
+        with self._lock:
+            collection = self._resident.get(name)
+            if collection is not None:
+                collection.pins += 1
+                self._resident.move_to_end(name)
+            return collection
+
+    def _load(self, name: str) -> Collection:
+        retriever = FAISSRetriever(self.embedding_dim, store_dir=self.store_dir(name))
+        if self.background_compaction:
+            retriever.start_background_compaction()
+
+        answer_cache = None
+        if self.answer_cache_options is not None:
+            answer_cache = AnswerCache(retriever, **self.answer_cache_options)
+
+        print(f"Loaded collection {name} ({len(retriever)} chunks, {retriever.memory_bytes() / 1e6:.1f} MB)")
+        return Collection(name, retriever, answer_cache)
+
+    def _evict(self) -> list[tuple[Collection, int]]:
+        """
+        Drop least recently used, unpinned collections until the rest fit the
+        budget. Called with self._lock held; the caller closes them after
+        releasing it.
+
+        Returns:
+            list of (collection, memory bytes)
+        """
+        sizes = {name: c.retriever.memory_bytes() for name, c in self._resident.items()}
+        total = sum(sizes.values())
+        evicted = []
+        for name, collection in list(self._resident.items()):
+            if total <= self.max_resident_bytes:
+                break
+            if collection.pins > 0:
+                continue
+            del self._resident[name]
+            self._closing[name] = threading.Event()
+            total -= sizes[name]
+            evicted.append((collection, sizes[name]))
+        return evicted
+
+    def _close(self, evicted: list[tuple[Collection, int]]):
+        for collection, size in evicted:
+            # Nothing is pinning it, so nothing else writes to it any more
+            try:
+                collection.retriever.save()
+                collection.retriever.close()
+            finally:
+                with self._lock:
+                    self._closing.pop(collection.name).set()
+            print(f"Evicted collection {collection.name} ({size / 1e6:.1f} MB)")
@@ -0,0 +1,172 @@
+"""
+Content-addressed on-disk cache for chunk embeddings.
+
+Layout of one cache directory (one per embedding model):
+	•	meta.json   – model name and embedding dimension
+	•	keys.bin    – 16-byte hash of every cached chunk, appended in order
+	•	vectors.bin – float32 rows, row i belongs to key i
+
+Both files are append-only. vectors.bin is read through np.memmap, so the
+cache never has to fit in RAM. A row is only valid once both its vector and
+its key are on disk; a crash between the two writes just drops that row.
+
+Appends are serialized by a lock within the process and, where fcntl is
+available, by a lock file across processes (e.g. a running API and
+scripts/ingest_pdfs.py sharing one cache directory). Row numbers come from
+the file size at append time, so rows appended by another process never
+shift this process's rows.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+KEY_SIZE = 16
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str, model_name: str, embedding_dim: int):
+        self.model_name = model_name
+        self.embedding_dim = embedding_dim
+        self.cache_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self.keys_path = os.path.join(self.cache_dir, "keys.bin")
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.bin")
+        self.meta_path = os.path.join(self.cache_dir, "meta.json")
+        self.lock_path = os.path.join(self.cache_dir, "lock")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._check_meta()
+
+        self.rows = {}  # key -> row in vectors.bin
+        self._num_rows = 0  # rows in vectors.bin, including other processes' appends
+        self._vectors = None
+        self._lock = threading.Lock()
+        with self._file_lock():
+            self._load()
+
+    def _check_meta(self):
+        meta = {"model_name": self.model_name, "embedding_dim": self.embedding_dim}
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(
+                    f"Embedding cache at {self.cache_dir} was built for {existing}, not {meta}"
+                )
+        else:
+            with open(self.meta_path, "w") as f:
+                json.dump(meta, f)
+
+    def _load(self):
+        row_bytes = self.embedding_dim * 4
+
+        keys = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                keys = f.read()
+        num_vectors = 0
+        if os.path.exists(self.vectors_path):
+            num_vectors = os.path.getsize(self.vectors_path) // row_bytes
+
+        # Only rows with both a key and a full vector are usable
+        num_rows = min(len(keys) // KEY_SIZE, num_vectors)
+        for row in range(num_rows):
+            self.rows[keys[row * KEY_SIZE:(row + 1) * KEY_SIZE]] = row
+        self._num_rows = num_rows
+
+        # Drop a torn tail left by an interrupted write
+        if len(keys) != num_rows * KEY_SIZE:
+            with open(self.keys_path, "r+b") as f:
+                f.truncate(num_rows * KEY_SIZE)
+        if num_vectors != num_rows:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(num_rows * row_bytes)
+
+    def key(self, text: str) -> bytes:
+        """
+        Hash of (model name, whitespace-normalized text).
+        """
+        normalized = " ".join(text.split())
+        payload = f"{self.model_name}\0{normalized}".encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=KEY_SIZE).digest()
+
+    def lookup(self, keys: list[bytes]) -> list[int | None]:
+        """
+        Return the cache row of every key, or None when it is not cached.
+        """
+        with self._lock:
+            return [self.rows.get(k) for k in keys]
+
+    def vectors(self, rows: list[int]) -> np.ndarray:
+        """
+        Read cached embeddings by row.
+        """
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[0] < self._num_rows:
+                self._vectors = np.memmap(
+                    self.vectors_path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(self._num_rows, self.embedding_dim)
+                )
+            return np.asarray(self._vectors[rows])
+
+    def add(self, keys: list[bytes], embeddings: np.ndarray):
+        """
+        Append new embeddings. Keys that are already cached are skipped.
+        """
+        with self._lock, self._file_lock():
+            new_keys = []
+            new_rows = []
+            seen = set()
+            for i, k in enumerate(keys):
+                if k not in self.rows and k not in seen:
+                    seen.add(k)
+                    new_keys.append(k)
+                    new_rows.append(i)
+
+            if not new_keys:
+                return
+
+            vectors = np.ascontiguousarray(embeddings[new_rows], dtype=np.float32)
+
+            # Vectors first, keys second: a key on disk always has its vector
+            with open(self.vectors_path, "ab") as f:
+                first_row = f.tell() // (self.embedding_dim * 4)
+                f.write(vectors.tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(new_keys))
+
+            for row, k in enumerate(new_keys, first_row):
+                self.rows[k] = row
+            self._num_rows = first_row + len(new_keys)
+
+    def __len__(self):
+        with self._lock:
+            return len(self.rows)
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Exclusive lock on the cache directory across processes (no-op without fcntl).
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
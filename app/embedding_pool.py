@@ -0,0 +1,320 @@
+"""
+Multi-process embedding for CPU-only ingestion nodes.
+
+One process running torch intra-op threads stops scaling after a few
+cores. EmbeddingPool starts `workers` processes instead, each with its own
+copy of the model, a fixed number of torch threads and (on Linux) its own
+set of cores:
+
+    embed_texts() → token IDs → worker input buffer (shared memory)
+                  → worker forward pass → worker output buffer (shared memory)
+                  → rows copied back at their original positions
+
+Only small control messages go through the pipes; token IDs and
+embeddings are exchanged through one pair of shared-memory buffers per
+worker. Each worker has one batch in flight, and the next batch goes to
+whichever worker finishes first, so the output order never depends on
+the workers' speed.
+
+EmbeddingPool has the same embed_texts() interface as EmbeddingGenerator
+(including the embedding cache and token_ids=), so it can be passed to
+StreamingIngestor as is. See scripts/embedding_workers.py for the
+throughput of 1..N workers on a given machine.
+"""
+
+import multiprocessing
+import os
+import time
+import traceback
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoTokenizer
+
+from app.embedding_cache import EmbeddingCache
+from app.embeddings import BACKENDS, EmbeddingGenerator
+from app.text_splitter import model_max_length
+
+
+def _worker_main(
+    conn,
+    model_name: str,
+    backend: str,
+    threads: int,
+    cores: list[int] | None,
+    input_name: str,
+    output_name: str,
+    max_batch_size: int,
+    max_length: int
+):
+    """
+    Worker process: embed batches of token IDs from shared memory until told to stop.
+    A batch that fails is reported as an error and the worker waits for the next one.
+    """
+    input_buffer = output_buffer = None
+    try:
+        if cores and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+        embedder = EmbeddingGenerator(model_name=model_name, backend=backend)
+        input_buffer = shared_memory.SharedMemory(name=input_name)
+        output_buffer = shared_memory.SharedMemory(name=output_name)
+        token_ids = np.ndarray((max_batch_size * max_length,), dtype=np.int32, buffer=input_buffer.buf)
+        outputs = np.ndarray((max_batch_size, embedder.embedding_dim), dtype=np.float32, buffer=output_buffer.buf)
+        conn.send(("ready", embedder.embedding_dim))
+
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+
+            try:
+                lengths = message
+                batch, offset = [], 0
+                for length in lengths:
+                    batch.append(token_ids[offset:offset + length].tolist())
+                    offset += length
+
+                with torch.no_grad():
+                    outputs[:len(batch)] = embedder._embed_encoded(embedder._pad_token_ids(batch))
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+                continue
+            conn.send(("done", len(batch)))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        # Views into the buffers must be gone before they are closed
+        token_ids = outputs = None
+        for buffer in (input_buffer, output_buffer):
+            if buffer is not None:
+                buffer.close()
+        conn.close()
+
+
+class EmbeddingPool:
+    def __init__(
+        self,
+        workers: int = 2,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 32,
+        cache_dir: str | None = None,
+        backend: str = "torch",
+        threads_per_worker: int | None = None,
+        pin_cores: bool = True
+    ):
+        """
+        Args:
+            workers (int): embedding processes, each holding one model copy
+            batch_size (int): chunks per forward pass (one batch per worker at a time)
+            backend (str): "torch" or "int8" (the onnx backend is not supported here)
+            threads_per_worker (int | None): torch threads per worker (default: cores / workers)
+            pin_cores (bool): give each worker its own cores (Linux only)
+        """
+        if backend not in BACKENDS or backend == "onnx":
+            raise ValueError(f"Unsupported backend for EmbeddingPool: {backend} (use torch or int8)")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.workers = workers
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        config = AutoConfig.from_pretrained(model_name)
+        self.embedding_dim = config.hidden_size
+        self.max_length = model_max_length(self.tokenizer, config.max_position_embeddings)
+
+        self.cache = None
+        if cache_dir:
+            cache_name = model_name if backend == "torch" else f"{model_name}@{backend}"
+            self.cache = EmbeddingCache(cache_dir, cache_name, self.embedding_dim)
+
+        self.last_stats = None
+
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.threads_per_worker = threads_per_worker or max(1, len(cores) // workers)
+
+        self._processes = []
+        self._conns = []
+        self._buffers = []  # (input SharedMemory, output SharedMemory) per worker
+        self._inputs = []   # int32 views of the input buffers
+        self._outputs = []  # float32 views of the output buffers
+
+        # spawn: forking a process that already runs torch threads can deadlock
+        context = multiprocessing.get_context("spawn")
+        try:
+            for worker in range(workers):
+                input_buffer = shared_memory.SharedMemory(create=True, size=batch_size * self.max_length * 4)
+                output_buffer = shared_memory.SharedMemory(create=True, size=batch_size * self.embedding_dim * 4)
+                self._buffers.append((input_buffer, output_buffer))
+                self._inputs.append(np.ndarray((batch_size * self.max_length,), dtype=np.int32, buffer=input_buffer.buf))
+                self._outputs.append(np.ndarray((batch_size, self.embedding_dim), dtype=np.float32, buffer=output_buffer.buf))
+
+                worker_cores = None
+                if pin_cores and len(cores) >= workers:
+                    share = len(cores) // workers
+                    worker_cores = cores[worker * share:(worker + 1) * share]
+
+                parent_conn, child_conn = context.Pipe()
+                process = context.Process(
+                    target=_worker_main,
+                    args=(
+                        child_conn, model_name, backend, self.threads_per_worker, worker_cores,
+                        input_buffer.name, output_buffer.name, batch_size, self.max_length
+                    ),
+                    name=f"embed-worker-{worker}",
+                    daemon=True
+                )
+                process.start()
+                child_conn.close()
+                self._processes.append(process)
+                self._conns.append(parent_conn)
+
+            for conn in self._conns:
+                self._receive(conn)
+        except BaseException:
+            self.close()
+            raise
+
+        print(f"Started {workers} embedding workers ({self.threads_per_worker} threads each)")
+
+    def embed_texts(
+        self,
+        texts: list[str],
+        batch_size: int | None = None,
+        token_ids: list[list[int]] | None = None
+    ) -> torch.Tensor:
+        """
+        Same as EmbeddingGenerator.embed_texts(), spread over the worker processes.
+
+        Args:
+            batch_size (int | None): at most the pool's batch_size
+            token_ids (list[list[int]] | None): the texts already tokenized, with special tokens
+
+        Returns:
+            torch.Tensor: tensor of embeddings, shape (len(texts), embedding_dim), in input order
+        """
+        batch_size = min(batch_size or self.batch_size, self.batch_size)
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+
+        start_time = time.perf_counter()
+
+        todo = list(range(len(texts)))
+        if self.cache is not None:
+            keys = [self.cache.key(t) for t in texts]
+            rows = self.cache.lookup(keys)
+            hits = [i for i, row in enumerate(rows) if row is not None]
+            if hits:
+                embeddings[hits] = self.cache.vectors([rows[i] for i in hits])
+            todo = [i for i, row in enumerate(rows) if row is None]
+
+        if todo:
+            if token_ids is None:
+                # One batched call to the (Rust) tokenizer; workers only run the model
+                encoded = self.tokenizer([texts[i] for i in todo], truncation=True)["input_ids"]
+                token_ids = dict(zip(todo, encoded))
+
+            # Length buckets: neighbours in this order have similar lengths
+            order = sorted(todo, key=lambda i: len(token_ids[i]))
+            batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+            self._run(batches, token_ids, embeddings)
+
+        if self.cache is not None and todo:
+            self.cache.add([keys[i] for i in todo], embeddings[todo])
+
+        elapsed = time.perf_counter() - start_time
+        self.last_stats = {
+            "chunks": len(texts),
+            "computed": len(todo),
+            "seconds": elapsed,
+            "chunks_per_sec": len(texts) / elapsed if elapsed > 0 else 0.0,
+            "workers": self.workers,
+        }
+        if len(texts) > batch_size:
+            print(
+                f"Embedded {len(texts)} chunks ({len(todo)} computed) on {self.workers} workers "
+                f"in {elapsed:.2f}s ({self.last_stats['chunks_per_sec']:.1f} chunks/sec)"
+            )
+
+        return torch.from_numpy(embeddings)
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+
+        self._inputs, self._outputs = [], []
+        for input_buffer, output_buffer in self._buffers:
+            for buffer in (input_buffer, output_buffer):
+                buffer.close()
+                buffer.unlink()
+        self._processes, self._conns, self._buffers = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- internals ----------
+
+    def _run(self, batches: list[list[int]], token_ids, embeddings: np.ndarray):
+        """
+        Keep every worker busy with one batch until all batches are embedded.
+        """
+        pending = iter(batches)
+        in_flight = {}  # worker -> positions of its current batch
+
+        def dispatch(worker: int) -> bool:
+            batch = next(pending, None)
+            if batch is None:
+                return False
+            ids = [token_ids[i][:self.max_length] for i in batch]
+            lengths = [len(x) for x in ids]
+            self._inputs[worker][:sum(lengths)] = np.fromiter(
+                (token for x in ids for token in x), dtype=np.int32, count=sum(lengths)
+            )
+            self._conns[worker].send(lengths)
+            in_flight[worker] = batch
+            return True
+
+        for worker in range(self.workers):
+            if not dispatch(worker):
+                break
+
+        try:
+            while in_flight:
+                for conn in wait([self._conns[worker] for worker in in_flight]):
+                    worker = self._conns.index(conn)
+                    batch = in_flight.pop(worker)
+                    count = self._receive(conn)
+                    embeddings[batch] = self._outputs[worker][:count]
+                    dispatch(worker)
+        except Exception:
+            # Collect the other replies, so the next call does not read stale ones
+            for worker in in_flight:
+                try:
+                    self._receive(self._conns[worker])
+                except Exception:
+                    pass
+            raise
+
+    def _receive(self, conn):
+        try:
+            status, value = conn.recv()
+        except EOFError:
+            raise RuntimeError("Embedding worker exited unexpectedly")
+        if status == "error":
+            raise RuntimeError(f"Embedding worker failed:\n{value}")
+        return value
@@ -1,11 +1,80 @@
+import copy
+import os
+import time
+
+import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModel
 
+from app.embedding_cache import EmbeddingCache
+from app.text_splitter import model_max_length
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+# Inference backends:
+# - torch: float32 PyTorch (reference; uses GPU/MPS when available)
+# - int8:  PyTorch with dynamically quantized int8 Linear layers (CPU)
+# - onnx:  the model exported once to ONNX and run by ONNX Runtime (CPU)
+BACKENDS = ("torch", "int8", "onnx")
+
 class EmbeddingGenerator:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        self.device = self.__get_device()
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 32,
+        cache_dir: str | None = None,
+        backend: str = "torch",
+        onnx_dir: str = "vector_store/onnx"
+    ):
+        """
+        Args:
+            backend (str): one of BACKENDS (see scripts/embedding_backends.py to compare them)
+            onnx_dir (str): where the exported ONNX graph is kept (onnx backend)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend} (choose from {BACKENDS})")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        # Quantized and ONNX models run on the CPU
+        self.device = self.__get_device() if backend == "torch" else torch.device("cpu")
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name).to(self.device)
+        self.model.eval()
+        self.embedding_dim = self.model.config.hidden_size
+        self.max_length = model_max_length(self.tokenizer, self.model.config.max_position_embeddings)
+
+        self.session = None
+        if backend == "int8":
+            self.model = torch.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif backend == "onnx":
+            self.session = self._load_onnx(onnx_dir)
+
+        # Optional persistent cache: chunks seen before are not re-embedded.
+        # Backends give slightly different vectors, so each has its own cache.
+        self.cache = None
+        if cache_dir:
+            cache_name = model_name if backend == "torch" else f"{model_name}@{backend}"
+            self.cache = EmbeddingCache(cache_dir, cache_name, self.embedding_dim)
+
+        # Throughput of the last embed_texts() call (chunks, seconds, chunks_per_sec)
+        self.last_stats = None
+
+    def uncached(self) -> "EmbeddingGenerator":
+        """
+        The same model without the persistent cache, e.g. for questions: each one
+        is embedded once and would only grow the cache of chunk embeddings.
+        """
+        view = copy.copy(self)
+        view.cache = None
+        view.last_stats = None
+        return view
 
     def __get_device(self):
         if torch.cuda.is_available():
@@ -15,23 +84,149 @@ class EmbeddingGenerator:
         else:
             return torch.device("cpu")
 
-    def embed_texts(self, texts: list[str]) -> torch.Tensor:
+    def _load_onnx(self, onnx_dir: str):
+        """
+        Export the model to ONNX on first use, then open it with ONNX Runtime.
+        """
+        if onnxruntime is None:
+            raise ImportError(
+                "onnxruntime not installed. Run: pip install onnxruntime onnx"
+            )
+
+        path = os.path.join(onnx_dir, self.model_name.replace("/", "__") + ".onnx")
+        if not os.path.exists(path):
+            os.makedirs(onnx_dir, exist_ok=True)
+            sample = self.tokenizer(["export sample"], return_tensors="pt")
+            # Positional order of the model's forward() arguments
+            input_names = [
+                name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample
+            ]
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+            print(f"Exporting {self.model_name} to {path}")
+            torch.onnx.export(
+                self.model,
+                tuple(sample[name] for name in input_names),
+                path + ".tmp",
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+            os.replace(path + ".tmp", path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def embed_texts(
+        self,
+        texts: list[str],
+        batch_size: int | None = None,
+        token_ids: list[list[int]] | None = None
+    ) -> torch.Tensor:
         """
         Generate embeddings for a list of texts.
 
+        Texts are embedded in micro-batches. Before batching they are sorted
+        by length so every batch holds texts of similar size and padding stays
+        small. Each batch writes into one preallocated float32 array at the
+        original positions, so the output order matches the input order.
+
+        When a cache is configured, cached chunks are read from disk and only
+        the missing ones go through the model.
+
         Args:
             texts (List[str]): list of text chunks
+            batch_size (int | None): texts per forward pass (defaults to self.batch_size)
+            token_ids (list[list[int]] | None): the texts already tokenized, with special
+                                                tokens (see TokenChunker); skips the tokenizer
 
         Returns:
-            torch.Tensor: tensor of embeddings
+            torch.Tensor: tensor of embeddings, shape (len(texts), embedding_dim)
         """
+        batch_size = batch_size or self.batch_size
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+
+        start_time = time.perf_counter()
+
+        todo = list(range(len(texts)))
+        if self.cache is not None:
+            keys = [self.cache.key(t) for t in texts]
+            rows = self.cache.lookup(keys)
+            hits = [i for i, row in enumerate(rows) if row is not None]
+            if hits:
+                embeddings[hits] = self.cache.vectors([rows[i] for i in hits])
+            todo = [i for i, row in enumerate(rows) if row is None]
+
+        # Length buckets: neighbours in this order have similar lengths
+        if token_ids is not None:
+            order = sorted(todo, key=lambda i: len(token_ids[i]))
+        else:
+            order = sorted(todo, key=lambda i: len(texts[i]))
+
+        for start in range(0, len(order), batch_size):
+            batch_ids = order[start:start + batch_size]
+
+            if token_ids is not None:
+                encoded = self._pad_token_ids([token_ids[i] for i in batch_ids])
+            else:
+                encoded = self.tokenizer(
+                    [texts[i] for i in batch_ids],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors="pt"
+                )
+            embeddings[batch_ids] = self._embed_encoded(encoded)
+
+        if self.cache is not None and todo:
+            self.cache.add([keys[i] for i in todo], embeddings[todo])
 
-        encoded = self.tokenizer(
-            texts,
-            padding=True,
-            truncation=True,
-            return_tensors="pt"
-        )
+        elapsed = time.perf_counter() - start_time
+        self.last_stats = {
+            "chunks": len(texts),
+            "computed": len(todo),
+            "seconds": elapsed,
+            "chunks_per_sec": len(texts) / elapsed if elapsed > 0 else 0.0,
+        }
+        if len(texts) > batch_size:
+            print(
+                f"Embedded {len(texts)} chunks ({len(todo)} computed) in {elapsed:.2f}s "
+                f"({self.last_stats['chunks_per_sec']:.1f} chunks/sec)"
+            )
+
+        return torch.from_numpy(embeddings)
+
+    def _pad_token_ids(self, batch: list[list[int]]) -> dict:
+        """
+        Tokenizer-style inputs for pre-tokenized texts, padded to the longest one.
+        """
+        batch = [ids[:self.max_length] for ids in batch]
+        width = max(len(ids) for ids in batch)
+
+        input_ids = torch.full((len(batch), width), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+        for row, ids in enumerate(batch):
+            input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+
+        encoded = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.tokenizer.model_input_names:
+            encoded["token_type_ids"] = torch.zeros_like(input_ids)
+        return encoded
+
+    def _embed_encoded(self, encoded) -> np.ndarray:
+        """
+        Run one padded batch through the model and mean-pool it.
+        """
+        if self.session is not None:
+            inputs = {i.name: encoded[i.name].numpy() for i in self.session.get_inputs()}
+            token_embeddings = self.session.run(["last_hidden_state"], inputs)[0]
+            attention_mask = inputs["attention_mask"][..., None].astype(np.float32)
+            return (token_embeddings * attention_mask).sum(axis=1) / attention_mask.sum(axis=1)
 
         encoded = {k: v.to(self.device) for k, v in encoded.items()}
 
@@ -52,8 +247,8 @@ class EmbeddingGenerator:
         embeddings = (token_embeddings * attention_mask).sum(dim=1)
         embeddings = embeddings / attention_mask.sum(dim=1)
 
-        return embeddings.cpu()
+        return embeddings.cpu().numpy()
     # FAISS do not work on MPS device that's why we move embeddings to CPU before returning
     # Models can run on GPU, but vector databases work on CPU.
     # compute embeddings on GPU
-    # store & search embeddings on CPU
\ No newline at end of file
+    # store & search embeddings on CPU
@@ -0,0 +1,189 @@
+"""
+Helpers for building and inspecting FAISS indexes.
+
+Every index is an inner-product index over L2-normalized vectors, so
+scores are cosine similarities. Indexes may be wrapped in an IndexIDMap2
+(as segments are); the helpers look through the wrapper.
+"""
+
+import faiss
+import numpy as np
+
+# Index types that can be chosen when a new index is built:
+# - flat:  exact search, cost grows linearly with corpus size
+# - hnsw:  graph index, no training, fast and high recall, more RAM
+# - ivf:   inverted lists over k-means clusters, needs a train step
+# - ivfpq: ivf + product quantization, smallest memory, approximate scores
+# - fp16:  exhaustive scan over float16 vectors (half the memory of flat)
+# - sq8:   exhaustive scan over 8-bit scalar-quantized vectors (a quarter)
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq", "fp16", "sq8")
+
+# Types whose stored vectors are lossy: segments of these types keep the exact
+# float32 vectors in a memory-mapped side file to re-rank candidates
+COMPRESSED_TYPES = ("ivfpq", "fp16", "sq8")
+
+DEFAULT_INDEX_PARAMS = {
+    "nlist": 1024,      # ivf / ivfpq: number of clusters
+    "nprobe": 16,       # ivf / ivfpq: clusters visited per query
+    "hnsw_m": 32,       # hnsw: graph neighbours per node
+    "ef_search": 64,    # hnsw: candidate list size per query
+    "pq_m": 48,         # ivfpq: sub-quantizers (must divide embedding_dim)
+}
+
+
+def build_index(embedding_dim: int, index_type: str = "flat", **params) -> faiss.Index:
+    """
+    Create an empty inner-product index of the given type.
+    """
+    params = {**DEFAULT_INDEX_PARAMS, **params}
+
+    factories = {
+        "flat": "Flat",
+        "hnsw": f"HNSW{params['hnsw_m']}",
+        "ivf": f"IVF{params['nlist']},Flat",
+        "ivfpq": f"IVF{params['nlist']},PQ{params['pq_m']}",
+        "fp16": "SQfp16",
+        "sq8": "SQ8",
+    }
+    if index_type not in factories:
+        raise ValueError(f"Unsupported index type: {index_type} (choose from {INDEX_TYPES})")
+
+    index = faiss.index_factory(embedding_dim, factories[index_type], faiss.METRIC_INNER_PRODUCT)
+
+    # Default search settings are stored inside the index file
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = params["nprobe"]
+    if index_type == "hnsw":
+        index.hnsw.efSearch = params["ef_search"]
+
+    return index
+
+
+def unwrap(index: faiss.Index) -> faiss.Index:
+    """
+    The index inside an IndexIDMap2 wrapper (or the index itself).
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    index = unwrap(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    return "flat"
+
+
+def train_size_for(index: faiss.Index) -> int:
+    """
+    Number of vectors to collect before training (0 = no training needed).
+    """
+    if index.is_trained:
+        return 0
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        # sq8 only learns the value range of each dimension
+        return 1000
+    # FAISS wants roughly 40 points per cluster for stable k-means;
+    # ivfpq also trains 256 centroids per sub-quantizer
+    clusters = ivf.nlist
+    if index_type_of(index) == "ivfpq":
+        clusters = max(clusters, 256)
+    return clusters * 40
+
+
+def search_parameters(
+    index: faiss.Index,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    sel: faiss.IDSelector | None = None
+):
+    """
+    Per-query search parameters, or None to use the defaults stored in the index.
+    Passing them per call (instead of setting index.nprobe) is safe across threads.
+
+    Args:
+        sel (faiss.IDSelector | None): only return IDs accepted by this selector
+    """
+    if nprobe is None and ef_search is None and sel is None:
+        return None
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=sel, nprobe=nprobe or ivf.nprobe)
+
+    inner = unwrap(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=ef_search or inner.hnsw.efSearch)
+
+    if sel is None:
+        return None
+    return faiss.SearchParameters(sel=sel)
+
+
+def all_vectors(index: faiss.Index) -> np.ndarray:
+    """
+    Read back every stored vector in storage order (approximate for ivfpq).
+    """
+    inner = unwrap(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is None:
+        return inner.reconstruct_n(0, inner.ntotal)
+
+    ivf.make_direct_map()
+    vectors = inner.reconstruct_n(0, inner.ntotal)
+    ivf.make_direct_map(False)  # the direct map blocks remove_ids
+    return vectors
+
+
+def all_ids(index: faiss.Index) -> np.ndarray:
+    """
+    Vector IDs in storage order, aligned with all_vectors().
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map)
+    return np.arange(index.ntotal, dtype=np.int64)
+
+
+def build_trained_index(
+    embedding_dim: int,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    index_type: str = "flat",
+    **params
+) -> faiss.Index:
+    """
+    Build an ID-mapped index holding `vectors`, training it on them first.
+
+    Falls back to flat when there are too few vectors to train the
+    requested type; check index_type_of() for the type actually built.
+    """
+    index = build_index(embedding_dim, index_type, **params)
+
+    if not index.is_trained:
+        train_size = train_size_for(index)
+        if len(vectors) < train_size:
+            print(
+                f"Only {len(vectors)} vectors, {index_type} needs {train_size} to train: "
+                f"building a flat index instead"
+            )
+            index = build_index(embedding_dim, "flat")
+        else:
+            sample = np.random.default_rng(0).choice(len(vectors), train_size, replace=False)
+            print(f"Training {index_type} index on {train_size} vectors")
+            index.train(vectors[sample])
+
+    index = faiss.IndexIDMap2(index)
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
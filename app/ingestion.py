@@ -0,0 +1,206 @@
+"""
+Bounded-memory streaming ingestion.
+
+    pages (process pool) → chunks → embedding batches → add_embeddings
+
+A producer thread extracts and chunks PDFs and puts fixed-size chunk
+batches on a bounded queue. The consumer embeds each batch and adds it to
+the index. When the queue is full the producer blocks (backpressure), so
+the pipeline stages hold only a few batches whatever the corpus size.
+
+Every `checkpoint_every` chunks the retriever saves a new segment. The
+checkpoint (how far each unfinished PDF got) is stored in the same
+manifest, so the index and the checkpoint can never disagree. An
+interrupted run resumes from the last checkpoint instead of starting over.
+
+PDFs are identified by content hash: files that are already indexed are
+skipped, and a changed file replaces the older version with the same name.
+
+At the end the small checkpoint segments are compacted into one segment of
+the configured index type; that is where ivf/ivfpq indexes get trained.
+"""
+
+import os
+import queue
+import threading
+import time
+from itertools import groupby
+
+from app.embeddings import EmbeddingGenerator
+from app.pdf_loader import document_id, iter_pages_parallel
+from app.retriever import FAISSRetriever
+from app.text_splitter import TokenChunker
+
+_DONE = object()
+
+
+class StreamingIngestor:
+    def __init__(
+        self,
+        embedder: EmbeddingGenerator,
+        retriever: FAISSRetriever,
+        batch_size: int = 256,
+        checkpoint_every: int = 4096,
+        max_pending_batches: int = 4,
+        max_workers: int | None = None
+    ):
+        self.embedder = embedder
+        # Chunks carry their token IDs, so the consumer skips the tokenizer
+        self.chunker = TokenChunker(embedder.tokenizer)
+        self.retriever = retriever
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.max_pending_batches = max_pending_batches
+        self.max_workers = max_workers
+
+        self.state = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> dict:
+        # Anything added after the last saved manifest is simply not on disk
+        return self.retriever.metadata.setdefault("ingest", {"documents": {}})
+
+    def _save_checkpoint(self):
+        # The checkpoint lives in the manifest, so one atomic write covers both
+        self.retriever.save()
+
+    def reset(self):
+        """
+        Forget previous runs and start from an empty index.
+        """
+        self.retriever.reset()
+        self.state = self.retriever.metadata["ingest"] = {"documents": {}}
+
+    def ingest(self, pdf_paths: list[str]) -> dict:
+        """
+        Ingest PDFs, skipping the ones that are already indexed.
+
+        Returns:
+            dict: documents, chunks and seconds for this run
+        """
+        documents = self.state["documents"]  # doc_id -> progress of unfinished PDFs
+        self.doc_ids = {}
+        todo = []
+        for pdf_path in pdf_paths:
+            doc_id = document_id(pdf_path)
+            if self.retriever.has_document(doc_id) or doc_id in self.doc_ids.values():
+                print(f"Skipping (already ingested): {os.path.basename(pdf_path)}")
+                continue
+            self.doc_ids[pdf_path] = doc_id
+            todo.append(pdf_path)
+
+        stats = {"documents": len(todo), "chunks": 0, "seconds": 0.0}
+        if not todo:
+            return stats
+
+        batches = queue.Queue(maxsize=self.max_pending_batches)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(todo, batches, stop),
+            daemon=True
+        )
+
+        start_time = time.perf_counter()
+        since_checkpoint = 0
+        producer.start()
+
+        try:
+            while True:
+                item = batches.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                pdf_path, chunks, doc_done = item
+                doc_id = self.doc_ids[pdf_path]
+                if chunks:
+                    texts = [text for text, _ in chunks]
+                    embeddings = self.embedder.embed_texts(texts, token_ids=[ids for _, ids in chunks]).numpy()
+                    self.retriever.add_embeddings(embeddings, texts, doc_id)
+
+                doc_state = documents.setdefault(doc_id, {"chunks": 0})
+                doc_state["chunks"] += len(chunks)
+                if doc_done:
+                    self._finish_document(pdf_path, documents.pop(doc_id)["chunks"])
+
+                stats["chunks"] += len(chunks)
+                since_checkpoint += len(chunks)
+                if since_checkpoint >= self.checkpoint_every:
+                    self._save_checkpoint()
+                    since_checkpoint = 0
+                    print(f"Checkpoint: {len(self.retriever)} chunks indexed")
+        finally:
+            stop.set()
+
+        self._save_checkpoint()
+        self.retriever.compact()
+
+        stats["seconds"] = time.perf_counter() - start_time
+        print(
+            f"Ingested {stats['chunks']} chunks from {stats['documents']} PDFs "
+            f"in {stats['seconds']:.1f}s "
+            f"({stats['chunks'] / max(stats['seconds'], 1e-9):.1f} chunks/sec)"
+        )
+        return stats
+
+    def _finish_document(self, pdf_path: str, num_chunks: int):
+        doc_id = self.doc_ids[pdf_path]
+        filename = os.path.basename(pdf_path)
+
+        # A new version of a file replaces the old one
+        for old in self.retriever.list_documents(filename):
+            if old["doc_id"] != doc_id:
+                removed = self.retriever.delete_document(old["doc_id"])
+                print(f"Replaced older version of {filename} ({removed} chunks)")
+
+        self.retriever.register_document(doc_id, filename, num_chunks)
+
+    def _produce(self, pdf_paths: list[str], batches: queue.Queue, stop: threading.Event):
+        """
+        Producer thread: extract, chunk and batch, blocking while the queue is full.
+        """
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            pages = iter_pages_parallel(pdf_paths, max_workers=self.max_workers)
+            seen = set()
+
+            for pdf_path, doc_pages in groupby(pages, key=lambda page: page[0]):
+                print(f"Ingesting: {os.path.basename(pdf_path)}")
+                seen.add(pdf_path)
+
+                # Chunking is deterministic, so a resumed PDF skips what is indexed
+                skip = self.state["documents"].get(self.doc_ids[pdf_path], {}).get("chunks", 0)
+
+                batch = []
+                for chunk in self.chunker.split_pages(text for _, _, text in doc_pages):
+                    if skip:
+                        skip -= 1
+                        continue
+                    batch.append(chunk)
+                    if len(batch) == self.batch_size:
+                        if not put((pdf_path, batch, False)):
+                            return
+                        batch = []
+
+                if not put((pdf_path, batch, True)):
+                    return
+
+            # PDFs without any extractable text never show up in the page stream
+            for pdf_path in pdf_paths:
+                if pdf_path not in seen:
+                    print(f"Warning: No text found in {os.path.basename(pdf_path)}")
+                    if not put((pdf_path, [], True)):
+                        return
+
+            put(_DONE)
+        except Exception as e:
+            put(e)
@@ -0,0 +1,335 @@
+"""
+Background ingestion jobs for uploaded PDFs.
+
+    submit() → extract workers (pages → chunks) → shared embed queue
+             → embed worker (one batch for many jobs) → add_embeddings → save
+
+An upload only saves the file and queues a job, so the HTTP request
+returns at once with a job ID. Extraction runs on a small thread pool.
+Chunks from all running jobs go to one bounded queue; the embed worker
+drains it into batches of about `embed_batch_size` chunks, so several
+small uploads share one forward pass. When the queue is full the
+extractors wait (backpressure).
+
+A document is registered, and the index saved, once all its chunks are
+added; the document it replaces is deleted only after that save. A failed
+job removes whatever chunks it had already added, and its registration
+when saving failed, and never stops the embed worker. Each
+job can target its own retriever (one per collection); a shared batch is
+split back per job before indexing.
+Progress and per-stage timings are kept on the job dict for the status
+endpoint.
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.embeddings import EmbeddingGenerator
+from app.metrics import INGEST_CHUNKS, INGEST_JOBS, INGEST_PAGES, INGEST_STAGE_SECONDS
+from app.pdf_loader import count_pages, iter_pages
+from app.retriever import FAISSRetriever
+from app.text_splitter import TokenChunker
+
+
+class IngestJobQueue:
+    def __init__(
+        self,
+        embedder: EmbeddingGenerator,
+        retriever: FAISSRetriever,
+        extract_workers: int = 2,
+        embed_batch_size: int = 256,
+        max_pending_chunks: int = 4096,
+        max_finished_jobs: int = 1000
+    ):
+        """
+        Args:
+            extract_workers (int): PDFs extracted and chunked in parallel
+            embed_batch_size (int): target chunks (from any jobs) per embedding call
+            max_pending_chunks (int): chunks waiting for embedding before extractors block
+            max_finished_jobs (int): finished jobs kept for the status endpoint
+        """
+        self.embedder = embedder
+        # Chunks carry their token IDs, so the embed worker skips the tokenizer
+        self.chunker = TokenChunker(embedder.tokenizer)
+        self.retriever = retriever
+        self.embed_batch_size = embed_batch_size
+        self.max_finished_jobs = max_finished_jobs
+
+        self.jobs = OrderedDict()  # job_id -> job dict, oldest first
+        self._retrievers = {}      # job_id -> retriever the job writes to
+        self._lock = threading.Lock()
+        self._extractors = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix="extract")
+        # Items are (job, chunks) pieces or (job, None) when a job's extraction is done
+        self._pieces = queue.Queue(maxsize=max(1, max_pending_chunks // embed_batch_size))
+        self._callbacks = {}
+
+        self._worker = threading.Thread(target=self._embed_loop, name="embed-jobs", daemon=True)
+        self._worker.start()
+
+    # ---------- API ----------
+
+    def submit(
+        self,
+        pdf_path: str,
+        doc_id: str,
+        replaces: str | None = None,
+        on_done=None,
+        retriever: FAISSRetriever | None = None,
+        collection: str | None = None
+    ) -> dict:
+        """
+        Queue a PDF for ingestion.
+
+        Args:
+            replaces (str | None): document to delete once this one is indexed
+            on_done (callable | None): called with the job dict when the job ends,
+                                       successfully or not (check job["status"])
+            retriever (FAISSRetriever | None): index to add to (defaults to the queue's)
+            collection (str | None): collection name, shown on the job
+
+        Returns:
+            dict: the job (an already running job for the same document and index is reused)
+        """
+        if retriever is None:
+            retriever = self.retriever
+        with self._lock:
+            for job in self.jobs.values():
+                if (
+                    job["doc_id"] == doc_id
+                    and self._retrievers.get(job["job_id"]) is retriever
+                    and job["status"] in ("queued", "extracting", "embedding")
+                ):
+                    if on_done is not None:
+                        self._callbacks[job["job_id"]].append(on_done)
+                    return job
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "doc_id": doc_id,
+                "collection": collection,
+                "filename": os.path.basename(pdf_path),
+                "replaces": replaces,
+                "status": "queued",
+                "error": None,
+                "pages_total": None,
+                "pages_done": 0,
+                "chunks_total": None,   # known once extraction is done
+                "chunks_done": 0,       # chunks extracted so far
+                "chunks_embedded": 0,
+                "timings": {"extract": 0.0, "embed": 0.0, "index": 0.0, "save": 0.0},
+                "created_at": time.time(),
+                "finished_at": None,
+            }
+            self.jobs[job["job_id"]] = job
+            self._retrievers[job["job_id"]] = retriever
+            self._callbacks[job["job_id"]] = [on_done] if on_done is not None else []
+            self._trim_finished()
+
+        self._extractors.submit(self._extract, job, pdf_path)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job, timings=dict(job["timings"])) if job else None
+
+    def list_jobs(self) -> list[dict]:
+        with self._lock:
+            return [dict(job, timings=dict(job["timings"])) for job in self.jobs.values()]
+
+    def _trim_finished(self):
+        finished = [j for j in self.jobs.values() if j["status"] in ("done", "failed")]
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job["job_id"]]
+
+    # ---------- extraction (worker pool) ----------
+
+    def _extract(self, job: dict, pdf_path: str):
+        try:
+            job["status"] = "extracting"
+            job["pages_total"] = count_pages(pdf_path)
+
+            def pages():
+                for page_num, text in iter_pages(pdf_path):
+                    job["pages_done"] = page_num + 1
+                    yield text
+
+            start_time = time.perf_counter()
+            piece = []
+            for chunk in self.chunker.split_pages(pages()):
+                piece.append(chunk)
+                job["chunks_done"] += 1
+                if len(piece) == self.embed_batch_size:
+                    job["timings"]["extract"] += time.perf_counter() - start_time
+                    self._pieces.put((job, piece))
+                    start_time = time.perf_counter()
+                    piece = []
+            job["pages_done"] = job["pages_total"]
+            job["timings"]["extract"] += time.perf_counter() - start_time
+
+            if piece:
+                self._pieces.put((job, piece))
+            self._pieces.put((job, None))
+        except Exception as e:
+            self._pieces.put((job, e))
+
+    # ---------- embedding + indexing (single worker) ----------
+
+    def _next_batch(self) -> list[tuple]:
+        # Block for the first piece, then add whatever is already queued
+        items = [self._pieces.get()]
+        size = len(items[0][1]) if isinstance(items[0][1], list) else 0
+        while size < self.embed_batch_size:
+            try:
+                item = self._pieces.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+            if isinstance(item[1], list):
+                size += len(item[1])
+        return items
+
+    def _embed_loop(self):
+        while True:
+            items = self._next_batch()
+            try:
+                self._handle(items)
+            except Exception as e:
+                # One broken batch fails its jobs; the worker keeps serving the others
+                for job in {id(job): job for job, _ in items}.values():
+                    if job["status"] != "done":
+                        self._fail(job, e)
+
+    def _handle(self, items: list[tuple]):
+        pieces = [(job, chunks) for job, chunks in items if isinstance(chunks, list)]
+        pieces = [(job, chunks) for job, chunks in pieces if job["status"] != "failed"]
+
+        if pieces:
+            try:
+                self._embed_pieces(pieces)
+            except Exception as e:
+                for job in {id(job): job for job, _ in pieces}.values():
+                    self._fail(job, e)
+
+        finished = []
+        for job, item in items:
+            if isinstance(item, Exception):
+                self._fail(job, item)
+            elif item is None and job["status"] != "failed":
+                finished.append(job)
+        if finished:
+            self._finish(finished)
+
+    def _embed_pieces(self, pieces: list[tuple]):
+        chunks = [text for _, piece in pieces for text, _ in piece]
+        token_ids = [ids for _, piece in pieces for _, ids in piece]
+        for job, _ in pieces:
+            job["status"] = "embedding"
+
+        start_time = time.perf_counter()
+        embeddings = self.embedder.embed_texts(chunks, token_ids=token_ids).numpy()
+        embed_seconds = time.perf_counter() - start_time
+
+        offset = 0
+        for job, piece in pieces:
+            # A shared batch's time is split between jobs by chunk count
+            job["timings"]["embed"] += embed_seconds * len(piece) / len(chunks)
+            start_time = time.perf_counter()
+            retriever = self._retrievers[job["job_id"]]
+            retriever.add_embeddings(
+                embeddings[offset:offset + len(piece)], [text for text, _ in piece], job["doc_id"]
+            )
+            job["timings"]["index"] += time.perf_counter() - start_time
+            job["chunks_embedded"] += len(piece)
+            offset += len(piece)
+        INGEST_CHUNKS.inc(len(chunks))
+
+    def _finish(self, jobs: list[dict]):
+        by_retriever = {}  # id(retriever) -> (retriever, jobs)
+        for job in jobs:
+            job["chunks_total"] = job["chunks_done"]
+            if job["chunks_total"] == 0:
+                self._fail(job, ValueError("No text found in PDF"))
+                continue
+            retriever = self._retrievers[job["job_id"]]
+            try:
+                retriever.register_document(job["doc_id"], job["filename"], job["chunks_total"])
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            by_retriever.setdefault(id(retriever), (retriever, []))[1].append(job)
+
+        # One save per index covers every job that finished in this batch
+        for retriever, retriever_jobs in by_retriever.values():
+            start_time = time.perf_counter()
+            try:
+                retriever.save()
+            except Exception as e:
+                # Unsaved documents must not stay registered and searchable
+                for job in retriever_jobs:
+                    self._fail(job, e)
+                continue
+            save_seconds = time.perf_counter() - start_time
+
+            # Old versions go only once the new ones are saved
+            replaced = [
+                job["replaces"] for job in retriever_jobs
+                if job["replaces"] and job["replaces"] != job["doc_id"]
+            ]
+            if replaced:
+                try:
+                    for doc_id in replaced:
+                        retriever.delete_document(doc_id)
+                    retriever.save()
+                except Exception as e:
+                    print(f"Could not delete replaced documents {replaced}: {e}")
+            self._done(retriever_jobs, save_seconds)
+
+    def _done(self, jobs: list[dict], save_seconds: float):
+        for job in jobs:
+            job["timings"]["save"] += save_seconds
+            job["status"] = "done"
+            job["finished_at"] = time.time()
+            INGEST_JOBS.inc(status="done")
+            # Finished jobs must not keep an evicted collection's index alive
+            self._retrievers.pop(job["job_id"], None)
+            INGEST_PAGES.inc(job["pages_total"])
+            for stage, seconds in job["timings"].items():
+                INGEST_STAGE_SECONDS.observe(seconds, stage=stage)
+            self._run_callbacks(job)
+            print(
+                f"Job {job['job_id']}: indexed {job['filename']} "
+                f"({job['chunks_total']} chunks, {job['finished_at'] - job['created_at']:.1f}s)"
+            )
+
+    def _fail(self, job: dict, error: Exception):
+        if job["status"] == "failed":
+            return
+        job["status"] = "failed"
+        job["error"] = str(error)
+        job["finished_at"] = time.time()
+        INGEST_JOBS.inc(status="failed")
+        # Drop the chunks (and registration) this job already added. A document
+        # registered before the job was created belongs to an earlier upload and is kept.
+        retriever = self._retrievers.pop(job["job_id"], None)
+        if retriever is not None:
+            try:
+                document = retriever.get_document(job["doc_id"])
+                if document is None or document["added_at"] >= job["created_at"]:
+                    retriever.delete_document(job["doc_id"])
+            except Exception as e:
+                print(f"Job {job['job_id']}: could not remove its chunks: {e}")
+        print(f"Job {job['job_id']} failed: {error}")
+        self._run_callbacks(job)
+
+    def _run_callbacks(self, job: dict):
+        for callback in self._callbacks.pop(job["job_id"], []):
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Job {job['job_id']} callback failed: {e}")
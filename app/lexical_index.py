@@ -0,0 +1,266 @@
+"""
+Inverted index for BM25 keyword search.
+
+Dense embeddings are weak on exact tokens such as part numbers ("AB-1042")
+or clause numbers ("4.2.1"); BM25 over an inverted index finds them. The
+index follows the vector segments: every FAISS segment has a postings
+file with the same chunk IDs, written, compacted and deleted together
+with it, and new chunks go to an in-memory PostingsBuilder until save().
+
+A PostingsSegment keeps its postings in flat numpy arrays: for term t,
+ids[offsets[t]:offsets[t + 1]] are the chunks containing it, with the
+term frequency and chunk length alongside.
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+
+# Keep "4.2.1", "AB-1042" and "v2/rev3" as single tokens
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[./\-][a-z0-9]+)*")
+
+# Ignored in queries: they match nearly every chunk and say nothing about the topic.
+# Chunks are indexed with them, so chunk lengths (and existing postings) are unchanged.
+STOPWORDS = frozenset("""
+a about an and are as at be by can could did do does for from had has have how i if in
+into is it its me my no not of on or our should so than that the their them then there
+these they this to was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def query_terms(query: str) -> set[str]:
+    return {term for term in tokenize(query) if term not in STOPWORDS}
+
+
+class PostingsSegment:
+    """
+    Immutable postings for one segment.
+    """
+
+    def __init__(
+        self,
+        terms: list[str],
+        offsets: np.ndarray,
+        ids: np.ndarray,
+        tfs: np.ndarray,
+        lengths: np.ndarray,
+        doc_ids: np.ndarray,
+        doc_lengths: np.ndarray
+    ):
+        self.terms = terms
+        self.term_index = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets          # int64, len(terms) + 1
+        self.ids = ids                  # int64 chunk ID per posting
+        self.tfs = tfs                  # int32 term frequency per posting
+        self.lengths = lengths          # int32 chunk length (tokens) per posting
+        self.doc_ids = doc_ids          # int64 chunk IDs in this segment
+        self.doc_lengths = doc_lengths  # int32 length of each of them
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def total_length(self) -> int:
+        return int(self.doc_lengths.sum())
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (ids, tfs, lengths) of the chunks containing `term`.
+        """
+        i = self.term_index.get(term)
+        if i is None:
+            return _EMPTY
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.ids[start:end], self.tfs[start:end], self.lengths[start:end]
+
+    def save(self, path: str):
+        # Through a file object np.savez keeps the exact path (no .npz added)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+                offsets=self.offsets,
+                ids=self.ids,
+                tfs=self.tfs,
+                lengths=self.lengths,
+                doc_ids=self.doc_ids,
+                doc_lengths=self.doc_lengths,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "PostingsSegment":
+        with np.load(path) as data:
+            terms = data["terms"].tobytes().decode("utf-8")
+            return cls(
+                terms.split("\n") if terms else [],
+                data["offsets"], data["ids"], data["tfs"], data["lengths"],
+                data["doc_ids"], data["doc_lengths"],
+            )
+
+    @classmethod
+    def from_texts(cls, ids, texts: list[str]) -> "PostingsSegment":
+        builder = PostingsBuilder()
+        builder.add(ids, texts)
+        return builder.build()
+
+    @classmethod
+    def merge(cls, segments: list["PostingsSegment"], drop_ids: np.ndarray) -> "PostingsSegment":
+        """
+        Postings of several segments in one, without the chunks in `drop_ids`.
+        """
+        terms = sorted({term for segment in segments for term in segment.terms})
+        term_pos = {term: i for i, term in enumerate(terms)}
+
+        # Tag every posting with its global term number, then regroup by term
+        term_col = np.concatenate([np.empty(0, np.int64)] + [
+            np.repeat(np.array([term_pos[t] for t in s.terms], dtype=np.int64), np.diff(s.offsets))
+            for s in segments
+        ])
+        ids = np.concatenate([np.empty(0, np.int64)] + [s.ids for s in segments])
+        tfs = np.concatenate([np.empty(0, np.int32)] + [s.tfs for s in segments])
+        lengths = np.concatenate([np.empty(0, np.int32)] + [s.lengths for s in segments])
+
+        keep = ~np.isin(ids, drop_ids)
+        term_col, ids, tfs, lengths = term_col[keep], ids[keep], tfs[keep], lengths[keep]
+        order = np.argsort(term_col, kind="stable")
+        counts = np.bincount(term_col, minlength=len(terms))
+
+        # Terms whose chunks were all dropped disappear
+        live_terms = counts > 0
+        offsets = np.concatenate([[0], np.cumsum(counts[live_terms])]).astype(np.int64)
+
+        doc_ids = np.concatenate([np.empty(0, np.int64)] + [s.doc_ids for s in segments])
+        doc_lengths = np.concatenate([np.empty(0, np.int32)] + [s.doc_lengths for s in segments])
+        keep_docs = ~np.isin(doc_ids, drop_ids)
+        return cls(
+            [term for term, live in zip(terms, live_terms) if live],
+            offsets,
+            ids[order],
+            tfs[order],
+            lengths[order],
+            doc_ids[keep_docs],
+            doc_lengths[keep_docs],
+        )
+
+
+_EMPTY = (np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int32))
+
+
+class PostingsBuilder:
+    """
+    Mutable postings for the active (unsaved) segment.
+    """
+
+    def __init__(self):
+        self._postings = {}  # term -> {chunk_id: tf}
+        self._lengths = {}   # chunk_id -> length
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def total_length(self) -> int:
+        return sum(self._lengths.values())
+
+    def add(self, ids, texts: list[str]):
+        for chunk_id, text in zip(ids, texts):
+            chunk_id = int(chunk_id)
+            counts = Counter(tokenize(text))
+            self._lengths[chunk_id] = sum(counts.values())
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[chunk_id] = tf
+
+    def remove(self, ids):
+        ids = {int(i) for i in ids}
+        for chunk_id in ids:
+            self._lengths.pop(chunk_id, None)
+        for term in list(self._postings):
+            postings = self._postings[term]
+            for chunk_id in ids & postings.keys():
+                del postings[chunk_id]
+            if not postings:
+                del self._postings[term]
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        postings = self._postings.get(term)
+        if not postings:
+            return _EMPTY
+        ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+        tfs = np.fromiter(postings.values(), dtype=np.int32, count=len(postings))
+        lengths = np.fromiter((self._lengths[i] for i in postings), dtype=np.int32, count=len(postings))
+        return ids, tfs, lengths
+
+    def build(self) -> PostingsSegment:
+        terms = sorted(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        ids, tfs, lengths = [], [], []
+        for i, term in enumerate(terms):
+            term_ids, term_tfs, term_lengths = self.postings(term)
+            ids.append(term_ids)
+            tfs.append(term_tfs)
+            lengths.append(term_lengths)
+            offsets[i + 1] = offsets[i] + len(term_ids)
+
+        return PostingsSegment(
+            terms,
+            offsets,
+            np.concatenate(ids) if ids else np.empty(0, np.int64),
+            np.concatenate(tfs) if tfs else np.empty(0, np.int32),
+            np.concatenate(lengths) if lengths else np.empty(0, np.int32),
+            np.fromiter(self._lengths.keys(), dtype=np.int64, count=len(self._lengths)),
+            np.fromiter(self._lengths.values(), dtype=np.int32, count=len(self._lengths)),
+        )
+
+
+def bm25_search(
+    query: str,
+    postings: list,
+    top_k: int | None,
+    exclude: np.ndarray | None = None,
+    k1: float = 1.2,
+    b: float = 0.75
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    BM25 over several postings segments (PostingsSegment or PostingsBuilder).
+
+    Returns:
+        (scores, ids) of the best `top_k` chunks (every match if None), best first
+    """
+    num_docs = sum(p.num_docs for p in postings)
+    if num_docs == 0:
+        return np.empty(0, np.float32), np.empty(0, np.int64)
+    avg_length = sum(p.total_length for p in postings) / num_docs
+
+    all_ids, all_scores = [], []
+    for term in query_terms(query):
+        term_postings = [p.postings(term) for p in postings]
+        ids = np.concatenate([ids for ids, _, _ in term_postings])
+        if not len(ids):
+            continue
+        tfs = np.concatenate([tfs for _, tfs, _ in term_postings]).astype(np.float32)
+        lengths = np.concatenate([lengths for _, _, lengths in term_postings]).astype(np.float32)
+
+        idf = np.log(1 + (num_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+        all_scores.append(idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * lengths / avg_length)))
+        all_ids.append(ids)
+
+    if not all_ids:
+        return np.empty(0, np.float32), np.empty(0, np.int64)
+
+    ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+    scores = np.zeros(len(ids), dtype=np.float32)
+    np.add.at(scores, inverse, np.concatenate(all_scores))
+
+    if exclude is not None and len(exclude):
+        keep = ~np.isin(ids, exclude)
+        ids, scores = ids[keep], scores[keep]
+
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return scores[order], ids[order]
@@ -0,0 +1,41 @@
+"""
+Admission control for the async API.
+
+A RequestLimiter lets `max_active` requests run at once and up to
+`max_waiting` more wait for a slot. Anything beyond that is rejected
+straight away with Overloaded, which the API turns into HTTP 429, so a
+burst of clients gets fast rejections instead of piling up unbounded work
+and timing out.
+"""
+
+import asyncio
+
+
+class Overloaded(Exception):
+    pass
+
+
+class RequestLimiter:
+    def __init__(self, max_active: int, max_waiting: int):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self._slots = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+
+    async def __aenter__(self):
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            raise Overloaded(f"Too many requests ({self.active} running, {self.waiting} queued)")
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self._slots.release()
+        return False
@@ -1,6 +1,8 @@
 from app.llm_providers.openai_provider import OpenAIProvider
 from app.llm_providers.gemini_provider import GeminiProvider
 from app.llm_providers.hf_provider import HuggingFaceProvider
+from app.llm_providers.fake_provider import FakeProvider
+from app.llm_providers.registry import DEFAULT_MODELS, ProviderRegistry
 
 
 def get_llm_provider(
@@ -8,15 +10,25 @@ def get_llm_provider(
     api_key: str | None = None,
     model: str | None = None
 ):
+    """
+    Build a new provider instance. Use provider_registry.get() to reuse one.
+    """
     provider = provider.lower()
 
     if provider == "openai":
-        return OpenAIProvider(api_key=api_key, model=model or "gpt-4o-mini")
+        return OpenAIProvider(api_key=api_key, model=model or DEFAULT_MODELS["openai"])
 
     if provider == "gemini":
-        return GeminiProvider(api_key=api_key, model=model or "gemini-1.5-flash")
+        return GeminiProvider(api_key=api_key, model=model or DEFAULT_MODELS["gemini"])
 
     if provider == "huggingface":
-        return HuggingFaceProvider(model_name=model or "google/flan-t5-base")
+        return HuggingFaceProvider(model_name=model or DEFAULT_MODELS["huggingface"])
+
+    if provider == "fake":
+        return FakeProvider()
 
     raise ValueError(f"Unsupported provider: {provider}")
+
+
+# Shared by the API and RAGPipeline so a model is loaded once per process
+provider_registry = ProviderRegistry(get_llm_provider)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 
 class BaseLLMProvider(ABC):
@@ -6,9 +7,33 @@ class BaseLLMProvider(ABC):
     Abstract base class for all LLM providers.
     """
 
+    # True when generate_batch() runs prompts together (e.g. one padded
+    # forward pass); otherwise callers get more from concurrent generate() calls
+    batched = False
+
     @abstractmethod
     def generate(self, prompt: str) -> str:
         """
         Generate a response for the given prompt.
         """
         pass
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the response in pieces as they are generated.
+        Providers without streaming support yield the full answer once.
+        """
+        yield self.generate(prompt)
+
+    def generate_batch(self, prompts: list[str]) -> list[str]:
+        """
+        Generate a response for each prompt, in order.
+        """
+        return [self.generate(prompt) for prompt in prompts]
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Token count for metrics. Providers without a local tokenizer
+        approximate with whitespace-separated words.
+        """
+        return len(text.split())
@@ -0,0 +1,25 @@
+import time
+from typing import Iterator
+
+from app.llm_providers.base import BaseLLMProvider
+
+
+class FakeProvider(BaseLLMProvider):
+    """
+    Local stand-in for a real LLM (tests, benchmarks, UI work).
+    Answers with a fixed text, or echoes the end of the prompt.
+    """
+
+    def __init__(self, answer: str | None = None, token_delay: float = 0.0):
+        self.answer = answer
+        self.token_delay = token_delay
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        answer = self.answer or "Answer based on: " + " ".join(prompt.split()[-20:])
+        for i, word in enumerate(answer.split(" ")):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
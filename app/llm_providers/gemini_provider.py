@@ -1,3 +1,5 @@
+from typing import Iterator
+
 try:
     from google import genai
 except ImportError:
@@ -23,3 +25,11 @@ class GeminiProvider(BaseLLMProvider):
             contents=prompt
         )
         return response.text.strip()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt
+        ):
+            if chunk.text:
+                yield chunk.text
@@ -1,8 +1,13 @@
-from transformers import pipeline
+import threading
+from typing import Iterator
+
+from transformers import AutoTokenizer, TextIteratorStreamer, pipeline
 from app.llm_providers.base import BaseLLMProvider
 
 
 class HuggingFaceProvider(BaseLLMProvider):
+    batched = True
+
     def __init__(self, model_name: str = "google/flan-t5-base"):
         self.pipe = pipeline(
             "text2text-generation",
@@ -12,7 +17,53 @@ class HuggingFaceProvider(BaseLLMProvider):
             repetition_penalty=1.2, 
             do_sample=False  
         )
+        # Weights held in memory, used by the registry's memory cap
+        self.memory_bytes = sum(
+            p.numel() * p.element_size() for p in self.pipe.model.parameters()
+        )
+        # One instance is shared by concurrent requests; the pipeline is not thread-safe
+        self._lock = threading.Lock()
+        # Token counting has its own tokenizer, so metrics never wait for a generation.
+        # A fast tokenizer used from two threads at once fails with "Already borrowed".
+        self._count_tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._count_lock = threading.Lock()
 
     def generate(self, prompt: str) -> str:
-        output = self.pipe(prompt)
+        with self._lock:
+            output = self.pipe(prompt)
         return output[0]["generated_text"].strip()
+
+    def generate_batch(self, prompts: list[str]) -> list[str]:
+        # One padded forward pass per batch instead of one per prompt
+        with self._lock:
+            outputs = self.pipe(prompts, batch_size=len(prompts))
+        return [output["generated_text"].strip() for output in outputs]
+
+    def count_tokens(self, text: str) -> int:
+        with self._count_lock:
+            return len(self._count_tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        streamer = TextIteratorStreamer(
+            self.pipe.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        errors = []
+
+        def run():
+            try:
+                with self._lock:
+                    # Streaming needs greedy decoding (one beam)
+                    self.pipe(prompt, streamer=streamer, num_beams=1)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        # generate() runs in its own thread and pushes text into the streamer
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        for text in streamer:
+            if text:
+                yield text
+        thread.join()
+        if errors:
+            raise errors[0]
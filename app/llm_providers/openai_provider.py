@@ -1,3 +1,5 @@
+from typing import Iterator
+
 try:
     from openai import OpenAI
 except ImportError:
@@ -23,3 +25,14 @@ class OpenAIProvider(BaseLLMProvider):
             temperature=0.2,
         )
         return response.choices[0].message.content.strip()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
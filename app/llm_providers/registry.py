@@ -0,0 +1,98 @@
+"""
+Cache of ready-to-use LLM provider instances.
+
+Building a provider is expensive: HuggingFaceProvider loads a whole model
+and the API clients set up their own HTTP connection pools. The registry
+keeps built instances keyed by (provider, model, API key fingerprint),
+so repeated requests reuse the loaded model and the open connections.
+
+Least recently used instances are evicted when there are more than
+`max_instances`, or when local models together take more than
+`max_local_bytes`. API keys are never stored in the key, only a hash.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.llm_providers.base import BaseLLMProvider
+
+DEFAULT_MODELS = {
+    "openai": "gpt-4o-mini",
+    "gemini": "gemini-1.5-flash",
+    "huggingface": "google/flan-t5-base",
+}
+
+
+def key_fingerprint(api_key: str | None) -> str | None:
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class ProviderRegistry:
+    def __init__(self, factory, max_instances: int = 16, max_local_bytes: int = 4 * 1024**3):
+        """
+        Args:
+            factory (callable): (provider, api_key, model) -> BaseLLMProvider
+            max_instances (int): most providers kept at once
+            max_local_bytes (int): memory budget for local model weights
+        """
+        self.factory = factory
+        self.max_instances = max_instances
+        self.max_local_bytes = max_local_bytes
+
+        self._instances = OrderedDict()  # key -> provider, least recently used first
+        self._lock = threading.Lock()
+        self._building = {}              # key -> lock, so one model is never loaded twice
+
+    def get(self, provider: str, api_key: str | None = None, model: str | None = None) -> BaseLLMProvider:
+        provider = provider.lower()
+        model = model or DEFAULT_MODELS.get(provider)
+        key = (provider, model, key_fingerprint(api_key))
+
+        instance = self._lookup(key)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another request may have built it while we waited
+            instance = self._lookup(key)
+            if instance is None:
+                instance = self.factory(provider, api_key=api_key, model=model)
+                with self._lock:
+                    self._instances[key] = instance
+                    self._evict(keep=key)
+            with self._lock:
+                self._building.pop(key, None)
+        return instance
+
+    def _lookup(self, key: tuple) -> BaseLLMProvider | None:
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is not None:
+                self._instances.move_to_end(key)
+            return instance
+
+    def _evict(self, keep: tuple):
+        def local_bytes() -> int:
+            return sum(getattr(p, "memory_bytes", 0) for p in self._instances.values())
+
+        for key in list(self._instances):
+            if len(self._instances) <= self.max_instances and local_bytes() <= self.max_local_bytes:
+                break
+            if key == keep:
+                continue
+            # Requests still holding the instance keep using it; it is freed after them
+            evicted = self._instances.pop(key)
+            print(f"Evicted LLM provider {key[0]}/{key[1]} ({getattr(evicted, 'memory_bytes', 0) / 1e6:.0f} MB)")
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+
+    def __len__(self):
+        return len(self._instances)
@@ -0,0 +1,214 @@
+"""
+Process-wide metrics in the Prometheus text format.
+
+    with span("embed"):                       # time one stage of a query
+        ...
+    QUERY_STAGE_SECONDS.observe(0.012, stage="search")
+    LLM_TOKENS.inc(42, provider="HuggingFaceProvider", kind="completion")
+    REGISTRY.render()                         # served by GET /metrics
+
+Counters, gauges and histograms are plain dicts behind one lock each, so
+recording a value costs about a microsecond and can stay on in
+production. Counters and gauges can instead be given a function that
+is evaluated only when /metrics is scraped (index size, cache hits).
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond FAISS searches up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set_function(self, function):
+        """
+        Compute the value at scrape time instead of recording it.
+
+        Args:
+            function (callable): returns a number, or a dict of
+                                 label values tuple -> number for labelled metrics
+        """
+        self._function = function
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _samples(self) -> list[tuple[str, tuple, str, float]]:
+        """
+        Returns:
+            list of (suffix, label values, extra label, value)
+        """
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception as e:
+                print(f"Metric {self.name} failed: {e}")
+                return []
+            if isinstance(value, dict):
+                return [("", key, "", v) for key, v in value.items()]
+            return [("", (), "", value)]
+
+        with self._lock:
+            return [("", key, "", value) for key, value in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (not cumulative) + overflow, sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self) -> list[tuple[str, tuple, str, float]]:
+        with self._lock:
+            snapshot = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        samples = []
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", key, f'le="{_format_value(float(bound))}"', cumulative))
+            samples.append(("_sum", key, "", total))
+            samples.append(("_count", key, "", cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering returns the existing metric (modules imported twice, reloads)
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ---------- metrics shared by the app ----------
+
+QUERY_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_query_stage_seconds",
+    "Time spent in each stage of answering a question (embed, search, prompt, llm, llm_first_token)",
+    ("stage",)
+)
+QUERY_BATCH_SIZE = REGISTRY.histogram(
+    "rag_query_batch_size", "Questions embedded and searched together",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+INGEST_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_ingest_stage_seconds",
+    "Time per ingestion stage: per job (extract, embed, index, save) or per call (load_pdf, split_text)",
+    ("stage",)
+)
+INGEST_PAGES = REGISTRY.counter("rag_ingest_pages_total", "PDF pages extracted")
+INGEST_CHUNKS = REGISTRY.counter("rag_ingest_chunks_total", "Chunks embedded and added to the index")
+INGEST_JOBS = REGISTRY.counter("rag_ingest_jobs_total", "Finished ingestion jobs", ("status",))
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "Tokens sent to (prompt) and generated by (completion) the LLM",
+    ("provider", "kind")
+)
+SHARD_REQUESTS = REGISTRY.counter(
+    "rag_shard_requests_total", "Scatter-gather shard searches by result (ok, error, timeout, busy)", ("shard", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+
+
+@contextmanager
+def span(stage: str, histogram: Histogram = QUERY_STAGE_SECONDS):
+    """
+    Time the enclosed block into `histogram` under the given stage label.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, stage=stage)
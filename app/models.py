@@ -0,0 +1,72 @@
+"""
+Process-wide registry of shared embedding models.
+
+Every EmbeddingGenerator holds its own copy of the transformer, so the
+API, the query batcher, the ingest jobs and RAGPipeline must all use the
+same instance. model_registry.embedder() builds one the first time it is
+asked for a (model, backend, cache) combination and returns that instance
+from then on; concurrent callers wait for the one load instead of loading
+the model twice.
+
+LLM providers have their own cache (app/llm_providers/registry.py).
+"""
+
+import threading
+import time
+
+from app.embeddings import EmbeddingGenerator
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._instances = {}  # key -> model
+        self._lock = threading.Lock()
+        self._building = {}   # key -> lock, so one model is never loaded twice
+        self.load_seconds = {}
+
+    def get(self, key: tuple, factory):
+        """
+        Shared instance for `key`, built with factory() on first use.
+        """
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is not None:
+                return instance
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another thread may have built it while we waited
+            with self._lock:
+                instance = self._instances.get(key)
+            if instance is None:
+                start_time = time.perf_counter()
+                instance = factory()
+                with self._lock:
+                    self._instances[key] = instance
+                    self.load_seconds[key] = time.perf_counter() - start_time
+                print(f"Loaded {key[0]} {key[1]} in {self.load_seconds[key]:.1f}s")
+            with self._lock:
+                self._building.pop(key, None)
+        return instance
+
+    def embedder(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        backend: str = "torch",
+        cache_dir: str | None = None
+    ) -> EmbeddingGenerator:
+        """
+        The shared EmbeddingGenerator for this model, backend and cache directory.
+        """
+        return self.get(
+            ("embedder", model_name, backend, cache_dir),
+            lambda: EmbeddingGenerator(model_name=model_name, cache_dir=cache_dir, backend=backend)
+        )
+
+    def __len__(self):
+        return len(self._instances)
+
+
+model_registry = ModelRegistry()
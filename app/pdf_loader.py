@@ -1,5 +1,14 @@
+import hashlib
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
 from pypdf import PdfReader
 
+from app.metrics import INGEST_STAGE_SECONDS, span
+
 def load_pdf(pdf_path: str) -> str:
     """
     Load a PDF file and extract text from all pages.
@@ -11,15 +20,117 @@ def load_pdf(pdf_path: str) -> str:
         str: Extracted text from the PDF
     """
 
+    with span("load_pdf", INGEST_STAGE_SECONDS):
+        reader = PdfReader(pdf_path)
+        full_text = [text for _, text in _iter_reader_pages(reader, 0, len(reader.pages))]
+    print(f"Total pages in PDF: {len(reader.pages)}")
+    return "\n".join(full_text)
+
+
+def document_id(pdf_path: str) -> str:
+    """
+    Content hash of a PDF: the same file always gets the same ID,
+    whatever its name.
+    """
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def count_pages(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def iter_pages(
+    pdf_path: str,
+    start_page: int = 0,
+    end_page: int | None = None
+) -> Iterator[tuple[int, str]]:
+    """
+    Stream the text of a PDF page by page.
+
+    Only one page of text is held at a time, so this works on manuals with
+    thousands of pages.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        start_page (int): first page to extract (0-based)
+        end_page (int | None): stop before this page (defaults to the last page)
+
+    Yields:
+        (page_num, text) for every page that has text
+    """
     reader = PdfReader(pdf_path)
-    full_text = []
+    end_page = len(reader.pages) if end_page is None else min(end_page, len(reader.pages))
+    yield from _iter_reader_pages(reader, start_page, end_page)
 
-    for page_num, page in enumerate(reader.pages):
-        text = page.extract_text()
+
+def _iter_reader_pages(reader: PdfReader, start_page: int, end_page: int) -> Iterator[tuple[int, str]]:
+    for page_num in range(start_page, end_page):
+        text = reader.pages[page_num].extract_text()
 
         if text:
-            full_text.append(text)
+            yield page_num, text
         else:
             print(f"Warning: No text found on page {page_num + 1}")
-    print(f"Total pages in PDF: {len(reader.pages)}")
-    return "\n".join(full_text)
+
+
+def _extract_page_range(task: tuple[str, int, int]) -> list[tuple[int, str]]:
+    # Runs inside a worker process
+    pdf_path, start_page, end_page = task
+    return list(iter_pages(pdf_path, start_page, end_page))
+
+
+def iter_pages_parallel(
+    pdf_paths: list[str],
+    max_workers: int | None = None,
+    pages_per_task: int = 50
+) -> Iterator[tuple[str, int, str]]:
+    """
+    Extract many PDFs in a process pool and stream their pages in order.
+
+    Every PDF is cut into page ranges of `pages_per_task`, so one big PDF is
+    also spread over several cores. Only about two tasks per worker are in
+    flight at a time; the next range is submitted when the caller consumes
+    the oldest one. The caller can chunk and embed while the pool keeps
+    extracting, and memory stays bounded.
+
+    Args:
+        pdf_paths (list[str]): PDFs to extract
+        max_workers (int | None): worker processes (defaults to os.cpu_count())
+        pages_per_task (int): pages extracted by one task
+
+    Yields:
+        (pdf_path, page_num, text), documents in the given order, pages in page order
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    def tasks():
+        for pdf_path in pdf_paths:
+            num_pages = count_pages(pdf_path)
+            for start in range(0, num_pages, pages_per_task):
+                yield pdf_path, start, start + pages_per_task
+
+    # spawn: forking a process that already runs torch threads can deadlock
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        pending = deque()
+        task_iter = tasks()
+
+        def submit_next():
+            task = next(task_iter, None)
+            if task is not None:
+                pending.append((task[0], pool.submit(_extract_page_range, task)))
+
+        for _ in range(max_workers * 2):
+            submit_next()
+
+        while pending:
+            pdf_path, future = pending.popleft()
+            pages = future.result()
+            submit_next()
+
+            for page_num, text in pages:
+                yield pdf_path, page_num, text
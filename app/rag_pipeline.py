@@ -1,6 +1,29 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+
+import numpy as np
+
+from app.answer_cache import AnswerCache
+from app.batching import QueryBatcher
 from app.embeddings import EmbeddingGenerator
+from app.metrics import LLM_TOKENS, QUERY_STAGE_SECONDS, span
+from app.models import model_registry
 from app.retriever import FAISSRetriever
-from app.llm_providers import get_llm_provider
+from app.llm_providers import provider_registry
+from app.llm_providers.base import BaseLLMProvider
+
+# answer_batch() argument left out (as opposed to an explicit None, which disables the cache)
+_DEFAULT = object()
+
+
+def is_partial(results: list[dict]) -> bool:
+    """
+    Hits from a search some shards did not answer (see app/sharding.py); answers
+    built on them are returned but not cached.
+    """
+    return getattr(results, "partial", False)
+
 
 class RAGPipeline:
     """
@@ -16,16 +39,47 @@ class RAGPipeline:
         retriever: FAISSRetriever,
         provider: str = "huggingface",
         api_key: str | None = None,
-        model: str | None = None
+        model: str | None = None,
+        query_batching: bool = False,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        answer_cache: AnswerCache | None = None,
+        hybrid: bool = False,
+        embedder: EmbeddingGenerator | None = None
     ):
+        """
+        Args:
+            query_batching (bool): batch concurrent retrievals together (see app/batching.py)
+            max_batch_size (int): most questions embedded and searched in one batch
+            max_wait_ms (float): how long a batch waits for more questions
+            answer_cache (AnswerCache | None): reuse answers to repeated questions
+                                               (used when no per-call llm is given)
+            hybrid (bool): rank chunks by BM25 + cosine instead of cosine only
+            embedder (EmbeddingGenerator | None): defaults to the process-wide shared one
+        """
         self.retriever = retriever
-        self.embedder = EmbeddingGenerator()
+        self.embedder = embedder or model_registry.embedder()
+
+        self.answer_cache = answer_cache
+        self.hybrid = hybrid
+        self.batcher = None
+        if query_batching:
+            self.batcher = QueryBatcher(self.embedder, retriever, max_batch_size, max_wait_ms, hybrid)
+
+        # The LLM is loaded on first use, not here
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
 
-        # Initialize LLM provider dynamically
-        self.llm = get_llm_provider(
-            provider=provider,
-            api_key=api_key,
-            model=model
+    @property
+    def llm(self) -> BaseLLMProvider:
+        """
+        Default provider, from the shared registry (loaded on first access).
+        """
+        return provider_registry.get(
+            provider=self.provider,
+            api_key=self.api_key,
+            model=self.model
         )
 
     def build_prompt(self, context_chunks: list[str], question: str) -> str:
@@ -53,43 +107,288 @@ ANSWER:
 """
         return prompt.strip()
 
-    def answer_question(self, question: str, top_k: int = 3) -> str:
+    def answer_question(
+        self,
+        question: str,
+        top_k: int = 3,
+        llm: BaseLLMProvider | None = None
+    ) -> str:
         """
         Full RAG flow:
         - Embed question
         - Retrieve chunks
         - Build prompt
         - Call LLM
+
+        Args:
+            llm (BaseLLMProvider | None): provider for this call only
+                                          (defaults to self.llm; never stored)
         """
 
+        cache = self.answer_cache if llm is None else None
+        if cache is not None:
+            generation = cache.generation
+            answer = cache.get(question, namespace=("default", top_k))
+            if answer is not None:
+                return answer
+
+        results, query_embedding = self.retrieve_with_embedding(question, top_k=top_k)
+        if cache is not None:
+            answer = cache.get(question, namespace=("default", top_k), query_embedding=query_embedding)
+            if answer is not None:
+                return answer
+
+        answer = self.generate_answer(question, results, llm=llm)
+        if cache is not None and not is_partial(results):
+            cache.put(
+                question, answer, namespace=("default", top_k), query_embedding=query_embedding,
+                generation=generation
+            )
+        return answer
+
+    def answer_batch(
+        self,
+        questions: list[str],
+        top_k: int = 3,
+        llm: BaseLLMProvider | None = None,
+        retriever: FAISSRetriever | None = None,
+        answer_cache: AnswerCache | None = _DEFAULT,
+        namespace=None,
+        max_workers: int = 4,
+        block_size: int = 256,
+        llm_batch_size: int = 8
+    ) -> Iterator[dict]:
+        """
+        Answer many questions with batched retrieval.
+
+        Questions are processed in blocks of `block_size`: each block is
+        embedded in batched passes and searched with one query matrix. The LLM
+        calls then run `max_workers` at a time, or in batches of
+        `llm_batch_size` prompts for providers with batched generation.
+
+        Args:
+            retriever (FAISSRetriever | None): index to search (defaults to self.retriever)
+            answer_cache (AnswerCache | None): cache to read and fill, None for no cache;
+                                               left out, self.answer_cache is used when
+                                               neither llm nor retriever is given
+            namespace: answer cache namespace (see AnswerCache)
+
+        Yields:
+            {"index", "question", "answer", "cached", "partial", "results"} per question, or
+            {"index", "question", "error"}, in completion order
+        """
+        if answer_cache is _DEFAULT:
+            # self.answer_cache only holds answers of the default provider on self.retriever
+            answer_cache = None
+            if llm is None and retriever in (None, self.retriever):
+                answer_cache, namespace = self.answer_cache, ("default", top_k)
+        llm = llm or self.llm
+        if retriever is None:
+            retriever = self.retriever
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-llm") as pool:
+            for start in range(0, len(questions), block_size):
+                block = list(enumerate(questions[start:start + block_size], start))
+                yield from self._answer_block(
+                    block, top_k, llm, retriever, answer_cache, namespace, pool, llm_batch_size
+                )
+
+    def _answer_block(
+        self,
+        block: list[tuple[int, str]],
+        top_k: int,
+        llm: BaseLLMProvider,
+        retriever: FAISSRetriever,
+        answer_cache: AnswerCache | None,
+        namespace,
+        pool: ThreadPoolExecutor,
+        llm_batch_size: int
+    ) -> Iterator[dict]:
+        def record(i, question, answer, results, cached=False) -> dict:
+            return {
+                "index": i,
+                "question": question,
+                "answer": answer,
+                "cached": cached,
+                "partial": is_partial(results),
+                "results": [{"score": r["score"], "text": r["text"][:200]} for r in results],
+            }
+
+        # Answers are only cached if the index is unchanged since this point
+        generation = answer_cache.generation if answer_cache is not None else None
+
+        # Exact repeats need no retrieval at all
+        pending = []
+        for i, question in block:
+            answer = answer_cache.get(question, namespace) if answer_cache is not None else None
+            if answer is not None:
+                yield record(i, question, answer, [], cached=True)
+            else:
+                pending.append((i, question))
+        if not pending:
+            return
+
+        texts = [question for _, question in pending]
+        with span("embed"):
+            query_embeddings = self.embedder.embed_texts(texts).numpy()
+        with span("search"):
+            all_results = retriever.search_batch(
+                query_embeddings, top_k=top_k, query_texts=texts if self.hybrid else None
+            )
+
+        prompts = []  # (i, question, results, embedding, prompt)
+        for (i, question), results, embedding in zip(pending, all_results, query_embeddings):
+            if answer_cache is not None:
+                answer = answer_cache.get(question, namespace, embedding)
+                if answer is not None:
+                    yield record(i, question, answer, results, cached=True)
+                    continue
+
+            prompt, fallback = self.prepare_prompt(question, results)
+            if prompt is None:
+                if answer_cache is not None and not is_partial(results):
+                    answer_cache.put(question, fallback, namespace, embedding, generation)
+                yield record(i, question, fallback, results)
+            else:
+                prompts.append((i, question, results, embedding, prompt))
+
+        def generate(items: list[tuple]) -> list[str]:
+            with span("llm"):
+                if llm.batched:
+                    answers = llm.generate_batch([item[4] for item in items])
+                else:
+                    answers = [llm.generate(items[0][4])]
+            for item, answer in zip(items, answers):
+                self.count_tokens(llm, item[4], answer)
+            return answers
+
+        group_size = llm_batch_size if llm.batched else 1
+        groups = [prompts[g:g + group_size] for g in range(0, len(prompts), group_size)]
+        futures = {pool.submit(generate, group): group for group in groups}
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                answers = future.result()
+            except Exception as e:
+                for i, question, *_ in group:
+                    yield {"index": i, "question": question, "error": str(e)}
+                continue
+
+            for (i, question, results, embedding, _), answer in zip(group, answers):
+                if answer_cache is not None and not is_partial(results):
+                    answer_cache.put(question, answer, namespace, embedding, generation)
+                yield record(i, question, answer, results)
+
+    def retrieve(self, question: str, top_k: int = 3) -> list[dict]:
+        """
+        Embedding + FAISS search (the CPU-bound retrieval stage).
+        """
+        return self.retrieve_with_embedding(question, top_k)[0]
+
+    def retrieve_with_embedding(self, question: str, top_k: int = 3) -> tuple[list[dict], np.ndarray]:
+        """
+        Like retrieve(), also returning the question embedding (for the answer cache).
+        """
+        if self.batcher is not None:
+            return self.batcher.submit(question, top_k).result()
+
         # Step 1: Embed the user question
-        query_embedding = self.embedder.embed_texts([question]).numpy()
+        with span("embed"):
+            query_embedding = self.embedder.embed_texts([question]).numpy()
 
         # Step 2: Retrieve top-k relevant chunks
-        results = self.retriever.search(query_embedding, top_k=top_k)
+        with span("search"):
+            results = self.retriever.search_batch(
+                query_embedding, top_k=top_k, query_texts=[question] if self.hybrid else None
+            )[0]
+        return results, query_embedding[0]
+
+    def generate_answer(
+        self,
+        question: str,
+        results: list[dict],
+        llm: BaseLLMProvider | None = None
+    ) -> str:
+        """
+        Relevance check, prompt building and the LLM call.
+        """
+        llm = llm or self.llm
+
+        prompt, fallback = self.prepare_prompt(question, results)
+        if prompt is None:
+            return fallback
+
+        # Step 4: Call LLM (mocked here)
+        with span("llm"):
+            answer = llm.generate(prompt)
 
+        self.count_tokens(llm, prompt, answer)
+        return answer
+
+    def stream_answer(
+        self,
+        question: str,
+        results: list[dict],
+        llm: BaseLLMProvider | None = None
+    ) -> Iterator[str]:
+        """
+        Same as generate_answer, but yields the answer as it is generated.
+        """
+        llm = llm or self.llm
+
+        prompt, fallback = self.prepare_prompt(question, results)
+        if prompt is None:
+            yield fallback
+            return
+
+        start = time.perf_counter()
+        pieces = []
+        for piece in llm.stream(prompt):
+            if not pieces:
+                QUERY_STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_first_token")
+            pieces.append(piece)
+            yield piece
+        QUERY_STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm")
+
+        self.count_tokens(llm, prompt, "".join(pieces))
+
+    @staticmethod
+    def count_tokens(llm: BaseLLMProvider, prompt: str, answer: str):
+        provider = type(llm).__name__
+        LLM_TOKENS.inc(llm.count_tokens(prompt), provider=provider, kind="prompt")
+        LLM_TOKENS.inc(llm.count_tokens(answer), provider=provider, kind="completion")
+
+    def prepare_prompt(self, question: str, results: list[dict]) -> tuple[str | None, str | None]:
+        """
+        Returns:
+            (prompt, None), or (None, fallback answer) when nothing relevant was found
+        """
+        with span("prompt"):
+            return self._prepare_prompt(question, results)
+
+    def _prepare_prompt(self, question: str, results: list[dict]) -> tuple[str | None, str | None]:
         if not results:
-            return "No relevant information found."
+            return None, "No relevant information found."
         
         for i, r in enumerate(results):
             print(f"Result {i} | Score: {r['score']:.4f}")
 
         # 🔑 RELEVANCE CHECK
-        best_score = results[0]["score"]
+        # On the cosine similarity: hybrid "score" is a rank fusion score, not a similarity
+        relevance = [res.get("cosine", res["score"]) for res in results]
+        best_score = max(relevance)
         
         if best_score < 0.3:   # threshold (tunable)
-            return "The provided document does not contain information related to your question."
+            return None, "The provided document does not contain information related to your question."
 
 
-        context_chunks = [res["text"][:800] for res in results[:2]]
+        # Chunks far below the best one only make the prompt longer
+        context_chunks = [
+            res["text"][:800] for res, score in zip(results, relevance) if score >= 0.5 * best_score
+        ][:2]
 
         # Step 3: Build prompt
-        prompt = self.build_prompt(context_chunks, question)
-
-        # Step 4: Call LLM (mocked here)
-        answer = self.llm.generate(prompt)
-
-        return answer
+        return self.build_prompt(context_chunks, question), None
 
     # def call_llm(self, prompt: str) -> str:
     #     """
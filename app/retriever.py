@@ -1,12 +1,37 @@
 """
 FAISS stores only embeddings.
-FAISS automatically assigns IDs: 0, 1, 2, … in the order you add vectors.
+Every vector gets a chunk ID (0, 1, 2, … in the order chunks are added)
+and the chunk text is stored under the same ID.
 
 During search:
-	•	FAISS returns (scores, indices)
-	•	indices[i] tells you which embedding matched
-	•	You use that index to fetch the corresponding text from self.chunks
+	•	FAISS returns (scores, ids)
+	•	ids[i] tells you which embedding matched
+	•	You use that ID to fetch the corresponding text from self.chunks
 
+On disk the index is a set of immutable segments plus a manifest:
+
+    vector_store/
+        manifest.json          – live segments, next chunk ID, index config
+        segments/seg-000001.faiss
+        segments/seg-000002.faiss
+        chunks.db              – chunk texts (see app/chunk_store.py)
+
+New vectors go to an in-memory "active" segment. save() writes it as one
+new small segment file and then atomically replaces the manifest, so the
+cost of a save depends only on what was added, and a crash mid-write
+leaves the previous manifest (and its segments) intact. Search runs over
+every segment and merges the per-segment top-k by score. compact() merges
+small segments into one segment of the configured index type.
+
+Chunks belong to documents (ID = SHA-256 of the PDF). Deleting a document
+removes its texts and records its vector IDs as tombstones in the manifest;
+searches skip them through a FAISS ID selector, and compaction drops them
+for good, so a delete never needs a full re-ingest.
+
+Each segment also has a BM25 postings file (seg-000001.postings.npz, see
+app/lexical_index.py) over the same chunk IDs. search_batch() with
+query_texts fuses the BM25 and cosine rankings, which finds exact tokens such
+as part and clause numbers that embeddings miss.
 """
 
 # import faiss
@@ -88,53 +113,771 @@ During search:
 #         return results
 
 
+import json
+import os
+import threading
+import time
+
 import faiss
 import numpy as np
-import pickle
-import os
+
+from app.chunk_store import ChunkStore
+from app.lexical_index import PostingsBuilder, PostingsSegment, bm25_search
+from app.index_factory import (
+    COMPRESSED_TYPES,
+    all_ids,
+    all_vectors,
+    build_trained_index,
+    index_type_of,
+    search_parameters,
+)
+
+MANIFEST_NAME = "manifest.json"
+SEGMENTS_DIR = "segments"
+# Reciprocal rank fusion constant: damps the difference between the first few ranks
+RRF_K = 60
+
+
+class Segment:
+    """
+    One immutable, ID-mapped FAISS index file and its BM25 postings.
+
+    Segments of a compressed type (fp16, sq8, ivfpq) also keep the exact
+    float32 vectors in seg-N.vectors.npy, memory-mapped, so they cost disk
+    space but almost no RAM. Searches fetch `rerank_factor` times more
+    candidates from the compressed index and re-score them exactly.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        index: faiss.Index,
+        postings: PostingsSegment | None = None,
+        exact: np.ndarray | None = None
+    ):
+        self.name = name
+        self.index = index
+        self.postings = postings
+        self.exact = exact  # float32 vectors in storage order, or None
+        self._exact_rows = None
+
+    @staticmethod
+    def postings_name(name: str) -> str:
+        return name.replace(".faiss", ".postings.npz")
+
+    @staticmethod
+    def vectors_name(name: str) -> str:
+        return name.replace(".faiss", ".vectors.npy")
+
+    @property
+    def size(self) -> int:
+        return self.index.ntotal
+
+    def vectors(self) -> np.ndarray:
+        """
+        Stored vectors in storage order; exact even for compressed types when the side file exists.
+        """
+        if self.exact is not None:
+            return np.array(self.exact)
+        return all_vectors(self.index)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        sel=None,
+        rerank_factor: int = 0
+    ):
+        params = search_parameters(self.index, nprobe, ef_search, sel)
+        top_k = min(top_k, self.size)
+        if self.exact is None or rerank_factor <= 0:
+            return self.index.search(queries, top_k, params=params)
+
+        _, ids = self.index.search(queries, min(top_k * rerank_factor, self.size), params=params)
+        return self._rerank(queries, ids, top_k)
+
+    def _rerank(self, queries: np.ndarray, ids: np.ndarray, top_k: int):
+        if self._exact_rows is None:
+            # chunk ID -> row of the side file
+            segment_ids = all_ids(self.index)
+            order = np.argsort(segment_ids)
+            self._exact_rows = (segment_ids[order], order)
+        sorted_ids, rows = self._exact_rows
+
+        pos = np.minimum(np.searchsorted(sorted_ids, np.maximum(ids, 0)), len(sorted_ids) - 1)
+        candidates = self.exact[rows[pos].ravel()].reshape(*ids.shape, -1)
+        scores = np.einsum("qkd,qd->qk", candidates, queries).astype(np.float32)
+        scores[ids < 0] = -np.inf
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
 
 
 class FAISSRetriever:
-    def __init__(self, embedding_dim: int, index_path: str = "vector_store/index.faiss", meta_path: str = "vector_store/chunks.pkl"):
+    def __init__(
+        self,
+        embedding_dim: int,
+        store_dir: str = "vector_store",
+        index_type: str | None = None,
+        index_params: dict | None = None,
+        small_segment_size: int = 100_000,
+        rerank_factor: int = 4
+    ):
+        """
+        Args:
+            embedding_dim (int): dimension of embedding vectors (e.g. 384 for MiniLM)
+            store_dir (str): directory holding the manifest, segments and chunk texts
+            index_type (str | None): index type for compacted segments
+                                     (defaults to the one saved in the manifest, else flat)
+            index_params (dict | None): parameters for build_index()
+            small_segment_size (int): segments below this size are merged by compact()
+            rerank_factor (int): for compressed segments, candidates fetched per result
+                                 and re-scored with the exact vectors (0 = no re-ranking)
+        """
         self.embedding_dim = embedding_dim
-        self.index_path = index_path
-        self.meta_path = meta_path
-
-        if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
-            # Load existing index
-            self.index = faiss.read_index(self.index_path)
-            with open(self.meta_path, "rb") as f:
-                self.chunks = pickle.load(f)
+        self.store_dir = store_dir
+        self.segments_dir = os.path.join(store_dir, SEGMENTS_DIR)
+        self.manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+        self.small_segment_size = small_segment_size
+        self.rerank_factor = rerank_factor
+
+        os.makedirs(self.segments_dir, exist_ok=True)
+
+        # add/save/compact swap segment lists under this lock; search reads snapshots
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        # Chunk texts live in SQLite and are fetched lazily by ID
+        self.chunks = ChunkStore(os.path.join(store_dir, "chunks.db"))
+
+        self.segments = []
+        self.next_id = 0
+        self.next_segment = 1
+        self.metadata = {}  # free-form state saved with the manifest (e.g. ingest checkpoint)
+        self.index_type = "flat"
+        self.index_params = {}
+        self.deleted_ids = set()  # tombstones: IDs of deleted chunks still inside segments
+        self._deleted_selector = None
+        self._drop_below = None
+        # Bumped whenever the searchable segments change; caches compare against it
+        self.generation = 0
+
+        if os.path.exists(self.manifest_path):
+            self._load_manifest()
         else:
-            # Create new index
-            self.index = faiss.IndexFlatIP(embedding_dim)
-            self.chunks = []
+            self._migrate_legacy_index()
 
-    def add_embeddings(self, embeddings: np.ndarray, chunks: list[str]):
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
-        self.chunks.extend(chunks)
+        if index_type is not None:
+            self.index_type = index_type
+            self.index_params = index_params or {}
+
+        self.active = self._new_active()
+        self.active_postings = PostingsBuilder()
+
+    # ---------- persistence ----------
+
+    def _load_manifest(self):
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        self.next_id = manifest["next_id"]
+        self.next_segment = manifest["next_segment"]
+        self.metadata = manifest.get("metadata", {})
+        self.index_type = manifest.get("index_type", "flat")
+        self.index_params = manifest.get("index_params", {})
+        self.deleted_ids = set(manifest.get("deleted_ids", []))
+        self._update_deleted_selector()
+
+        self.segments = [
+            Segment(entry["name"], faiss.read_index(os.path.join(self.segments_dir, entry["name"])))
+            for entry in manifest["segments"]
+        ]
+
+        # Chunks committed after the last manifest never made it into a segment
+        self.chunks.delete_range(self.next_id)
+        self.chunks.commit()
+
+        self._drop_stray_tombstones()
+
+        for segment in self.segments:
+            self._load_postings(segment)
+            vectors_path = os.path.join(self.segments_dir, Segment.vectors_name(segment.name))
+            if os.path.exists(vectors_path):
+                segment.exact = np.load(vectors_path, mmap_mode="r")
+
+        # Segment files written after the last manifest (or replaced by compaction)
+        live = self._live_segment_files()
+        for name in os.listdir(self.segments_dir):
+            if name not in live:
+                os.remove(os.path.join(self.segments_dir, name))
+
+    def _drop_stray_tombstones(self):
+        # Older versions could tombstone unsaved chunks that never reached a
+        # segment; those would be subtracted from len() forever
+        if not self.deleted_ids:
+            return
+        stored = np.concatenate([all_ids(s.index) for s in self.segments] or [np.empty(0, dtype=np.int64)])
+        tombstones = np.fromiter(self.deleted_ids, dtype=np.int64)
+        stray = tombstones[~np.isin(tombstones, stored)]
+        if len(stray):
+            self.deleted_ids.difference_update(int(i) for i in stray)
+            self._update_deleted_selector()
+            print(f"Dropped {len(stray)} tombstones of chunks that were never saved")
+
+    def _load_postings(self, segment: Segment):
+        path = os.path.join(self.segments_dir, Segment.postings_name(segment.name))
+        if os.path.exists(path):
+            segment.postings = PostingsSegment.load(path)
+            return
+
+        # Segments from before the keyword index: build postings from the stored texts
+        ids = all_ids(segment.index)
+        texts = self.chunks.get_many(ids)
+        live = [(i, text) for i, text in zip(ids, texts) if text is not None]
+        segment.postings = PostingsSegment.from_texts([i for i, _ in live], [t for _, t in live])
+        self._write_postings(segment)
+        print(f"Built keyword index for {segment.name} ({len(live)} chunks)")
+
+    def _live_segment_files(self) -> set[str]:
+        live = set()
+        for segment in self.segments:
+            live.add(segment.name)
+            live.add(Segment.postings_name(segment.name))
+            live.add(Segment.vectors_name(segment.name))
+        return live
+
+    def _migrate_legacy_index(self):
+        """
+        Turn the old single vector_store/index.faiss (+ chunks.pkl) into segment 1.
+        """
+        legacy_index_path = os.path.join(self.store_dir, "index.faiss")
+        legacy_pkl_path = os.path.join(self.store_dir, "chunks.pkl")
+
+        if len(self.chunks) == 0 and os.path.exists(legacy_pkl_path):
+            self.chunks.import_pickle(legacy_pkl_path)
+
+        if not os.path.exists(legacy_index_path):
+            return
+
+        legacy = faiss.read_index(legacy_index_path)
+        vectors = all_vectors(legacy)
+        ids = np.arange(len(vectors), dtype=np.int64)
+
+        # Keep the trained quantizer, only re-add the vectors with explicit IDs
+        legacy.reset()
+        index = faiss.IndexIDMap2(legacy)
+        index.add_with_ids(vectors, ids)
+
+        self.index_type = index_type_of(legacy)
+        self.next_id = len(vectors)
+        postings = PostingsSegment.from_texts(ids, self.chunks.get_many(ids))
+        self.segments = [self._write_segment(index, postings)]
+        self._write_manifest()
+        print(
+            f"Migrated {len(vectors)} vectors from {legacy_index_path} into segments; "
+            "the old file can be deleted"
+        )
+
+    def _write_segment(
+        self,
+        index: faiss.Index,
+        postings: PostingsSegment,
+        exact: np.ndarray | None = None
+    ) -> Segment:
+        """
+        Args:
+            exact (np.ndarray | None): float32 vectors in storage order, kept
+                                       next to compressed index types
+        """
+        name = f"seg-{self.next_segment:06d}.faiss"
+        self.next_segment += 1
+
+        path = os.path.join(self.segments_dir, name)
+        faiss.write_index(index, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+        segment = Segment(name, index, postings)
+        self._write_postings(segment)
+
+        if exact is not None and index_type_of(index) in COMPRESSED_TYPES:
+            vectors_path = os.path.join(self.segments_dir, Segment.vectors_name(name))
+            with open(vectors_path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(exact, dtype=np.float32))
+            os.replace(vectors_path + ".tmp", vectors_path)
+            segment.exact = np.load(vectors_path, mmap_mode="r")
+        return segment
+
+    def _write_postings(self, segment: Segment):
+        path = os.path.join(self.segments_dir, Segment.postings_name(segment.name))
+        segment.postings.save(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def _write_manifest(self):
+        manifest = {
+            "next_id": self.next_id,
+            "next_segment": self.next_segment,
+            "embedding_dim": self.embedding_dim,
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+            # index_type is what compaction builds; a segment records what it holds
+            # (flat when there were too few vectors to train the configured type)
+            "segments": [
+                {"name": s.name, "size": s.size, "index_type": index_type_of(s.index)}
+                for s in self.segments
+            ],
+            "deleted_ids": sorted(self.deleted_ids),
+            "metadata": self.metadata,
+        }
+
+        # Readers see either the old or the new manifest, never a partial one
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _new_active(self) -> faiss.Index:
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedding_dim))
 
     def save(self):
         """
-        Persist FAISS index and chunks to disk.
+        Persist what was added since the last save as one new segment.
+
+        Order matters for crash safety: chunk texts are committed first, then
+        the segment file is written, and only then does the new manifest make
+        both visible.
+        """
+        with self._lock:
+            self.chunks.commit()
+            if self.active.ntotal:
+                self.segments.append(self._write_segment(self.active, self.active_postings.build()))
+                self.active = self._new_active()
+                self.active_postings = PostingsBuilder()
+            self._write_manifest()
+
+            # After reset(): old chunk texts are dropped once the new manifest is in place
+            if self._drop_below is not None:
+                self.chunks.delete_range(0, self._drop_below)
+                self.chunks.drop_orphan_documents()
+                self.chunks.commit()
+                self._drop_below = None
+
+            self._remove_unused_segment_files()
+
+    def _remove_unused_segment_files(self):
         """
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        Delete files of segments no longer in the manifest. Called with _lock held:
+        a save or compaction in between listing and deleting could have its new
+        segment deleted under a manifest that already points at it.
+        """
+        live = self._live_segment_files()
+        for name in os.listdir(self.segments_dir):
+            if name not in live and not name.endswith(".tmp"):
+                os.remove(os.path.join(self.segments_dir, name))
 
-        faiss.write_index(self.index, self.index_path)
+    # ---------- writes ----------
 
-        with open(self.meta_path, "wb") as f:
-            pickle.dump(self.chunks, f)
+    def add_embeddings(self, embeddings: np.ndarray, chunks: list[str], doc_id: str | None = None):
+        faiss.normalize_L2(embeddings)
 
-    def search(self, query_embedding: np.ndarray, top_k: int = 2):
-        faiss.normalize_L2(query_embedding)
-        scores, indices = self.index.search(query_embedding, top_k)
+        with self._lock:
+            ids = np.arange(self.next_id, self.next_id + len(chunks), dtype=np.int64)
+            self.next_id += len(chunks)
+            self.active.add_with_ids(embeddings, ids)
+            self.active_postings.add(ids, chunks)
+            self.chunks.add(ids, chunks, doc_id)
+            self.generation += 1
+
+    def add_document(self, doc_id: str, filename: str, embeddings: np.ndarray, chunks: list[str]):
+        """
+        Add all chunks of one document and register it (call save() afterwards).
+        """
+        with self._lock:
+            self.add_embeddings(embeddings, chunks, doc_id)
+            self.register_document(doc_id, filename, len(chunks))
+
+    def register_document(self, doc_id: str, filename: str, num_chunks: int):
+        """
+        Mark a document whose chunks were added with add_embeddings(doc_id=...) as complete.
+        """
+        self.chunks.add_document(doc_id, filename, num_chunks)
+
+    def get_document(self, doc_id: str) -> dict | None:
+        return self.chunks.get_document(doc_id)
+
+    def has_document(self, doc_id: str) -> bool:
+        return self.get_document(doc_id) is not None
+
+    def list_documents(self, filename: str | None = None) -> list[dict]:
+        return self.chunks.list_documents(filename)
+
+    def delete_document(self, doc_id: str) -> int:
+        """
+        Remove a document from search (call save() to persist).
+
+        Returns:
+            int: number of chunks removed
+        """
+        with self._lock:
+            ids = np.array(self.chunks.delete_document(doc_id), dtype=np.int64)
+            if len(ids) == 0:
+                return 0
+
+            # Unsaved vectors can simply be removed; saved segments get tombstones.
+            # The boundary is read before remove_ids() shrinks the active segment.
+            active_first_id = self._active_first_id()
+            self.active.remove_ids(faiss.IDSelectorBatch(ids))
+            self.active_postings.remove(ids)
+            self.deleted_ids.update(int(i) for i in ids if i < active_first_id)
+            self._update_deleted_selector()
+            self.generation += 1
+            return len(ids)
+
+    def _active_first_id(self) -> int:
+        return self.next_id - self.active.ntotal
+
+    def _update_deleted_selector(self):
+        if not self.deleted_ids:
+            self._deleted_selector = None
+            return
+        batch = faiss.IDSelectorBatch(np.fromiter(self.deleted_ids, dtype=np.int64))
+        # Keep both objects referenced: the Not selector only points at the batch
+        self._deleted_selector = (faiss.IDSelectorNot(batch), batch)
+
+    def reset(self):
+        """
+        Start over with an empty index (nothing changes on disk until save()).
+        """
+        with self._lock:
+            # Uncommitted until save(), but has_document() stops finding the old documents now
+            self.chunks.delete_all_documents()
+            self.segments = []
+            self.active = self._new_active()
+            self.active_postings = PostingsBuilder()
+            self.deleted_ids = set()
+            self._update_deleted_selector()
+            self._drop_below = self.next_id
+            self.generation += 1
+
+    def compact(self, force: bool = False, min_segments: int = 2) -> bool:
+        """
+        Merge small segments into one segment of the configured index type.
+
+        Vectors are read back from the segments (nothing is re-embedded) and
+        the merged segment is trained on them when the type needs training.
+        Deleted chunks are dropped, and segments where more than a fifth of
+        the vectors are deleted are merged whatever their size.
+        Searches keep using the old segments until the new manifest is written.
+
+        Args:
+            force (bool): merge every segment, whatever its size
+            min_segments (int): merge only if at least this many small segments exist
+
+        Returns:
+            bool: True if segments were merged
+        """
+        with self._compact_lock:
+            segments = list(self.segments)
+            deleted = np.fromiter(self.deleted_ids, dtype=np.int64)
+            if force:
+                to_merge = segments
+            else:
+                to_merge = [s for s in segments if s.size < self.small_segment_size]
+                mostly_deleted = [
+                    s for s in segments
+                    if deleted.size and s not in to_merge
+                    and np.isin(all_ids(s.index), deleted).mean() > 0.2
+                ]
+                if len(to_merge) < min_segments and not mostly_deleted:
+                    return False
+                to_merge += mostly_deleted
+            if not to_merge:
+                return False
+
+            start_time = time.perf_counter()
+            vectors = np.vstack([s.vectors() for s in to_merge])
+            ids = np.concatenate([all_ids(s.index) for s in to_merge])
+            live = ~np.isin(ids, deleted)
+            merged = build_trained_index(
+                self.embedding_dim, vectors[live], ids[live], self.index_type, **self.index_params
+            )
+            merged_postings = PostingsSegment.merge([s.postings for s in to_merge], ids[~live])
+
+            with self._lock:
+                merged_names = {s.name for s in to_merge}
+                new_segment = self._write_segment(merged, merged_postings, vectors[live])
+                self.segments = [s for s in self.segments if s.name not in merged_names] + [new_segment]
+                # Tombstones of dropped vectors are no longer needed
+                self.deleted_ids.difference_update(int(i) for i in ids[~live])
+                self._update_deleted_selector()
+                self._write_manifest()
+                self.generation += 1
+                self._remove_unused_segment_files()
+
+            print(
+                f"Compacted {len(to_merge)} segments ({int(live.sum())} vectors) into "
+                f"{new_segment.name} [{index_type_of(merged)}] in {time.perf_counter() - start_time:.1f}s"
+            )
+            return True
+
+    def rebuild(self, index_type: str, **params):
+        """
+        Migrate every stored vector into one segment of a new index type,
+        e.g. flat -> ivf. Nothing is re-embedded.
+        """
+        self.index_type = index_type
+        self.index_params = params
+        self.save()
+        self.compact(force=True)
+
+    def start_background_compaction(self, interval_seconds: float = 60.0, min_segments: int = 8):
+        """
+        Run compact() periodically in a daemon thread.
+        """
+        def loop():
+            while not self._closed.wait(interval_seconds):
+                try:
+                    self.compact(min_segments=min_segments)
+                except Exception as e:
+                    print(f"Background compaction failed: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True, name="segment-compaction")
+        thread.start()
+        return thread
+
+    def close(self):
+        """
+        Stop background compaction and close the chunk store.
+        Unsaved additions are lost; call save() first.
+        """
+        self._closed.set()
+        with self._compact_lock:
+            self.chunks.close()
+
+    # ---------- reads ----------
+
+    def __len__(self):
+        return sum(s.size for s in self.segments) + self.active.ntotal - len(self.deleted_ids)
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate RAM held by the loaded index: segment and postings files
+        (read fully into memory) plus the unsaved active vectors. Exact-vector
+        side files are memory-mapped and not counted.
+        """
+        total = self.active.ntotal * self.embedding_dim * 4
+        for segment in list(self.segments):
+            for name in (segment.name, Segment.postings_name(segment.name)):
+                try:
+                    total += os.path.getsize(os.path.join(self.segments_dir, name))
+                except OSError:
+                    pass  # removed by a concurrent compaction
+        return total
+
+    def all_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, vectors) of every saved segment.
+        """
+        segments = list(self.segments)
+        if not segments:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.embedding_dim), dtype=np.float32)
+        ids = np.concatenate([all_ids(s.index) for s in segments])
+        vectors = np.vstack([s.vectors() for s in segments])
+        return ids, vectors
+
+    def search_ids(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Search every segment and merge the per-segment top-k by score.
+
+        Returns:
+            (scores, ids), both of shape (num_queries, top_k); missing hits have id -1
+        """
+        faiss.normalize_L2(query_embeddings)
+
+        # Read the selector once; it may be swapped by a concurrent delete
+        deleted_selector = self._deleted_selector
+        sel = deleted_selector[0] if deleted_selector else None
+
+        all_scores = []
+        all_hit_ids = []
+        for segment in list(self.segments):
+            if segment.size:
+                scores, ids = segment.search(
+                    query_embeddings, top_k, nprobe, ef_search, sel, self.rerank_factor
+                )
+                all_scores.append(scores)
+                all_hit_ids.append(ids)
+
+        # The active segment is still being written to, so search it under the lock
+        with self._lock:
+            if self.active.ntotal:
+                scores, ids = self.active.search(query_embeddings, min(top_k, self.active.ntotal))
+                all_scores.append(scores)
+                all_hit_ids.append(ids)
+
+        num_queries = len(query_embeddings)
+        if not all_scores:
+            return (
+                np.full((num_queries, top_k), -np.inf, dtype=np.float32),
+                np.full((num_queries, top_k), -1, dtype=np.int64),
+            )
+
+        scores = np.hstack(all_scores)
+        ids = np.hstack(all_hit_ids)
+        scores[ids < 0] = -np.inf
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+
+        # Pad when the whole store holds fewer than top_k vectors
+        if ids.shape[1] < top_k:
+            pad = top_k - ids.shape[1]
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+        return scores, ids
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 2,
+        nprobe: int | None = None,
+        ef_search: int | None = None
+    ):
+        """
+        Args:
+            nprobe (int | None): ivf/ivfpq clusters to visit for this query
+            ef_search (int | None): hnsw candidate list size for this query
+        """
+        return self.search_batch(query_embedding[:1], top_k, nprobe, ef_search)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 2,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        query_texts: list[str] | None = None,
+        alpha: float = 0.5
+    ) -> list[list[dict]]:
+        """
+        One FAISS search and one chunk lookup for a whole matrix of queries.
+
+        Args:
+            query_texts (list[str] | None): the query strings; when given, chunks are
+                ranked by reciprocal rank fusion of their cosine and BM25 ranks
+            alpha (float): weight of the cosine rank in hybrid ranking
+
+        Returns:
+            list[list[dict]]: {"score", "text"} hits for each query row; in hybrid mode
+                              "score" is the fusion score and "cosine" and "bm25" are added
+                              (relevance thresholds belong on "cosine")
+        """
+        if query_texts is None:
+            scores, ids = self.search_ids(query_embeddings, top_k, nprobe, ef_search)
+
+            # FAISS pads with -1 when fewer than top_k vectors match
+            hits = [
+                [(float(score), int(idx), {}) for score, idx in zip(row_scores, row_ids) if idx >= 0]
+                for row_scores, row_ids in zip(scores, ids)
+            ]
+        else:
+            hits = self._hybrid_hits(query_embeddings, query_texts, top_k, nprobe, ef_search, alpha)
+
+        texts = dict(zip(
+            (idx for row in hits for _, idx, _ in row),
+            self.chunks.get_many([idx for row in hits for _, idx, _ in row])
+        ))
 
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.chunks):
-                results.append({
-                    "score": float(score),
-                    "text": self.chunks[idx]
-                })
+        for row in hits:
+            results.append([
+                {"score": score, "text": texts[idx], **extra}
+                for score, idx, extra in row
+                if texts[idx] is not None
+            ])
         return results
+
+    def _hybrid_hits(
+        self,
+        query_embeddings: np.ndarray,
+        query_texts: list[str],
+        top_k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        alpha: float
+    ) -> list[list[tuple]]:
+        # Both rankers nominate candidates; every candidate then gets both scores.
+        # They are fused by rank (RRF), so neither score's scale matters: a BM25
+        # score is not comparable to a cosine, nor to BM25 scores of other queries.
+        num_candidates = top_k * 4
+        dense_scores, dense_ids = self.search_ids(query_embeddings, num_candidates, nprobe, ef_search)
+        deleted = np.fromiter(self.deleted_ids, dtype=np.int64)
+
+        hits = []
+        for row, query_text in enumerate(query_texts):
+            with self._lock:
+                postings = [s.postings for s in self.segments] + [self.active_postings]
+                bm25_scores, bm25_ids = bm25_search(query_text, postings, None, exclude=deleted)
+
+            cosine = {
+                int(idx): float(score)
+                for score, idx in zip(dense_scores[row], dense_ids[row]) if idx >= 0
+            }
+            candidates = set(cosine) | set(bm25_ids[:num_candidates].tolist())
+            missing = [idx for idx in candidates if idx not in cosine]
+            cosine.update(self._cosine_scores(query_embeddings[row:row + 1], missing, nprobe, ef_search))
+
+            bm25 = dict(zip(bm25_ids.tolist(), bm25_scores.tolist()))
+            bm25_rank = {idx: rank for rank, idx in enumerate(bm25_ids.tolist(), 1)}
+            dense_order = sorted(candidates, key=lambda idx: -cosine.get(idx, 0.0))
+            dense_rank = {idx: rank for rank, idx in enumerate(dense_order, 1)}
+
+            fused = []
+            for idx in candidates:
+                score = alpha / (RRF_K + dense_rank[idx])
+                if idx in bm25_rank:
+                    score += (1 - alpha) / (RRF_K + bm25_rank[idx])
+                fused.append((score, idx, {"cosine": cosine.get(idx, 0.0), "bm25": bm25.get(idx, 0.0)}))
+            fused.sort(key=lambda hit: -hit[0])
+            hits.append(fused[:top_k])
+        return hits
+
+    def _cosine_scores(
+        self,
+        query: np.ndarray,
+        ids: list[int],
+        nprobe: int | None,
+        ef_search: int | None
+    ) -> dict[int, float]:
+        """
+        Cosine similarity of the query to specific chunks, through a search
+        restricted to their IDs. Exact for flat segments; hnsw/ivf may miss
+        some (they count as 0).
+        """
+        if not ids:
+            return {}
+        batch = faiss.IDSelectorBatch(np.array(ids, dtype=np.int64))
+
+        found = {}
+        for segment in list(self.segments):
+            if segment.size:
+                scores, hit_ids = segment.search(query, len(ids), nprobe, ef_search, batch, rerank_factor=1)
+                found.update((int(i), float(s)) for s, i in zip(scores[0], hit_ids[0]) if i >= 0)
+        with self._lock:
+            if self.active.ntotal:
+                scores, hit_ids = self.active.search(
+                    query, min(len(ids), self.active.ntotal), params=faiss.SearchParameters(sel=batch)
+                )
+                found.update((int(i), float(s)) for s, i in zip(scores[0], hit_ids[0]) if i >= 0)
+        return found
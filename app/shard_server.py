@@ -0,0 +1,104 @@
+"""
+HTTP server for one FAISS shard (see app/sharding.py).
+
+    SHARD_STORE_DIR=vector_store/shards/0 uvicorn app.shard_server:app --port 8101
+
+Serves search and document writes for the FAISSRetriever store in
+SHARD_STORE_DIR. Vectors travel as base64 float32 (encode_array).
+"""
+
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from app.retriever import FAISSRetriever
+from app.sharding import decode_array
+
+SHARD_STORE_DIR = os.environ.get("SHARD_STORE_DIR", "vector_store/shards/0")
+EMBEDDING_DIM = int(os.environ.get("EMBEDDING_DIM", "384"))
+
+retriever: FAISSRetriever | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global retriever
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=SHARD_STORE_DIR)
+    retriever.start_background_compaction()
+    print(f"Shard {SHARD_STORE_DIR}: {len(retriever)} chunks")
+    yield
+    retriever.save()
+    retriever.close()
+
+
+app = FastAPI(title="FAISS shard", lifespan=lifespan)
+
+
+class SearchRequest(BaseModel):
+    queries: dict
+    top_k: int = 2
+    nprobe: int | None = None
+    ef_search: int | None = None
+    query_texts: list[str] | None = None
+    alpha: float = 0.5
+
+
+class DocumentRequest(BaseModel):
+    doc_id: str
+    filename: str
+    embeddings: dict
+    chunks: list[str]
+
+
+@app.get("/health")
+def health():
+    return {"chunks": len(retriever), "segments": len(retriever.segments), "generation": retriever.generation}
+
+
+@app.post("/search")
+def search(request: SearchRequest):
+    queries = decode_array(request.queries)
+    if queries.ndim != 2 or queries.shape[1] != retriever.embedding_dim:
+        raise HTTPException(status_code=400, detail=f"Queries must have shape (n, {retriever.embedding_dim})")
+
+    results = retriever.search_batch(
+        queries,
+        top_k=request.top_k,
+        nprobe=request.nprobe,
+        ef_search=request.ef_search,
+        query_texts=request.query_texts,
+        alpha=request.alpha
+    )
+    return {"results": results}
+
+
+@app.get("/documents")
+def list_documents(filename: str | None = None):
+    return {"documents": retriever.list_documents(filename)}
+
+
+@app.get("/documents/{doc_id}")
+def get_document(doc_id: str):
+    return {"document": retriever.get_document(doc_id)}
+
+
+@app.post("/documents")
+def add_document(request: DocumentRequest):
+    embeddings = decode_array(request.embeddings)
+    if len(embeddings) != len(request.chunks):
+        raise HTTPException(status_code=400, detail="One embedding per chunk is required")
+
+    if not retriever.has_document(request.doc_id):
+        retriever.add_document(request.doc_id, request.filename, embeddings, request.chunks)
+        retriever.save()
+    return {"doc_id": request.doc_id, "chunks": len(request.chunks)}
+
+
+@app.delete("/documents/{doc_id}")
+def delete_document(doc_id: str):
+    removed = retriever.delete_document(doc_id)
+    if removed:
+        retriever.save()
+    return {"removed": removed}
@@ -0,0 +1,298 @@
+"""
+Scatter-gather search over FAISS shards.
+
+When a corpus outgrows one machine's RAM, its documents are split across
+shards. Each shard is an ordinary FAISSRetriever store served over HTTP by
+app/shard_server.py. ShardedRetriever is the coordinator:
+
+    search_batch() → POST /search to every shard at once (scatter)
+                   → wait up to `timeout` seconds
+                   → merge the per-shard top-k by score (gather)
+
+Every chunk of a document lives on one shard, chosen by shard_for(doc_id),
+so deleting a document touches only that shard, and each
+shard's top-k holds everything the global top-k can take from it: the
+merged cosine ranking is exact. (In hybrid mode chunks are fused by their
+rank within each shard, so fused scores are only approximately comparable
+across shards.)
+
+A shard that errors or does not answer within the timeout is left out and
+the search returns the other shards' hits, marked with partial = True
+(answers built on them must not be cached); last_status records which
+shards answered. Only when no shard answers does the search fail.
+Requests that time out keep running until their socket timeout; a shard
+with `max_in_flight` of them still running is skipped (counted as busy)
+instead of queueing more, so one slow shard cannot take over the thread
+pool and starve the others.
+
+ShardedRetriever has the search(), search_batch() and document methods of
+FAISSRetriever and returns the same {"score", "text"} hits, so it can be
+passed to RAGPipeline as its retriever.
+"""
+
+import base64
+import json
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+from app.metrics import SHARD_REQUESTS
+
+
+def shard_for(key: str, num_shards: int) -> int:
+    """
+    Shard that owns a document. Document IDs are SHA-256 hex digests, so a
+    prefix is already uniformly distributed.
+    """
+    try:
+        return int(key[:16], 16) % num_shards
+    except ValueError:
+        return sum(key.encode()) % num_shards
+
+
+def encode_array(array: np.ndarray) -> dict:
+    """
+    JSON-safe float32 matrix (base64 of the raw bytes, so no precision is lost).
+    """
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return {"shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode()}
+
+
+def decode_array(payload: dict) -> np.ndarray:
+    data = base64.b64decode(payload["data"])
+    return np.frombuffer(data, dtype=np.float32).reshape(payload["shape"]).copy()
+
+
+class ShardUnavailable(RuntimeError):
+    pass
+
+
+class ShardHits(list):
+    """
+    Merged hits of one query; `partial` is True when some shards were left out.
+    """
+    partial = False
+
+
+class ShardedRetriever:
+    def __init__(
+        self,
+        shard_urls: list[str],
+        embedding_dim: int = 384,
+        timeout: float = 2.0,
+        write_timeout: float = 120.0,
+        max_in_flight: int = 4
+    ):
+        """
+        Args:
+            shard_urls (list[str]): base URLs of the shard servers, e.g. http://10.0.0.5:8101
+                                    (the order defines which shard owns which documents)
+            timeout (float): seconds to wait for the shards' search results; slower ones are left out
+            write_timeout (float): seconds to wait for document writes and listings
+            max_in_flight (int): searches still running on one shard before it is skipped
+        """
+        if not shard_urls:
+            raise ValueError("At least one shard URL is required")
+
+        self.shard_urls = [url.rstrip("/") for url in shard_urls]
+        self.embedding_dim = embedding_dim
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.max_in_flight = max_in_flight
+        # Bumped on every write through the coordinator; AnswerCache compares against it
+        self.generation = 0
+        # Shards that answered the most recent search
+        self.last_status = None
+
+        self._lock = threading.Lock()
+        self._in_flight = {url: 0 for url in self.shard_urls}
+        # Enough threads for every shard's in-flight limit, so no shard waits for another's
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_in_flight * len(self.shard_urls), thread_name_prefix="shard"
+        )
+
+    # ---------- search ----------
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 2,
+        nprobe: int | None = None,
+        ef_search: int | None = None
+    ):
+        return self.search_batch(query_embedding[:1], top_k, nprobe, ef_search)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 2,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        query_texts: list[str] | None = None,
+        alpha: float = 0.5
+    ) -> list[list[dict]]:
+        """
+        Search every shard and merge their hits by score.
+
+        Returns:
+            list[ShardHits]: {"score", "text"} hits for each query row, as FAISSRetriever.search_batch()
+
+        Raises:
+            ShardUnavailable: no shard answered in time
+        """
+        body = {
+            "queries": encode_array(query_embeddings),
+            "top_k": top_k,
+            "nprobe": nprobe,
+            "ef_search": ef_search,
+            "query_texts": query_texts,
+            "alpha": alpha,
+        }
+        futures, failed = {}, {}
+        for url in self.shard_urls:
+            future = self._submit_search(url, body)
+            if future is None:
+                failed[url] = f"{self.max_in_flight} earlier searches still running"
+                SHARD_REQUESTS.inc(shard=url, status="busy")
+            else:
+                futures[future] = url
+        done, not_done = wait(futures, timeout=self.timeout) if futures else (set(), set())
+
+        answered = []
+        for future in done:
+            url = futures[future]
+            try:
+                answered.append(future.result()["results"])
+                SHARD_REQUESTS.inc(shard=url, status="ok")
+            except Exception as e:
+                failed[url] = str(e)
+                SHARD_REQUESTS.inc(shard=url, status="error")
+        for future in not_done:
+            # Left running; its own socket timeout ends it
+            failed[futures[future]] = f"no answer within {self.timeout}s"
+            SHARD_REQUESTS.inc(shard=futures[future], status="timeout")
+
+        self.last_status = {
+            "shards": len(self.shard_urls),
+            "answered": len(answered),
+            "partial": bool(failed),
+            "failed": failed,
+        }
+        if not answered:
+            raise ShardUnavailable(f"No shard answered: {failed}")
+        if failed:
+            print(f"Partial search: {len(answered)}/{len(self.shard_urls)} shards answered ({failed})")
+
+        results = []
+        for row in range(len(query_embeddings)):
+            hits = [hit for shard_results in answered for hit in shard_results[row]]
+            hits.sort(key=lambda hit: -hit["score"])
+            row_hits = ShardHits(hits[:top_k])
+            row_hits.partial = bool(failed)
+            results.append(row_hits)
+        return results
+
+    def _submit_search(self, url: str, body: dict):
+        """
+        Start a search on one shard, or return None while it has max_in_flight running.
+        """
+        with self._lock:
+            if self._in_flight[url] >= self.max_in_flight:
+                return None
+            self._in_flight[url] += 1
+
+        def finished(_):
+            with self._lock:
+                self._in_flight[url] -= 1
+
+        future = self._pool.submit(self._request, url, "/search", "POST", body, self.timeout)
+        future.add_done_callback(finished)
+        return future
+
+    # ---------- writes (routed to the document's shard) ----------
+
+    def shard_url(self, doc_id: str) -> str:
+        return self.shard_urls[shard_for(doc_id, len(self.shard_urls))]
+
+    def add_document(self, doc_id: str, filename: str, embeddings: np.ndarray, chunks: list[str]):
+        """
+        Add all chunks of one document to its shard and register it there (saved by the shard).
+        A new version of a file replaces the old one, which may live on another shard;
+        the old one is deleted only once the new one is stored.
+        """
+        old_versions = [old["doc_id"] for old in self.list_documents(filename) if old["doc_id"] != doc_id]
+
+        self._request(self.shard_url(doc_id), "/documents", "POST", {
+            "doc_id": doc_id,
+            "filename": filename,
+            "embeddings": encode_array(embeddings),
+            "chunks": chunks,
+        })
+        with self._lock:
+            self.generation += 1
+
+        for old_doc_id in old_versions:
+            self.delete_document(old_doc_id)
+
+    def delete_document(self, doc_id: str) -> int:
+        """
+        Returns:
+            int: number of chunks removed
+        """
+        removed = self._request(self.shard_url(doc_id), f"/documents/{doc_id}", method="DELETE")["removed"]
+        with self._lock:
+            self.generation += 1
+        return removed
+
+    def get_document(self, doc_id: str) -> dict | None:
+        return self._request(self.shard_url(doc_id), f"/documents/{doc_id}")["document"]
+
+    def has_document(self, doc_id: str) -> bool:
+        return self.get_document(doc_id) is not None
+
+    def list_documents(self, filename: str | None = None) -> list[dict]:
+        path = "/documents" if filename is None else "/documents?" + urllib.parse.urlencode({"filename": filename})
+        documents = []
+        for url in self.shard_urls:
+            documents.extend(self._request(url, path)["documents"])
+        return sorted(documents, key=lambda document: document["added_at"])
+
+    def shard_stats(self) -> list[dict]:
+        """
+        Chunk count of every shard, or the error that kept it from answering.
+        """
+        stats = []
+        for url in self.shard_urls:
+            try:
+                stats.append({"url": url, **self._request(url, "/health", timeout=self.timeout)})
+            except Exception as e:
+                stats.append({"url": url, "error": str(e)})
+        return stats
+
+    def __len__(self):
+        return sum(stats.get("chunks", 0) for stats in self.shard_stats())
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    # ---------- HTTP ----------
+
+    def _request(
+        self,
+        url: str,
+        path: str,
+        method: str = "GET",
+        body: dict | None = None,
+        timeout: float | None = None
+    ) -> dict:
+        request = urllib.request.Request(
+            url + path,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={"Content-Type": "application/json"},
+            method=method
+        )
+        with urllib.request.urlopen(request, timeout=timeout or self.write_timeout) as response:
+            return json.loads(response.read())
@@ -1,4 +1,25 @@
 import re #regular expressions module
+from typing import Iterable, Iterator
+
+from app.metrics import INGEST_STAGE_SECONDS, span
+
+# Without a configured maximum, Hugging Face tokenizers report int(1e30)
+PLACEHOLDER_MAX_LENGTH = 1_000_000
+DEFAULT_MAX_LENGTH = 512
+
+
+def model_max_length(tokenizer, limit: int | None = None) -> int:
+    """
+    Longest input in tokens (special tokens included) the tokenizer's model takes.
+
+    Args:
+        limit (int | None): the model's own limit (config.max_position_embeddings), used
+                            when the tokenizer reports none or a placeholder
+    """
+    length = getattr(tokenizer, "model_max_length", None)
+    if not length or length >= PLACEHOLDER_MAX_LENGTH:
+        length = limit or DEFAULT_MAX_LENGTH
+    return min(length, limit) if limit else length
 
 def split_text(
     text: str,
@@ -9,6 +30,29 @@ def split_text(
     Robust paragraph-based chunking for PDFs with numbering.
     """
 
+    with span("split_text", INGEST_STAGE_SECONDS):
+        paragraphs = split_paragraphs(text)
+        chunks = list(pack_paragraphs(paragraphs, chunk_size, overlap_paragraphs))
+    print(f"Total paragraphs: {len(paragraphs)}")
+    return chunks
+
+
+def split_pages(
+    pages: Iterable[str],
+    chunk_size: int = 500,
+    overlap_paragraphs: int = 1
+) -> Iterator[str]:
+    """
+    Streaming version of split_text for text that arrives page by page.
+
+    Chunks are yielded as soon as they are full, so the caller can start
+    embedding while later pages are still being extracted.
+    """
+    paragraphs = (para for page in pages for para in split_paragraphs(page))
+    yield from pack_paragraphs(paragraphs, chunk_size, overlap_paragraphs)
+
+
+def split_paragraphs(text: str) -> list[str]:
     # Normalize text
     text = re.sub(r'\n+', '\n', text)  # collapse multiple newlines
     text = text.strip()
@@ -21,26 +65,153 @@ def split_text(
         text
     )
 
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
+    return [p.strip() for p in paragraphs if p.strip()]
 
-    chunks = []
+
+def pack_paragraphs(
+    paragraphs: Iterable[str],
+    chunk_size: int = 500,
+    overlap_paragraphs: int = 1
+) -> Iterator[str]:
+    """
+    Pack paragraphs into chunks of about chunk_size characters, repeating
+    the last `overlap_paragraphs` paragraphs at the start of the next chunk.
+    """
     current_chunk = []
+    current_lengths = []  # len() of each paragraph in current_chunk
     current_length = 0
 
     for para in paragraphs:
         para_length = len(para)
 
-        if current_length + para_length > chunk_size:
-            chunks.append("\n\n".join(current_chunk))
+        if current_chunk and current_length + para_length > chunk_size:
+            yield "\n\n".join(current_chunk)
 
             # overlap last N paragraphs
-            current_chunk = current_chunk[-overlap_paragraphs:]
-            current_length = sum(len(p) for p in current_chunk)
+            kept = min(overlap_paragraphs, len(current_chunk))
+            for dropped in current_lengths[:len(current_chunk) - kept]:
+                current_length -= dropped
+            current_chunk = current_chunk[len(current_chunk) - kept:]
+            current_lengths = current_lengths[len(current_lengths) - kept:]
 
         current_chunk.append(para)
+        current_lengths.append(para_length)
         current_length += para_length
 
     if current_chunk:
-        chunks.append("\n\n".join(current_chunk))
-    print(f"Total paragraphs: {len(paragraphs)}")
-    return chunks
+        yield "\n\n".join(current_chunk)
+
+
+class TokenChunker:
+    """
+    Paragraph chunking measured in embedding-model tokens.
+
+    Character budgets can produce chunks longer than the model's maximum
+    length, which the embedder then silently truncates. This chunker
+    tokenizes each page's paragraphs once with the embedding tokenizer,
+    packs them up to `chunk_tokens` tokens and returns every chunk's token
+    IDs along with its text, so EmbeddingGenerator.embed_texts(..., token_ids=...)
+    does not tokenize it again.
+    """
+
+    def __init__(self, tokenizer, chunk_tokens: int = 128, overlap_tokens: int = 32):
+        """
+        Args:
+            tokenizer: the embedding model's (fast) Hugging Face tokenizer
+            chunk_tokens (int): token budget per chunk, capped at the model's maximum length
+            overlap_tokens (int): trailing paragraphs of up to this many tokens are
+                                  repeated at the start of the next chunk
+        """
+        self.tokenizer = tokenizer
+        special_tokens = tokenizer.num_special_tokens_to_add(pair=False)
+        self.chunk_tokens = min(chunk_tokens, model_max_length(tokenizer) - special_tokens)
+        self.overlap_tokens = min(overlap_tokens, self.chunk_tokens // 2)
+
+    def split_text(self, text: str) -> list[tuple[str, list[int]]]:
+        with span("split_text", INGEST_STAGE_SECONDS):
+            return list(self.split_pages([text]))
+
+    def split_pages(self, pages: Iterable[str]) -> Iterator[tuple[str, list[int]]]:
+        """
+        Streaming chunking of text that arrives page by page.
+
+        Yields:
+            (chunk text, token IDs with the model's special tokens)
+        """
+        yield from self.pack(self._tokenize_pages(pages))
+
+    def _tokenize_pages(self, pages: Iterable[str]) -> Iterator[tuple[str, list[int]]]:
+        for page in pages:
+            paragraphs = split_paragraphs(page)
+            if not paragraphs:
+                continue
+
+            # One tokenizer call per page; offsets locate the cut points of long paragraphs
+            encoded = self.tokenizer(
+                paragraphs, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+            )
+            for n, (para, ids) in enumerate(zip(paragraphs, encoded["input_ids"])):
+                if len(ids) <= self.chunk_tokens:
+                    yield para, ids
+                else:
+                    yield from self._windows(para, ids, encoded["offset_mapping"][n], encoded.word_ids(n))
+
+    def _windows(self, para: str, ids: list[int], offsets: list, word_ids: list) -> Iterator[tuple[str, list[int]]]:
+        """
+        Cut a paragraph over budget into overlapping windows. Cuts fall
+        between words where possible, so each window's text tokenizes
+        back to the same IDs.
+        """
+        def word_start(i: int) -> bool:
+            return i == 0 or i == len(ids) or word_ids[i] is None or word_ids[i] != word_ids[i - 1]
+
+        start = 0
+        while True:
+            end = min(start + self.chunk_tokens, len(ids))
+            cut = end
+            while cut > start + 1 and not word_start(cut):
+                cut -= 1
+            end = cut if word_start(cut) else end
+            yield para[offsets[start][0]:offsets[end - 1][1]], ids[start:end]
+            if end == len(ids):
+                return
+
+            next_start = max(end - self.overlap_tokens, start + 1)
+            while next_start < end and not word_start(next_start):
+                next_start += 1
+            start = next_start
+
+    def pack(self, paragraphs: Iterable[tuple[str, list[int]]]) -> Iterator[tuple[str, list[int]]]:
+        """
+        Pack (text, token IDs) paragraphs into chunks of at most chunk_tokens tokens.
+        """
+        current_chunk = []
+        current_tokens = 0
+
+        for para, ids in paragraphs:
+            if current_chunk and current_tokens + len(ids) > self.chunk_tokens:
+                yield self._chunk(current_chunk)
+
+                # Keep the trailing paragraphs that fit in the overlap budget
+                kept, current_tokens = 0, 0
+                for _, kept_ids in reversed(current_chunk):
+                    if current_tokens + len(kept_ids) > self.overlap_tokens:
+                        break
+                    current_tokens += len(kept_ids)
+                    kept += 1
+                current_chunk = current_chunk[len(current_chunk) - kept:]
+
+                if current_tokens + len(ids) > self.chunk_tokens:
+                    current_chunk, current_tokens = [], 0
+
+            current_chunk.append((para, ids))
+            current_tokens += len(ids)
+
+        if current_chunk:
+            yield self._chunk(current_chunk)
+
+    def _chunk(self, paragraphs: list[tuple[str, list[int]]]) -> tuple[str, list[int]]:
+        # WordPiece does not tokenize whitespace, so joined paragraph IDs match the joined text
+        text = "\n\n".join(para for para, _ in paragraphs)
+        ids = [token for _, para_ids in paragraphs for token in para_ids]
+        return text, self.tokenizer.build_inputs_with_special_tokens(ids)
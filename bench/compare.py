@@ -0,0 +1,70 @@
+"""
+Compare two bench.run result files.
+
+    python -m bench.compare old.json new.json [--threshold 10]
+
+Every metric present in both files is printed with its relative change;
+changes worse than the threshold are marked REGRESSION. Rates (*_per_sec)
+are better when higher, timings (*_ms, seconds) when lower.
+"""
+
+import argparse
+import json
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    metrics = {}
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        if isinstance(value, list):
+            # Search rows are keyed by corpus size
+            for row in value:
+                label = row.get("corpus_size", value.index(row))
+                metrics.update(flatten(row, f"{prefix}{key}[{label}]."))
+        elif isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[prefix + key] = value
+    return metrics
+
+
+def higher_is_better(metric: str) -> bool | None:
+    if metric.endswith("_per_sec"):
+        return True
+    if metric.endswith("_ms") or metric.endswith("seconds"):
+        return False
+    return None  # counts and sizes are context, not performance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    old_metrics, new_metrics = flatten(old), flatten(new)
+    regressions = 0
+    for metric in sorted(old_metrics.keys() & new_metrics.keys()):
+        direction = higher_is_better(metric)
+        if direction is None or not old_metrics[metric]:
+            continue
+
+        change = 100 * (new_metrics[metric] - old_metrics[metric]) / old_metrics[metric]
+        worse = -change if direction else change
+        flag = "REGRESSION" if worse > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{metric:40} {old_metrics[metric]:12.3f} {new_metrics[metric]:12.3f} {change:+7.1f}%  {flag}")
+
+    print(f"{regressions} regression(s) above {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Benchmark suite for the ingestion and query paths.
+
+    python -m bench.run --json results.json
+    python -m bench.compare old.json new.json
+
+Stages (pick with --stages):
+    load     load_pdf pages/sec on synthetic PDFs
+    split    split_text MB/sec on the extracted text
+    embed    embed_texts chunks/sec
+    search   FAISSRetriever.search p50/p99 at several corpus sizes
+    ask      end-to-end POST /ask latency with the "fake" LLM provider
+
+Everything runs offline on generated data in a temporary directory
+(models must already be in the local Hugging Face cache), and the same
+arguments always generate the same data.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench.synthetic_pdf import make_corpus
+
+STAGES = ("load", "split", "embed", "search", "ask")
+
+
+def percentiles(seconds: list[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def bench_load(pdf_paths: list[str]) -> tuple[dict, list[str]]:
+    from app.pdf_loader import count_pages, load_pdf
+
+    pages = sum(count_pages(path) for path in pdf_paths)
+    start = time.perf_counter()
+    texts = [load_pdf(path) for path in pdf_paths]
+    elapsed = time.perf_counter() - start
+    return {"pdfs": len(pdf_paths), "pages": pages, "seconds": elapsed, "pages_per_sec": pages / elapsed}, texts
+
+
+def bench_split(texts: list[str]) -> tuple[dict, list[str]]:
+    from app.text_splitter import split_text
+
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    start = time.perf_counter()
+    chunks = [chunk for text in texts for chunk in split_text(text)]
+    elapsed = time.perf_counter() - start
+    return {"mb": megabytes, "chunks": len(chunks), "seconds": elapsed, "mb_per_sec": megabytes / elapsed}, chunks
+
+
+def bench_embed(chunks: list[str], max_chunks: int, backend: str) -> dict:
+    from app.embeddings import EmbeddingGenerator
+
+    embedder = EmbeddingGenerator(backend=backend)
+    chunks = chunks[:max_chunks]
+    embedder.embed_texts(chunks[:embedder.batch_size])  # warm-up
+
+    start = time.perf_counter()
+    embedder.embed_texts(chunks)
+    elapsed = time.perf_counter() - start
+    return {"backend": backend, "chunks": len(chunks), "seconds": elapsed, "chunks_per_sec": len(chunks) / elapsed}
+
+
+def bench_search(work_dir: str, corpus_sizes: list[int], num_queries: int, top_k: int, index_type: str) -> list[dict]:
+    from app.retriever import FAISSRetriever
+
+    rng = np.random.default_rng(0)
+    dim = 384
+    queries = rng.standard_normal((num_queries, dim)).astype(np.float32)
+
+    results = []
+    for size in corpus_sizes:
+        store_dir = os.path.join(work_dir, f"search-{size}")
+        retriever = FAISSRetriever(dim, store_dir=store_dir, index_type=index_type)
+        for start in range(0, size, 50_000):
+            count = min(50_000, size - start)
+            vectors = rng.standard_normal((count, dim)).astype(np.float32)
+            retriever.add_embeddings(vectors, [f"chunk {start + i}" for i in range(count)])
+        retriever.save()
+        retriever.compact(force=True)
+
+        retriever.search(queries[:1].copy(), top_k)  # warm-up
+        timings = []
+        for i in range(num_queries):
+            start = time.perf_counter()
+            retriever.search(queries[i:i + 1].copy(), top_k)
+            timings.append(time.perf_counter() - start)
+
+        results.append({"corpus_size": size, "index_type": index_type, "top_k": top_k, **percentiles(timings)})
+        retriever.chunks.close()
+    return results
+
+
+def bench_ask(work_dir: str, pdf_paths: list[str], num_requests: int) -> dict:
+    # api.main builds its components from relative paths
+    api_dir = os.path.join(work_dir, "api")
+    os.makedirs(api_dir, exist_ok=True)
+    os.chdir(api_dir)
+
+    from fastapi.testclient import TestClient
+    import api.main as server
+
+    # The fake provider is used, so loading the default LLM would only add noise
+    server.WARM_UP_LLM = False
+
+    def ask(client: TestClient, question: str) -> float:
+        start = time.perf_counter()
+        response = client.post("/ask", json={"question": question, "provider": "fake"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    # Entering the client runs the lifespan, which starts warm-up
+    with TestClient(server.app) as client:
+        while client.get("/health/ready").status_code != 200:
+            if server.warmup["status"] == "failed":
+                raise RuntimeError(f"API warm-up failed: {server.warmup['error']}")
+            time.sleep(0.1)
+
+        for path in pdf_paths:
+            with open(path, "rb") as f:
+                response = client.post("/upload-pdf", files={"file": (os.path.basename(path), f, "application/pdf")})
+            job_id = response.json().get("job_id")
+            while job_id and client.get(f"/jobs/{job_id}").json()["status"] not in ("done", "failed"):
+                time.sleep(0.1)
+
+        ask(client, "warm-up question")
+
+        # Uncached: the answer cache is emptied before every request
+        uncached = []
+        for i in range(num_requests):
+            server.default_collection.answer_cache.clear()
+            uncached.append(ask(client, f"How do I replace part PN-{1000 + i} on the pump?"))
+
+        cached = [ask(client, "How do I replace part PN-1000 on the pump?") for _ in range(num_requests)]
+
+    return {
+        "requests": num_requests,
+        "uncached": percentiles(uncached),
+        "cached": percentiles(cached),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and query paths")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--pdfs", type=int, default=4, help="synthetic PDFs to generate")
+    parser.add_argument("--pages", type=int, default=50, help="pages per synthetic PDF")
+    parser.add_argument("--embed-chunks", type=int, default=512, help="chunks to embed")
+    parser.add_argument("--backend", default="torch", help="embedding backend")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--index-type", default="flat", help="index type for the search stage")
+    parser.add_argument("--queries", type=int, default=200, help="queries per corpus size")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=50, help="/ask requests")
+    parser.add_argument("--work-dir", help="keep generated data here (default: a temporary directory)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    # Resolve before the ask stage changes directory
+    json_path = os.path.abspath(args.json) if args.json else None
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+        }
+    }
+
+    try:
+        pdf_paths = make_corpus(os.path.join(work_dir, "pdfs"), args.pdfs, args.pages)
+        texts, chunks = [], []
+
+        if {"load", "split", "embed"} & set(args.stages):
+            results["load_pdf"], texts = bench_load(pdf_paths)
+        if {"split", "embed"} & set(args.stages):
+            results["split_text"], chunks = bench_split(texts)
+        if "embed" in args.stages:
+            results["embed_texts"] = bench_embed(chunks, args.embed_chunks, args.backend)
+        if "search" in args.stages:
+            results["search"] = bench_search(work_dir, args.corpus_sizes, args.queries, args.top_k, args.index_type)
+        if "ask" in args.stages:
+            results["ask"] = bench_ask(work_dir, pdf_paths, args.requests)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps({k: v for k, v in results.items() if k != "meta"}, indent=2))
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
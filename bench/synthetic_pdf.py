@@ -0,0 +1,83 @@
+"""
+Offline generator of synthetic text PDFs for benchmarks.
+
+Writes minimal PDF 1.4 files by hand (one Helvetica text stream per
+page), so no PDF library or network access is needed. The text uses
+numbered sections and part numbers, like the manuals the bot is used on,
+and a fixed seed makes every run produce the same bytes.
+"""
+
+import os
+import random
+
+WORDS = (
+    "pump valve pressure seal housing bearing shaft motor filter inlet outlet "
+    "check replace inspect torque clean install remove adjust flow system "
+    "the and of to with for before after each every"
+).split()
+
+
+def write_pdf(path: str, pages: list[list[str]]):
+    """
+    Write a PDF with one list of text lines per page.
+    """
+    objects = []
+    num_pages = len(pages)
+    font_id = 3 + 2 * num_pages
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(num_pages))
+
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>")
+    for i, lines in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        body = "BT /F1 10 Tf 14 TL 40 760 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_page(rng: random.Random, page_num: int, lines_per_page: int = 40) -> list[str]:
+    lines = []
+    for k in range(lines_per_page):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14)))
+        if k % 8 == 0:
+            # Numbered section header with a part number
+            lines.append(f"{page_num + 1}.{k // 8 + 1} Part PN-{rng.randint(1000, 9999)} {words}")
+        else:
+            lines.append(words)
+    return lines
+
+
+def make_corpus(out_dir: str, num_pdfs: int = 4, pages_per_pdf: int = 50, seed: int = 0) -> list[str]:
+    """
+    Write `num_pdfs` PDFs into out_dir.
+
+    Returns:
+        list[str]: paths of the PDFs
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+
+    paths = []
+    for d in range(num_pdfs):
+        pages = [make_page(rng, p) for p in range(pages_per_pdf)]
+        path = os.path.join(out_dir, f"synthetic-{d:03d}.pdf")
+        write_pdf(path, pages)
+        paths.append(path)
+    return paths
@@ -0,0 +1,98 @@
+# Parity and throughput of the embedding backends against float32 PyTorch
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.embeddings import BACKENDS, EmbeddingGenerator
+from app.retriever import FAISSRetriever
+
+
+def sample_texts(count: int) -> list[str]:
+    """
+    Stored chunks when an index exists, otherwise synthetic sentences.
+    """
+    retriever = FAISSRetriever(embedding_dim=384)
+    ids, _ = retriever.all_vectors()
+    if len(ids):
+        rng = np.random.default_rng(0)
+        picked = rng.choice(ids, min(count, len(ids)), replace=False)
+        texts = [t for t in retriever.chunks.get_many(picked) if t]
+        if texts:
+            return texts
+
+    words = "the pump valve pressure clause section manual replace check system data model".split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, rng.integers(8, 120))) for _ in range(count)]
+
+
+def measure(embedder: EmbeddingGenerator, texts: list[str], repeats: int) -> tuple[np.ndarray, float]:
+    embedder.embed_texts(texts[:embedder.batch_size])  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = embedder.embed_texts(texts).numpy()
+        best = min(best, time.perf_counter() - start)
+    return embeddings, len(texts) / best
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends against float32 PyTorch")
+    parser.add_argument("--texts", type=int, default=512, help="number of sample texts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per backend (best is kept)")
+    parser.add_argument("--max-deviation", type=float, default=0.01,
+                        help="largest allowed 1 - cosine(backend, reference) for any text")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.texts)
+    reference = None
+    report = []
+
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        try:
+            embedder = EmbeddingGenerator(batch_size=args.batch_size, backend=backend)
+        except ImportError as e:
+            print(f"{backend}: skipped ({e})")
+            continue
+
+        embeddings, chunks_per_sec = measure(embedder, texts, args.repeats)
+        if reference is None:
+            reference = normalize(embeddings)
+
+        deviation = 1 - (normalize(embeddings) * reference).sum(axis=1)
+        report.append({
+            "backend": backend,
+            "chunks_per_sec": chunks_per_sec,
+            "max_deviation": float(deviation.max()),
+            "mean_deviation": float(deviation.mean()),
+            "passes": bool(deviation.max() <= args.max_deviation),
+        })
+
+    speedup_base = report[0]["chunks_per_sec"]
+    print(f"{len(texts)} texts, batch size {args.batch_size}, max deviation {args.max_deviation}")
+    for row in report:
+        print(
+            f"{row['backend']:6} {row['chunks_per_sec']:8.1f} chunks/sec  "
+            f"x{row['chunks_per_sec'] / speedup_base:.2f}  "
+            f"max 1-cos={row['max_deviation']:.5f}  mean={row['mean_deviation']:.5f}  "
+            f"{'ok' if row['passes'] else 'FAIL'}"
+        )
+
+    best = max((row for row in report if row["passes"]), key=lambda row: row["chunks_per_sec"])
+    print(f"Fastest accurate backend: {best['backend']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"recommended": best["backend"], "backends": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Embedding throughput of EmbeddingPool against worker count
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from app.embedding_pool import EmbeddingPool
+from app.embeddings import EmbeddingGenerator
+
+
+def sample_texts(count: int) -> list[str]:
+    words = "the pump valve pressure clause section manual replace check system data model".split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, rng.integers(8, 120))) for _ in range(count)]
+
+
+def measure(embedder, texts: list[str], repeats: int) -> tuple[np.ndarray, float]:
+    embedder.embed_texts(texts[:embedder.batch_size])  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings = embedder.embed_texts(texts).numpy()
+        best = min(best, time.perf_counter() - start)
+    return embeddings, len(texts) / best
+
+
+def main():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Measure embedding throughput against worker count")
+    parser.add_argument("--texts", type=int, default=2048, help="number of sample texts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per setting (best is kept)")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="worker counts to try (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--backend", choices=("torch", "int8"), default="torch")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    worker_counts = args.workers or [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cores]
+    texts = sample_texts(args.texts)
+
+    # Baseline: one process using every core for torch threads
+    embedder = EmbeddingGenerator(batch_size=args.batch_size, backend=args.backend)
+    reference, baseline = measure(embedder, texts, args.repeats)
+    del embedder
+    report = [{"workers": 0, "threads_per_worker": cores, "chunks_per_sec": baseline, "max_abs_diff": 0.0}]
+
+    for workers in worker_counts:
+        with EmbeddingPool(workers, batch_size=args.batch_size, backend=args.backend) as pool:
+            embeddings, chunks_per_sec = measure(pool, texts, args.repeats)
+            report.append({
+                "workers": workers,
+                "threads_per_worker": pool.threads_per_worker,
+                "chunks_per_sec": chunks_per_sec,
+                "max_abs_diff": float(np.abs(embeddings - reference).max()),
+            })
+
+    print(f"{len(texts)} texts, batch size {args.batch_size}, {cores} cores, backend {args.backend}")
+    for row in report:
+        label = "in-process" if row["workers"] == 0 else f"{row['workers']} workers"
+        print(
+            f"{label:11} x{row['threads_per_worker']:<3} threads {row['chunks_per_sec']:8.1f} chunks/sec  "
+            f"speedup x{row['chunks_per_sec'] / baseline:.2f}  max |diff|={row['max_abs_diff']:.2e}"
+        )
+
+    best = max(report, key=lambda row: row["chunks_per_sec"])
+    print(f"Fastest: {'in-process' if best['workers'] == 0 else best['workers']} "
+          f"({best['chunks_per_sec']:.1f} chunks/sec)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cores": cores, "best_workers": best["workers"], "runs": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Recall-vs-latency report of approximate index types against the exact flat index
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from app.index_factory import build_index, search_parameters, train_size_for
+from app.retriever import FAISSRetriever
+
+
+def measure(index, queries, ground_truth, top_k, params=None) -> dict:
+    start = time.perf_counter()
+    _, indices = index.search(queries, top_k, params=params)
+    elapsed = time.perf_counter() - start
+
+    hits = sum(len(set(found) & set(truth)) for found, truth in zip(indices, ground_truth))
+    return {
+        "recall": hits / ground_truth.size,
+        "ms_per_query": 1000 * elapsed / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare index types against exact search")
+    parser.add_argument("--queries", type=int, default=500, help="number of sample queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    retriever = FAISSRetriever(embedding_dim=384)
+    _, vectors = retriever.all_vectors()
+    if len(vectors) == 0:
+        print("No index found. Run scripts/ingest_pdfs.py first.")
+        return
+    faiss.normalize_L2(vectors)
+
+    # Queries: stored vectors with a little noise, so they are not exact duplicates
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = queries + rng.normal(0, 0.01, queries.shape).astype(np.float32)
+    faiss.normalize_L2(queries)
+
+    flat = build_index(vectors.shape[1], "flat")
+    flat.add(vectors)
+    _, ground_truth = flat.search(queries, args.top_k)
+
+    report = [{"index_type": "flat", **measure(flat, queries, ground_truth, args.top_k)}]
+
+    nlist = min(args.nlist, max(1, len(vectors) // 40))
+    sweeps = {
+        "hnsw": ("ef_search", [16, 32, 64, 128, 256]),
+        "ivf": ("nprobe", [1, 4, 16, 64]),
+        "ivfpq": ("nprobe", [1, 4, 16, 64]),
+    }
+    for index_type, (knob, values) in sweeps.items():
+        index = build_index(vectors.shape[1], index_type, nlist=nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+
+        start = time.perf_counter()
+        if not index.is_trained:
+            sample = rng.choice(len(vectors), min(len(vectors), train_size_for(index)), replace=False)
+            index.train(vectors[sample])
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+
+        for value in values:
+            params = search_parameters(index, **{knob: value})
+            report.append({
+                "index_type": index_type,
+                knob: value,
+                "build_seconds": build_seconds,
+                **measure(index, queries, ground_truth, args.top_k, params),
+            })
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, recall@{args.top_k} vs flat")
+    for row in report:
+        setting = ", ".join(f"{k}={row[k]}" for k in ("nprobe", "ef_search") if k in row)
+        print(
+            f"{row['index_type']:6} {setting:15} "
+            f"recall={row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
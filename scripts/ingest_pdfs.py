@@ -1,38 +1,69 @@
 # Run this ONLY when PDFs change
+import argparse
 import os
-from app.pdf_loader import load_pdf
-from app.text_splitter import split_text
-from app.embeddings import EmbeddingGenerator
+
+from app.embedding_pool import EmbeddingPool
+from app.embeddings import BACKENDS, EmbeddingGenerator
+from app.ingestion import StreamingIngestor
+from app.index_factory import INDEX_TYPES
 from app.retriever import FAISSRetriever
 
 PDF_DIR = "data/raw_pdfs"
+EMBEDDING_CACHE_DIR = "vector_store/embedding_cache"
 
-def main():
-    embedder = EmbeddingGenerator()
-
-    all_chunks = []
 
-    # Load all PDFs
-    for filename in os.listdir(PDF_DIR):
-        if filename.endswith(".pdf"):
-            pdf_path = os.path.join(PDF_DIR, filename)
-            print(f"Ingesting: {filename}")
-
-            text = load_pdf(pdf_path)
-            chunks = split_text(text)
-            all_chunks.extend(chunks)
+def main():
+    parser = argparse.ArgumentParser(description="Ingest PDFs into the FAISS index")
+    parser.add_argument("--fresh", action="store_true", help="rebuild the index from scratch")
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks per embedding batch")
+    parser.add_argument("--checkpoint-every", type=int, default=4096, help="chunks between checkpoints")
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None, help="index type for compacted segments")
+    parser.add_argument("--nlist", type=int, default=1024, help="ivf/ivfpq clusters")
+    parser.add_argument("--pq-m", type=int, default=48, help="ivfpq sub-quantizers")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="hnsw neighbours per node")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="embedding backend (compare with scripts/embedding_backends.py)")
+    parser.add_argument("--embed-workers", type=int, default=0,
+                        help="embedding processes for CPU-only nodes (see scripts/embedding_workers.py); 0 = in-process")
+    args = parser.parse_args()
 
-    if not all_chunks:
+    pdf_paths = [
+        os.path.join(PDF_DIR, filename)
+        for filename in sorted(os.listdir(PDF_DIR))
+        if filename.endswith(".pdf")
+    ]
+    if not pdf_paths:
         print("No PDFs found.")
         return
 
-    # Generate embeddings ONCE
-    embeddings = embedder.embed_texts(all_chunks).numpy()
+    # Unchanged chunks are read back from the cache instead of re-embedded
+    if args.embed_workers:
+        embedder = EmbeddingPool(args.embed_workers, cache_dir=EMBEDDING_CACHE_DIR, backend=args.backend)
+    else:
+        embedder = EmbeddingGenerator(cache_dir=EMBEDDING_CACHE_DIR, backend=args.backend)
+    retriever = FAISSRetriever(
+        embedding_dim=embedder.embedding_dim,
+        index_type=args.index_type,
+        index_params={"nlist": args.nlist, "pq_m": args.pq_m, "hnsw_m": args.hnsw_m}
+    )
+
+    # Resumes from the last checkpoint if a previous run was interrupted
+    ingestor = StreamingIngestor(
+        embedder,
+        retriever,
+        batch_size=args.batch_size,
+        checkpoint_every=args.checkpoint_every,
+        max_workers=args.workers
+    )
+    if args.fresh:
+        ingestor.reset()
 
-    # Create FAISS index and save
-    retriever = FAISSRetriever(embedding_dim=embeddings.shape[1])
-    retriever.add_embeddings(embeddings, all_chunks)
-    retriever.save()
+    try:
+        ingestor.ingest(pdf_paths)
+    finally:
+        if args.embed_workers:
+            embedder.close()
 
     print("✅ Ingestion complete. FAISS index saved.")
 
@@ -0,0 +1,37 @@
+# Rebuild the saved index as another index type (e.g. flat -> ivf) without re-embedding
+import argparse
+
+from app.index_factory import INDEX_TYPES
+from app.retriever import FAISSRetriever
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the FAISS index to another index type")
+    parser.add_argument("index_type", choices=INDEX_TYPES)
+    parser.add_argument("--nlist", type=int, default=1024, help="ivf/ivfpq clusters")
+    parser.add_argument("--nprobe", type=int, default=16, help="default ivf/ivfpq clusters per query")
+    parser.add_argument("--pq-m", type=int, default=48, help="ivfpq sub-quantizers")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="hnsw neighbours per node")
+    parser.add_argument("--ef-search", type=int, default=64, help="default hnsw candidates per query")
+    args = parser.parse_args()
+
+    retriever = FAISSRetriever(embedding_dim=384)
+    if len(retriever) == 0:
+        print("No index found. Run scripts/ingest_pdfs.py first.")
+        return
+
+    print(f"Migrating {len(retriever)} vectors: {retriever.index_type} -> {args.index_type}")
+    retriever.rebuild(
+        args.index_type,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        pq_m=args.pq_m,
+        hnsw_m=args.hnsw_m,
+        ef_search=args.ef_search
+    )
+
+    print("✅ Migration complete. Check recall with scripts/index_report.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
-from app.embeddings import EmbeddingGenerator
+import argparse
+
 from app.retriever import FAISSRetriever
 from app.rag_pipeline import RAGPipeline
+from app.sharding import ShardedRetriever
 
 def main():
-    embedder = EmbeddingGenerator()
+    parser = argparse.ArgumentParser(description="Ask questions about the indexed PDFs")
+    parser.add_argument("--shards", nargs="+", default=None,
+                        help="shard server URLs (see app/sharding.py); default: the local index")
+    args = parser.parse_args()
 
-    # Load existing FAISS index (NO re-embedding)
-    retriever = FAISSRetriever(embedding_dim=384)
+    if args.shards:
+        retriever = ShardedRetriever(args.shards)
+    else:
+        # Load existing FAISS index (NO re-embedding)
+        retriever = FAISSRetriever(embedding_dim=384)
 
     rag = RAGPipeline(
         retriever=retriever,
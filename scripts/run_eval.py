@@ -0,0 +1,114 @@
+# Answer a file of questions in batches and write the answers as JSONL
+import argparse
+import contextlib
+import json
+import sys
+import time
+import urllib.request
+
+from app.collection_manager import DEFAULT_COLLECTION, CollectionManager
+from app.llm_providers import provider_registry
+from app.rag_pipeline import RAGPipeline
+
+
+def read_questions(path: str) -> list[str]:
+    """
+    One question per line: either plain text or a JSON object with a "question" field.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line)["question"]
+            questions.append(line)
+    return questions
+
+
+def answer_local(questions: list[str], args):
+    manager = CollectionManager(background_compaction=False)
+    collection = manager.acquire(args.collection)
+    try:
+        rag = RAGPipeline(retriever=collection.retriever, provider=args.provider, api_key=args.api_key, model=args.model)
+        llm = provider_registry.get(provider=args.provider, api_key=args.api_key, model=args.model)
+        yield from rag.answer_batch(
+            questions,
+            top_k=args.top_k,
+            llm=llm,
+            max_workers=args.workers,
+            block_size=args.block_size
+        )
+    finally:
+        manager.release(collection)
+
+
+def answer_remote(questions: list[str], args):
+    body = json.dumps({
+        "questions": questions,
+        "collection": args.collection,
+        "provider": args.provider,
+        "api_key": args.api_key,
+        "model": args.model,
+        "top_k": args.top_k,
+        "use_cache": not args.no_cache,
+    }).encode()
+    request = urllib.request.Request(
+        args.url.rstrip("/") + "/ask/batch",
+        data=body,
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions and write JSONL")
+    parser.add_argument("questions", help="questions file: plain text or JSONL with a \"question\" field")
+    parser.add_argument("--output", "-o", help="JSONL output file (default: stdout)")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--provider", default="huggingface")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--block-size", type=int, default=256, help="questions embedded and searched together")
+    parser.add_argument("--url", help="send the questions to a running server's /ask/batch instead")
+    parser.add_argument("--no-cache", action="store_true", help="with --url: bypass the answer cache")
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    if not questions:
+        print("No questions found.", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    answers = answer_remote(questions, args) if args.url else answer_local(questions, args)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    # Results arrive in completion order; each keeps the question's line index
+    errors = 0
+    try:
+        # Progress prints of the pipeline go to stderr, so stdout stays valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            for record in answers:
+                errors += "error" in record
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if args.output:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Answered {len(questions)} questions in {elapsed:.1f}s "
+        f"({len(questions) / elapsed:.1f}/s, {errors} errors)",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Split an existing index into N shard stores for app/shard_server.py
+import argparse
+import os
+
+import numpy as np
+
+from app.retriever import FAISSRetriever
+from app.sharding import shard_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition an index into shard stores by document")
+    parser.add_argument("--shards", type=int, required=True, help="number of shards")
+    parser.add_argument("--source", default="vector_store", help="store to split")
+    parser.add_argument("--output", default="vector_store/shards", help="shard i is written to OUTPUT/i")
+    parser.add_argument("--base-port", type=int, default=8101, help="only used in the printed commands")
+    args = parser.parse_args()
+
+    source = FAISSRetriever(embedding_dim=384, store_dir=args.source)
+    ids, vectors = source.all_vectors()
+    live = np.array([int(i) not in source.deleted_ids for i in ids], dtype=bool)
+    ids, vectors = ids[live], vectors[live]
+    if len(ids) == 0:
+        print("No index found. Run scripts/ingest_pdfs.py first.")
+        return
+
+    # The chunk store splits long ID lists below SQLite's parameter limit itself
+    doc_ids = source.chunks.get_doc_ids(ids.tolist())
+    texts = source.chunks.get_many(ids.tolist())
+
+    # Every chunk of a document goes to the same shard; chunks without a document by their ID
+    groups = {}  # (shard, doc_id) -> row positions
+    for row, (chunk_id, doc_id, text) in enumerate(zip(ids, doc_ids, texts)):
+        if text is None:
+            continue
+        shard = shard_for(doc_id, args.shards) if doc_id else int(chunk_id) % args.shards
+        groups.setdefault((shard, doc_id), []).append(row)
+
+    documents = {document["doc_id"]: document for document in source.list_documents()}
+    for shard in range(args.shards):
+        store_dir = os.path.join(args.output, str(shard))
+        target = FAISSRetriever(
+            embedding_dim=source.embedding_dim,
+            store_dir=store_dir,
+            index_type=source.index_type,
+            index_params=source.index_params
+        )
+        target.reset()
+
+        for (group_shard, doc_id), rows in groups.items():
+            if group_shard != shard:
+                continue
+            target.add_embeddings(vectors[rows], [texts[row] for row in rows], doc_id)
+            if doc_id in documents:
+                target.register_document(doc_id, documents[doc_id]["filename"], len(rows))
+
+        target.save()
+        target.compact(force=True)
+        print(f"Shard {shard}: {len(target)} chunks, {len(target.list_documents())} documents → {store_dir}")
+        target.close()
+
+    print("\nServe each shard with:")
+    for shard in range(args.shards):
+        print(
+            f"  SHARD_STORE_DIR={os.path.join(args.output, str(shard))} "
+            f"uvicorn app.shard_server:app --port {args.base_port + shard}"
+        )
+
+
+if __name__ == "__main__":
+    main()
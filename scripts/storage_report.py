@@ -0,0 +1,110 @@
+# Memory per chunk, load time and recall@k of the vector storage modes
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from app.index_factory import build_index
+from app.retriever import FAISSRetriever
+
+
+def directory_bytes(path: str, suffix: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if name.endswith(suffix))
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector storage modes against flat float32")
+    parser.add_argument("--modes", nargs="+", default=["flat", "fp16", "sq8", "ivfpq"])
+    parser.add_argument("--queries", type=int, default=200, help="number of sample queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--synthetic", type=int, default=20000,
+                        help="random vectors to use when no index exists")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    ids, vectors = FAISSRetriever(embedding_dim=384).all_vectors()
+    if len(vectors) == 0:
+        print(f"No index found, using {args.synthetic} random vectors")
+        vectors = np.random.default_rng(0).standard_normal((args.synthetic, 384)).astype(np.float32)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    dim = vectors.shape[1]
+
+    # Queries: stored vectors with a little noise, so they are not exact duplicates
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = queries + rng.normal(0, 0.01, queries.shape).astype(np.float32)
+    faiss.normalize_L2(queries)
+
+    flat = build_index(dim, "flat")
+    flat.add(vectors)
+    _, truth = flat.search(queries, args.top_k)
+
+    report = []
+    for mode in args.modes:
+        store_dir = tempfile.mkdtemp(prefix=f"storage-{mode}-")
+        try:
+            retriever = FAISSRetriever(dim, store_dir=store_dir, index_type=mode,
+                                       index_params={"nlist": min(1024, max(1, len(vectors) // 40))})
+            for start in range(0, len(vectors), 50_000):
+                batch = vectors[start:start + 50_000].copy()
+                retriever.add_embeddings(batch, [""] * len(batch))
+            retriever.save()
+            retriever.compact(force=True)
+            retriever.chunks.close()
+
+            segments_dir = os.path.join(store_dir, "segments")
+            index_bytes = directory_bytes(segments_dir, ".faiss")
+            exact_bytes = directory_bytes(segments_dir, ".vectors.npy")
+
+            start = time.perf_counter()
+            loaded = FAISSRetriever(dim, store_dir=store_dir, rerank_factor=args.rerank_factor)
+            load_seconds = time.perf_counter() - start
+
+            row = {
+                "mode": mode,
+                "ram_bytes_per_chunk": index_bytes / len(vectors),
+                "disk_bytes_per_chunk": (index_bytes + exact_bytes) / len(vectors),
+                "load_seconds": load_seconds,
+            }
+            for factor in ([0, args.rerank_factor] if exact_bytes else [0]):
+                loaded.rerank_factor = factor
+                start = time.perf_counter()
+                _, found = loaded.search_ids(queries.copy(), args.top_k)
+                elapsed = time.perf_counter() - start
+                key = "rerank" if factor else "no_rerank"
+                row[f"recall_{key}"] = recall(found, truth)
+                row[f"ms_per_query_{key}"] = 1000 * elapsed / len(queries)
+            loaded.chunks.close()
+            report.append(row)
+        finally:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    print(f"{len(vectors)} vectors of dim {dim}, {len(queries)} queries, recall@{args.top_k} vs flat")
+    for row in report:
+        line = (
+            f"{row['mode']:6} RAM {row['ram_bytes_per_chunk']:7.1f} B/chunk  "
+            f"disk {row['disk_bytes_per_chunk']:7.1f} B/chunk  load {row['load_seconds']:.2f}s  "
+            f"recall={row['recall_no_rerank']:.3f} ({row['ms_per_query_no_rerank']:.3f} ms/query)"
+        )
+        if "recall_rerank" in row:
+            line += f"  reranked={row['recall_rerank']:.3f} ({row['ms_per_query_rerank']:.3f} ms/query)"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,8 @@ rag = RAGPipeline(
     retriever=retriever,
     provider="huggingface",   # "openai" | "gemini" | "huggingface"
     api_key=None,             # required only for openai/gemini
-    model=None                # optional override
+    model=None,               # optional override
+    embedder=embedder         # reuse the model loaded above
 )
 
 question = "What is Machine Learning?"
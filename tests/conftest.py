@@ -0,0 +1,20 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Tests import the app the way the scripts do: from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EMBEDDING_DIM = 8
+
+
+def unit_vectors(rows: int, seed: int = 0, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    return str(tmp_path / "store")
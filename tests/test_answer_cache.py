@@ -0,0 +1,56 @@
+from app.answer_cache import AnswerCache
+from app.rag_pipeline import RAGPipeline
+from tests.conftest import unit_vectors
+from tests.test_rag_pipeline import FakeEmbedder, FakeLLM, FakeRetriever
+
+QUESTION = "What is the capital of France?"
+
+
+def test_answer_is_cached_for_its_generation():
+    cache = AnswerCache(FakeRetriever())
+    generation = cache.generation
+    cache.put(QUESTION, "Paris.", "ns", unit_vectors(1)[0], generation)
+
+    assert cache.get("what is the capital of france", "ns") == "Paris."
+    assert cache.get(QUESTION, "other") is None
+
+
+def test_write_during_generation_drops_the_answer():
+    retriever = FakeRetriever()
+    cache = AnswerCache(retriever)
+    generation = cache.generation
+    assert cache.get(QUESTION, "ns") is None
+
+    # A document is added while the answer is being generated
+    retriever.generation += 1
+    cache.put(QUESTION, "stale", "ns", unit_vectors(1)[0], generation)
+
+    assert len(cache) == 0
+    assert cache.get(QUESTION, "ns", unit_vectors(1)[0]) is None
+
+
+def test_write_invalidates_cached_answers():
+    retriever = FakeRetriever()
+    cache = AnswerCache(retriever)
+    cache.put(QUESTION, "Paris.", "ns", generation=cache.generation)
+
+    retriever.generation += 1
+    assert cache.get(QUESTION, "ns") is None
+
+
+def test_pipeline_does_not_cache_across_a_write(monkeypatch):
+    retriever = FakeRetriever()
+    cache = AnswerCache(retriever)
+    rag = RAGPipeline(retriever, embedder=FakeEmbedder(), answer_cache=cache)
+
+    class WritingLLM(FakeLLM):
+        def generate(self, prompt):
+            retriever.generation += 1
+            return super().generate(prompt)
+    llm = WritingLLM()
+    monkeypatch.setattr(RAGPipeline, "llm", property(lambda self: llm))
+
+    assert rag.answer_question(QUESTION) == "Paris."
+    list(rag.answer_batch([QUESTION]))
+    assert len(cache) == 0
+    assert llm.calls == 2
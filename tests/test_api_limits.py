@@ -0,0 +1,121 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as main
+from app.limits import RequestLimiter
+
+
+class FakeAnswerCache:
+    generation = 0
+
+    def get(self, question, namespace, query_embedding=None):
+        return None
+
+    def put(self, question, answer, namespace, query_embedding, generation):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.retriever = object()
+        self.answer_cache = FakeAnswerCache()
+
+
+class FakeManager:
+    def __init__(self):
+        self.pinned = 0
+
+    def acquire(self, name, create=False):
+        self.pinned += 1
+        return FakeCollection(name)
+
+    def release(self, collection):
+        self.pinned -= 1
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.error = None
+
+    def submit(self, question, retriever=None):
+        future = Future()
+        if self.error:
+            future.set_exception(self.error)
+        else:
+            future.set_result(([{"text": "chunk", "score": 1.0}], None))
+        return future
+
+
+class FakeRAG:
+    def __init__(self):
+        self.batcher = FakeBatcher()
+
+    def generate_answer(self, question, results, llm=None):
+        return "answer"
+
+
+class FakeProviders:
+    def get(self, provider, api_key=None, model=None):
+        return object()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # TestClient is not used as a context manager, so the lifespan (and warm-up) never runs
+    monkeypatch.setattr(main, "collection_manager", FakeManager())
+    monkeypatch.setattr(main, "rag", FakeRAG())
+    monkeypatch.setattr(main, "provider_registry", FakeProviders())
+    monkeypatch.setattr(main, "ask_limiter", RequestLimiter(max_active=1, max_waiting=0))
+    monkeypatch.setattr(main, "upload_limiter", RequestLimiter(max_active=1, max_waiting=0))
+    monkeypatch.setitem(main.warmup, "ready", True)
+    return TestClient(main.app)
+
+
+def fill(limiter):
+    # The only slot is taken by a request that never finishes
+    asyncio.run(limiter.__aenter__())
+
+
+def upload(client, filename):
+    return client.post("/upload-pdf", files={"file": (filename, b"%PDF-1.4", "application/pdf")})
+
+
+def test_ask_returns_429_when_the_limiter_is_full(client):
+    fill(main.ask_limiter)
+
+    response = client.post("/ask", json={"question": "what?"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert main.collection_manager.pinned == 0
+
+
+def test_ask_releases_its_slot_on_error(client):
+    main.rag.batcher.error = RuntimeError("embedder failed")
+    assert client.post("/ask", json={"question": "what?"}).status_code == 400
+    assert main.ask_limiter.active == 0
+    assert main.collection_manager.pinned == 0
+
+    main.rag.batcher.error = None
+    response = client.post("/ask", json={"question": "what?"})
+    assert response.status_code == 200
+    assert response.json()["answer"] == "answer"
+
+
+def test_upload_returns_429_when_the_limiter_is_full(client):
+    fill(main.upload_limiter)
+
+    assert upload(client, "report.pdf").status_code == 429
+    assert main.collection_manager.pinned == 0
+
+
+def test_upload_releases_its_slot_on_error(client):
+    # Rejected before anything is written to disk
+    assert upload(client, "notes.txt").status_code == 400
+    assert main.upload_limiter.active == 0
+    assert main.collection_manager.pinned == 0
+    # A leaked slot would turn the next upload into a 429
+    assert upload(client, "notes.txt").status_code == 400
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+import api.main as main
+from app.limits import RequestLimiter
+
+
+class FakeManager:
+    def __init__(self):
+        self.released = 0
+
+    def release(self, collection):
+        self.released += 1
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = FakeManager()
+    monkeypatch.setattr(main, "collection_manager", manager)
+    return manager
+
+
+def serve(response, send):
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}, "method": "POST", "path": "/ask/stream"}
+    asyncio.run(response(scope, receive, send))
+
+
+def held_response(limiter, started):
+    async def body():
+        started.append(True)
+        yield "event: done\ndata: {}\n\n"
+
+    async def build():
+        hold = main.StreamHold(collection=object())
+        await hold.admit(limiter)
+        return main.HeldStreamingResponse(body(), hold, media_type="text/event-stream")
+
+    return asyncio.run(build())
+
+
+def test_release_after_complete_stream(manager):
+    limiter = RequestLimiter(max_active=1, max_waiting=0)
+    started, sent = [], []
+    response = held_response(limiter, started)
+
+    async def send(message):
+        sent.append(message)
+
+    serve(response, send)
+    assert started and sent[-1]["type"] == "http.response.body"
+    assert limiter.active == 0
+    assert manager.released == 1
+
+
+def test_release_when_body_never_runs(manager):
+    limiter = RequestLimiter(max_active=1, max_waiting=0)
+    started = []
+    response = held_response(limiter, started)
+
+    async def send(message):
+        # The client is gone before the headers go out
+        raise OSError("connection reset")
+
+    with pytest.raises(Exception):
+        serve(response, send)
+    assert not started
+    assert limiter.active == 0
+    assert manager.released == 1
+
+
+def test_release_is_idempotent(manager):
+    limiter = RequestLimiter(max_active=1, max_waiting=0)
+
+    async def run():
+        hold = main.StreamHold(collection=object())
+        await hold.admit(limiter)
+        await hold.release()
+        await hold.release()
+
+    asyncio.run(run())
+    assert limiter.active == 0
+    assert manager.released == 1
@@ -0,0 +1,78 @@
+import threading
+
+import torch
+
+from app.batching import QueryBatcher
+from app.retriever import FAISSRetriever
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+
+
+class FakeEmbedder:
+    """
+    Deterministic vectors; embed_texts() blocks until `release` is set.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def embed_texts(self, texts):
+        self.release.wait()
+        self.calls += 1
+        return torch.from_numpy(unit_vectors(len(texts), seed=len(texts)))
+
+
+def make_batcher(store_dir, embedder):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    retriever.add_embeddings(unit_vectors(10, 1), [f"chunk {i}" for i in range(10)], "doc")
+    return QueryBatcher(embedder, retriever, max_wait_ms=1)
+
+
+def test_cancelled_future_does_not_stop_the_batcher(store_dir):
+    embedder = FakeEmbedder()
+    batcher = make_batcher(store_dir, embedder)
+
+    # Cancelled while still queued: skipped
+    embedder.release.clear()
+    blocker = batcher.submit("first")
+    queued = batcher.submit("cancelled while queued")
+    assert queued.cancel()
+    embedder.release.set()
+    assert len(blocker.result(timeout=5)[0]) == 3
+
+    assert len(batcher.submit("next question").result(timeout=5)[0]) == 3
+
+
+def test_settled_future_does_not_stop_the_batcher(store_dir):
+    embedder = FakeEmbedder()
+    batcher = make_batcher(store_dir, embedder)
+
+    # Settled by someone else after it started running: set_result() must not raise
+    embedder.release.clear()
+    running = batcher.submit("first")
+    while not running.running():
+        pass
+    running.set_exception(TimeoutError())
+    embedder.release.set()
+
+    hits, embedding = batcher.submit("next question", top_k=2).result(timeout=5)
+    assert len(hits) == 2
+    assert embedding.shape == (EMBEDDING_DIM,)
+
+
+def test_search_errors_reach_the_caller(store_dir):
+    embedder = FakeEmbedder()
+    batcher = make_batcher(store_dir, embedder)
+
+    class BrokenRetriever:
+        def search_batch(self, *args, **kwargs):
+            raise RuntimeError("index unavailable")
+
+    future = batcher.submit("question", retriever=BrokenRetriever())
+    try:
+        future.result(timeout=5)
+        raise AssertionError("expected an error")
+    except RuntimeError as e:
+        assert "index unavailable" in str(e)
+    assert len(batcher.retrieve("still working")) == 3
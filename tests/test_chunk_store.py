@@ -0,0 +1,27 @@
+from app import chunk_store
+from app.chunk_store import ChunkStore
+
+
+def test_get_many_batches_large_id_lists(tmp_path, monkeypatch):
+    store = ChunkStore(str(tmp_path / "chunks.db"))
+    store.add(range(2500), [f"chunk {i}" for i in range(2500)], doc_id="doc")
+    store.commit()
+
+    statements = []
+    monkeypatch.setattr(chunk_store, "MAX_QUERY_IDS", 1000)
+    original = store._conn
+
+    class CountingConnection:
+        def execute(self, sql, args=()):
+            statements.append(len(args))
+            return original.execute(sql, args)
+
+    store._conn = CountingConnection()
+    ids = list(range(2499, -1, -1)) + [5000]
+    texts = store.get_many(ids)
+    store._conn = original
+
+    assert texts[:2] == ["chunk 2499", "chunk 2498"]
+    assert texts[-1] is None
+    assert max(statements) <= 1000
+    assert store.get_doc_ids([0, 5000]) == ["doc", None]
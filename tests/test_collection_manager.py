@@ -0,0 +1,88 @@
+import pytest
+
+from app.collection_manager import DEFAULT_COLLECTION, CollectionManager
+from tests.conftest import EMBEDDING_DIM
+from tests.test_retriever import add_doc
+
+
+def make_manager(store_dir, max_resident_bytes=1 << 30) -> CollectionManager:
+    return CollectionManager(
+        base_dir=store_dir,
+        embedding_dim=EMBEDDING_DIM,
+        max_resident_bytes=max_resident_bytes,
+        background_compaction=False
+    )
+
+
+def fill(manager, name, seed) -> int:
+    """
+    Create a collection with one saved document; returns its memory size.
+    """
+    collection = manager.acquire(name, create=True)
+    add_doc(collection.retriever, name, 20, seed)
+    collection.retriever.save()
+    size = collection.retriever.memory_bytes()
+    manager.release(collection)
+    return size
+
+
+def resident_names(manager) -> list[str]:
+    return [collection.name for collection in manager.resident()]
+
+
+def test_acquire_reuses_the_loaded_collection_and_counts_pins(store_dir):
+    manager = make_manager(store_dir)
+    first = manager.acquire("docs", create=True)
+    second = manager.acquire("docs")
+
+    assert first is second
+    assert first.pins == 2
+    manager.release(second)
+    assert first.pins == 1
+    manager.release(first)
+    assert first.pins == 0
+    assert resident_names(manager) == ["docs"]
+
+
+def test_least_recently_used_collection_is_evicted(store_dir):
+    manager = make_manager(store_dir)
+    size = fill(manager, "a", seed=1)
+    fill(manager, "b", seed=2)
+    # Room for two of the three collections
+    manager.max_resident_bytes = 2 * size
+    assert resident_names(manager) == ["a", "b"]
+
+    # Using "a" makes "b" the least recently used
+    manager.release(manager.acquire("a"))
+    fill(manager, "c", seed=3)
+    assert resident_names(manager) == ["a", "c"]
+
+    # An evicted collection is saved and loads again from disk
+    reloaded = manager.acquire("b")
+    assert len(reloaded.retriever) == 20
+    manager.release(reloaded)
+
+
+def test_pinned_collection_is_never_evicted(store_dir):
+    manager = make_manager(store_dir, max_resident_bytes=0)
+    pinned = manager.acquire("a", create=True)
+    add_doc(pinned.retriever, "a", 20, seed=1)
+    pinned.retriever.save()
+
+    fill(manager, "b", seed=2)
+    fill(manager, "c", seed=3)
+    assert resident_names(manager) == ["a"]
+    assert len(pinned.retriever) == 20
+
+    manager.release(pinned)
+    assert resident_names(manager) == []
+
+
+def test_unknown_and_invalid_names(store_dir):
+    manager = make_manager(store_dir)
+    with pytest.raises(KeyError):
+        manager.acquire("missing")
+    with pytest.raises(ValueError):
+        manager.acquire("../escape", create=True)
+    assert manager.exists(DEFAULT_COLLECTION)
+    assert not manager.exists("missing")
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+
+from app.embedding_cache import EmbeddingCache
+from app.embeddings import EmbeddingGenerator
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+
+
+def texts_and_vectors(prefix: str, rows: int, seed: int):
+    return [f"{prefix} chunk {i}" for i in range(rows)], unit_vectors(rows, seed=seed)
+
+
+def assert_cached(cache, texts, vectors):
+    rows = cache.lookup([cache.key(t) for t in texts])
+    assert None not in rows
+    np.testing.assert_array_equal(cache.vectors(rows), vectors)
+
+
+def test_concurrent_adds_keep_keys_and_vectors_aligned(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", EMBEDDING_DIM)
+    work = [texts_and_vectors(f"thread {t}", 50, seed=t) for t in range(8)]
+
+    def add(texts, vectors):
+        for start in range(0, len(texts), 5):
+            batch = texts[start:start + 5]
+            cache.add([cache.key(t) for t in batch], vectors[start:start + 5])
+            # Readers run alongside the writers
+            assert_cached(cache, batch, vectors[start:start + 5])
+
+    threads = [threading.Thread(target=add, args=item) for item in work]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = EmbeddingCache(str(tmp_path), "model", EMBEDDING_DIM)
+    assert len(reloaded) == 400
+    for texts, vectors in work:
+        assert_cached(reloaded, texts, vectors)
+
+
+def test_appends_of_another_instance_do_not_shift_rows(tmp_path):
+    # Two processes sharing a cache directory each have their own instance
+    first = EmbeddingCache(str(tmp_path), "model", EMBEDDING_DIM)
+    second = EmbeddingCache(str(tmp_path), "model", EMBEDDING_DIM)
+    a_texts, a_vectors = texts_and_vectors("a", 3, seed=1)
+    b_texts, b_vectors = texts_and_vectors("b", 4, seed=2)
+    c_texts, c_vectors = texts_and_vectors("c", 2, seed=3)
+
+    first.add([first.key(t) for t in a_texts], a_vectors)
+    second.add([second.key(t) for t in b_texts], b_vectors)
+    first.add([first.key(t) for t in c_texts], c_vectors)
+
+    assert_cached(first, a_texts + c_texts, np.vstack([a_vectors, c_vectors]))
+    assert_cached(second, b_texts, b_vectors)
+    reloaded = EmbeddingCache(str(tmp_path), "model", EMBEDDING_DIM)
+    assert_cached(reloaded, a_texts + b_texts + c_texts, np.vstack([a_vectors, b_vectors, c_vectors]))
+
+
+def test_uncached_embedder_shares_the_model(tmp_path):
+    embedder = object.__new__(EmbeddingGenerator)
+    embedder.model = object()
+    embedder.cache = EmbeddingCache(str(tmp_path), "model", EMBEDDING_DIM)
+    embedder.last_stats = None
+
+    queries = embedder.uncached()
+    assert queries.cache is None
+    assert queries.model is embedder.model
+    assert embedder.cache is not None
@@ -0,0 +1,63 @@
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import app.embedding_pool as embedding_pool
+from tests.conftest import EMBEDDING_DIM
+
+MAX_BATCH_SIZE = 4
+MAX_LENGTH = 8
+
+
+class FakeEmbedder:
+    embedding_dim = EMBEDDING_DIM
+
+    def __init__(self, model_name, backend):
+        pass
+
+    def _pad_token_ids(self, batch):
+        return batch
+
+    def _embed_encoded(self, batch):
+        if any(0 in ids for ids in batch):
+            raise ValueError("bad token")
+        return np.array([[sum(ids)] * EMBEDDING_DIM for ids in batch], dtype=np.float32)
+
+
+def test_worker_keeps_serving_after_a_failed_batch(monkeypatch):
+    monkeypatch.setattr(embedding_pool, "EmbeddingGenerator", FakeEmbedder)
+    # The worker runs as a thread here; leave this process's torch settings alone
+    monkeypatch.setattr(embedding_pool.torch, "set_num_threads", lambda threads: None)
+    monkeypatch.setattr(embedding_pool.torch, "set_num_interop_threads", lambda threads: None)
+    input_buffer = shared_memory.SharedMemory(create=True, size=MAX_BATCH_SIZE * MAX_LENGTH * 4)
+    output_buffer = shared_memory.SharedMemory(create=True, size=MAX_BATCH_SIZE * EMBEDDING_DIM * 4)
+    inputs = np.ndarray((MAX_BATCH_SIZE * MAX_LENGTH,), dtype=np.int32, buffer=input_buffer.buf)
+    outputs = np.ndarray((MAX_BATCH_SIZE, EMBEDDING_DIM), dtype=np.float32, buffer=output_buffer.buf)
+
+    conn, child_conn = multiprocessing.Pipe()
+    worker = threading.Thread(target=embedding_pool._worker_main, args=(
+        child_conn, "model", "torch", 1, None, input_buffer.name, output_buffer.name, MAX_BATCH_SIZE, MAX_LENGTH
+    ))
+    worker.start()
+    try:
+        assert conn.recv() == ("ready", EMBEDDING_DIM)
+
+        inputs[:3] = [0, 1, 2]
+        conn.send([3])
+        status, detail = conn.recv()
+        assert status == "error" and "bad token" in detail
+
+        inputs[:5] = [1, 2, 3, 4, 5]
+        conn.send([2, 3])
+        assert conn.recv() == ("done", 2)
+        np.testing.assert_array_equal(outputs[:2, 0], [3, 12])
+    finally:
+        conn.send(None)
+        worker.join(timeout=10)
+        inputs = outputs = None
+        for buffer in (input_buffer, output_buffer):
+            buffer.close()
+            buffer.unlink()
+    assert not worker.is_alive()
@@ -0,0 +1,127 @@
+import json
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+import app.embedding_pool as embedding_pool
+import app.embeddings as embeddings
+from app.embeddings import BACKENDS, EmbeddingGenerator
+from scripts import embedding_backends
+
+WORDS = ["the", "pump", "valve", "pressure", "check", "system", "manual", "data"]
+TEXTS = ["the pump valve", "check the system pressure", "manual data", "the the the pump"]
+
+
+@pytest.fixture
+def tiny_model(tmp_path, monkeypatch):
+    """
+    A two-layer BERT with random weights in place of the downloaded model.
+    """
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(tokenizer), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=64
+    )
+    model = BertModel(config).eval()
+
+    loaded = []
+
+    def load(kind, value):
+        def from_pretrained(name):
+            loaded.append((kind, name))
+            return value
+        return SimpleNamespace(from_pretrained=from_pretrained)
+
+    monkeypatch.setattr(embeddings, "AutoTokenizer", load("tokenizer", tokenizer))
+    monkeypatch.setattr(embeddings, "AutoModel", load("model", model))
+    # The GPU/MPS choice of the torch backend is not under test
+    monkeypatch.setattr(EmbeddingGenerator, "_EmbeddingGenerator__get_device", lambda self: torch.device("cpu"))
+    return loaded
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_unknown_backend_is_rejected_before_loading(tiny_model):
+    with pytest.raises(ValueError, match="Unsupported backend: tensorrt"):
+        EmbeddingGenerator(backend="tensorrt")
+    assert tiny_model == []
+
+
+@pytest.mark.parametrize("backend", ["onnx", "tensorrt"])
+def test_embedding_pool_rejects_unsupported_backends(backend, monkeypatch):
+    monkeypatch.setattr(embedding_pool, "AutoTokenizer", None)  # would fail if reached
+    with pytest.raises(ValueError, match="use torch or int8"):
+        embedding_pool.EmbeddingPool(backend=backend)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_each_backend_matches_float32_torch(tiny_model, tmp_path, backend):
+    reference = EmbeddingGenerator(backend="torch").embed_texts(TEXTS).numpy()
+    embedder = EmbeddingGenerator(backend=backend, onnx_dir=str(tmp_path / "onnx"))
+
+    assert embedder.device == torch.device("cpu")
+    assert (embedder.session is not None) == (backend == "onnx")
+    quantized = [m for m in embedder.model.modules() if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)]
+    assert bool(quantized) == (backend == "int8")
+
+    vectors = embedder.embed_texts(TEXTS).numpy()
+    assert vectors.shape == (len(TEXTS), 32)
+    deviation = 1 - (normalize(vectors) * normalize(reference)).sum(axis=1)
+    assert deviation.max() < 0.01
+
+
+def test_onnx_export_is_reused(tiny_model, tmp_path):
+    onnx_dir = tmp_path / "onnx"
+    EmbeddingGenerator(backend="onnx", onnx_dir=str(onnx_dir))
+    exported = list(onnx_dir.iterdir())
+    mtime = exported[0].stat().st_mtime_ns
+
+    EmbeddingGenerator(backend="onnx", onnx_dir=str(onnx_dir))
+    assert [p.name for p in onnx_dir.iterdir()] == [exported[0].name]
+    assert exported[0].stat().st_mtime_ns == mtime
+
+
+def test_onnx_backend_without_onnxruntime(tiny_model, monkeypatch):
+    monkeypatch.setattr(embeddings, "onnxruntime", None)
+    with pytest.raises(ImportError, match="onnxruntime not installed"):
+        EmbeddingGenerator(backend="onnx")
+
+
+def test_backends_keep_separate_caches(tiny_model, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    torch_embedder = EmbeddingGenerator(backend="torch", cache_dir=cache_dir)
+    torch_embedder.embed_texts(TEXTS)
+
+    int8_embedder = EmbeddingGenerator(backend="int8", cache_dir=cache_dir)
+    int8_embedder.embed_texts(TEXTS)
+    assert int8_embedder.last_stats["computed"] == len(TEXTS)
+
+    torch_embedder.embed_texts(TEXTS)
+    assert torch_embedder.last_stats["computed"] == 0
+
+
+def test_backend_report_skips_missing_runtimes(tiny_model, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(embeddings, "onnxruntime", None)
+    monkeypatch.setattr(embedding_backends, "sample_texts", lambda count: (TEXTS * count)[:count])
+    report_path = tmp_path / "report.json"
+    monkeypatch.setattr(sys, "argv", [
+        "embedding_backends.py", "--texts", "8", "--batch-size", "4", "--repeats", "1",
+        "--json", str(report_path),
+    ])
+
+    embedding_backends.main()
+
+    assert "onnx: skipped" in capsys.readouterr().out
+    report = json.loads(report_path.read_text())
+    assert [row["backend"] for row in report["backends"]] == ["torch", "int8"]
+    assert report["recommended"] in ("torch", "int8")
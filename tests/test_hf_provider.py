@@ -0,0 +1,33 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.llm_providers.hf_provider import HuggingFaceProvider
+
+
+class OneThreadTokenizer:
+    """
+    Fails like a fast tokenizer when two threads use it at once.
+    """
+
+    def __init__(self):
+        self.busy = threading.Lock()
+
+    def __call__(self, text, add_special_tokens=True):
+        if not self.busy.acquire(blocking=False):
+            raise RuntimeError("Already borrowed")
+        try:
+            time.sleep(0.001)
+            return {"input_ids": text.split()}
+        finally:
+            self.busy.release()
+
+
+def test_count_tokens_from_many_threads():
+    provider = object.__new__(HuggingFaceProvider)
+    provider._count_tokenizer = OneThreadTokenizer()
+    provider._count_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        counts = list(pool.map(provider.count_tokens, ["one two three"] * 64))
+    assert counts == [3] * 64
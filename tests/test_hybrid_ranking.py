@@ -0,0 +1,74 @@
+import numpy as np
+
+from app.rag_pipeline import RAGPipeline
+from app.retriever import FAISSRetriever
+from tests.conftest import EMBEDDING_DIM
+
+QUERY = np.eye(EMBEDDING_DIM, dtype=np.float32)[:1]
+
+
+def with_cosine(cosines: list[float]) -> np.ndarray:
+    """
+    Unit vectors with the given cosine similarity to QUERY, each in its own direction.
+    """
+    vectors = np.zeros((len(cosines), EMBEDDING_DIM), dtype=np.float32)
+    for i, c in enumerate(cosines):
+        vectors[i, 0] = c
+        vectors[i, i + 1] = np.sqrt(1 - c * c)
+    return vectors
+
+
+def build(store_dir, chunks: dict[str, float]) -> FAISSRetriever:
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    retriever.add_embeddings(with_cosine(list(chunks.values())), list(chunks), "doc")
+    return retriever
+
+
+def test_stopwords_do_not_rank_unrelated_chunks(store_dir):
+    retriever = build(store_dir, {
+        "AB-1042 warranty: two years from delivery.": 0.6,
+        "Installation guide for the mounting bracket.": 0.4,
+        "What is it? It is what it is, and that is the end of the story.": 0.2,
+    })
+    hits = retriever.search_batch(QUERY, top_k=3, query_texts=["What is the warranty of the AB-1042?"])[0]
+
+    assert hits[0]["text"].startswith("AB-1042")
+    assert hits[-1]["text"].startswith("What is it")
+    assert hits[-1]["bm25"] == 0.0
+
+
+def test_exact_token_match_beats_closer_embedding(store_dir):
+    retriever = build(store_dir, {
+        "General pump maintenance schedule.": 0.8,
+        "Pump AB-1042 replacement seal kit.": 0.5,
+        "Electrical safety notes.": 0.3,
+    })
+    hits = retriever.search_batch(QUERY, top_k=2, query_texts=["AB-1042 seal"])[0]
+
+    assert hits[0]["text"].startswith("Pump AB-1042")
+    assert hits[0]["cosine"] < hits[1]["cosine"]
+
+
+def test_relevance_gate_uses_cosine(store_dir):
+    # Keyword overlap alone must not make an unrelated index look relevant
+    retriever = build(store_dir, {
+        "The moon orbits the earth.": 0.1,
+        "Quarterly sales figures.": 0.05,
+    })
+    results = retriever.search_batch(QUERY, top_k=2, query_texts=["What is the capital of the moon?"])[0]
+    rag = RAGPipeline(retriever, embedder=object())
+
+    prompt, fallback = rag.prepare_prompt("What is the capital of the moon?", results)
+    assert prompt is None and "does not contain" in fallback
+
+
+def test_context_keeps_the_most_similar_chunk():
+    rag = RAGPipeline(retriever=None, embedder=object())
+    results = [
+        {"score": 0.030, "cosine": 0.35, "bm25": 4.0, "text": "keyword match"},
+        {"score": 0.010, "cosine": 0.80, "bm25": 0.0, "text": "close paraphrase"},
+    ]
+
+    prompt, _ = rag.prepare_prompt("question", results)
+    assert "close paraphrase" in prompt
+    assert "keyword match" not in prompt
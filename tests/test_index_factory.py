@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.index_factory import COMPRESSED_TYPES, INDEX_TYPES, all_ids, build_trained_index, index_type_of
+from app.retriever import FAISSRetriever
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+
+DIM = 16
+# Small enough that every type trains quickly: ivf wants nlist * 40 vectors,
+# ivfpq at least 256 * 40 for its 8-bit codebooks, sq8 1000
+PARAMS = {"nlist": 8, "nprobe": 4, "pq_m": 2, "hnsw_m": 16, "ef_search": 64}
+TRAIN_SIZE = 256 * 40
+
+# recall@10 against flat at PARAMS. Compressed types are judged on the
+# RERANK_FACTOR * 10 candidates the retriever re-scores with exact vectors.
+# ivfpq with 2-byte codes on random data is coarse, but far above chance
+MIN_RECALL = {"flat": 1.0, "hnsw": 0.95, "ivf": 0.85, "ivfpq": 0.4, "fp16": 0.95, "sq8": 0.9}
+RERANK_FACTOR = 4
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors = unit_vectors(TRAIN_SIZE, seed=1, dim=DIM)
+    ids = np.arange(1000, 1000 + TRAIN_SIZE, dtype=np.int64)
+    # Queries close to stored vectors, so there is a clear nearest neighbourhood
+    queries = vectors[:50] + 0.1 * unit_vectors(50, seed=2, dim=DIM)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, ids, queries
+
+
+@pytest.fixture(scope="module")
+def built(corpus):
+    """
+    Indexes are built once per type: training ivfpq takes seconds.
+    """
+    vectors, ids, _ = corpus
+    cache = {}
+
+    def get(index_type):
+        if index_type not in cache:
+            cache[index_type] = build_trained_index(DIM, vectors, ids, index_type, **PARAMS)
+        return cache[index_type]
+
+    return get
+
+
+def recall_at(index, reference, queries, k=10, candidates=10):
+    _, found = index.search(queries, candidates)
+    _, expected = reference.search(queries, k)
+    return np.mean([len(set(f) & set(e)) / k for f, e in zip(found, expected)])
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_each_index_type_builds_and_keeps_ids(corpus, built, index_type):
+    vectors, ids, _ = corpus
+    index = built(index_type)
+
+    assert index_type_of(index) == index_type
+    assert index.ntotal == len(vectors)
+    assert sorted(all_ids(index)) == list(ids)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_recall_against_flat(corpus, built, index_type):
+    queries = corpus[2]
+    candidates = 10 * RERANK_FACTOR if index_type in COMPRESSED_TYPES else 10
+    recall = recall_at(built(index_type), built("flat"), queries, candidates=candidates)
+    assert recall >= MIN_RECALL[index_type]
+
+
+@pytest.mark.parametrize("index_type", ["ivf", "ivfpq", "sq8"])
+def test_too_few_vectors_fall_back_to_flat(corpus, index_type, capsys):
+    vectors, ids, _ = corpus
+    index = build_trained_index(DIM, vectors[:100], ids[:100], index_type, **PARAMS)
+
+    assert index_type_of(index) == "flat"
+    assert index.ntotal == 100
+    assert f"{index_type} needs" in capsys.readouterr().out
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported index type"):
+        build_trained_index(DIM, np.zeros((0, DIM), dtype=np.float32), np.zeros(0, dtype=np.int64), "lsh")
+
+
+def test_manifest_records_the_segment_type_actually_built(store_dir):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir, index_type="ivf", index_params={"nlist": 8})
+    retriever.add_embeddings(unit_vectors(20, seed=1), [f"chunk {i}" for i in range(20)], "a")
+    retriever.save()
+    retriever.compact(force=True)
+
+    with open(os.path.join(store_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    # The configured type is kept for later compactions with more vectors
+    assert manifest["index_type"] == "ivf"
+    assert [entry["index_type"] for entry in manifest["segments"]] == ["flat"]
@@ -0,0 +1,94 @@
+import pytest
+
+import app.ingestion as ingestion
+from app.ingestion import StreamingIngestor
+from app.retriever import FAISSRetriever
+from tests.conftest import EMBEDDING_DIM
+from tests.test_jobs import FakeChunker, FakeEmbedder
+
+
+@pytest.fixture(autouse=True)
+def fake_pages(monkeypatch):
+    # One page per "PDF": the file's text
+    def iter_pages_parallel(pdf_paths, max_workers=None):
+        for pdf_path in pdf_paths:
+            with open(pdf_path) as f:
+                yield pdf_path, 0, f.read()
+    monkeypatch.setattr(ingestion, "iter_pages_parallel", iter_pages_parallel)
+
+
+def write_pdfs(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / f"{name}.pdf"
+        path.write_text(name)
+        paths.append(str(path))
+    return paths
+
+
+def make_ingestor(store_dir, **kwargs):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    ingestor = StreamingIngestor(FakeEmbedder(), retriever, **kwargs)
+    ingestor.chunker = FakeChunker()
+    return ingestor
+
+
+def test_fresh_run_reingests_the_same_files(tmp_path, store_dir):
+    paths = write_pdfs(tmp_path, "a", "b")
+    ingestor = make_ingestor(store_dir)
+    assert ingestor.ingest(paths)["documents"] == 2
+    assert ingestor.ingest(paths)["documents"] == 0
+    ingestor.retriever.close()
+
+    ingestor = make_ingestor(store_dir)
+    ingestor.reset()
+    assert ingestor.ingest(paths)["documents"] == 2
+    ingestor.retriever.close()
+
+    reloaded = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    assert len(reloaded) == 6
+    assert sorted(d["filename"] for d in reloaded.list_documents()) == ["a.pdf", "b.pdf"]
+
+
+class ManyChunks(FakeChunker):
+    def split_pages(self, pages):
+        for page in pages:
+            for i in range(10):
+                yield f"{page} chunk {i}", [1, 2, 3]
+
+
+class CrashingEmbedder(FakeEmbedder):
+    def __init__(self, crash_on_call: int):
+        self.calls = 0
+        self.crash_on_call = crash_on_call
+
+    def embed_texts(self, texts, batch_size=None, token_ids=None):
+        self.calls += 1
+        if self.calls == self.crash_on_call:
+            raise KeyboardInterrupt
+        return super().embed_texts(texts, batch_size, token_ids)
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(tmp_path, store_dir):
+    paths = write_pdfs(tmp_path, "a", "b")
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    # Batches of 2 chunks, a checkpoint every 4: the 6th batch is lost mid-document
+    ingestor = StreamingIngestor(CrashingEmbedder(crash_on_call=6), retriever, batch_size=2, checkpoint_every=4)
+    ingestor.chunker = ManyChunks()
+    with pytest.raises(KeyboardInterrupt):
+        ingestor.ingest(paths)
+    # The process dies: nothing after the last checkpoint reaches the disk
+    retriever.close()
+
+    ingestor = make_ingestor(store_dir, batch_size=2, checkpoint_every=4)
+    ingestor.chunker = ManyChunks()
+    assert ingestor.state["documents"], "no checkpoint was saved"
+    assert ingestor.ingest(paths)["documents"] == 2
+    ingestor.retriever.close()
+
+    reloaded = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    ids, _ = reloaded.all_vectors()
+    texts = reloaded.chunks.get_many(ids.tolist())
+    expected = [f"{name} chunk {i}" for name in ("a", "b") for i in range(10)]
+    assert sorted(texts) == sorted(expected)
+    assert {d["filename"]: d["num_chunks"] for d in reloaded.list_documents()} == {"a.pdf": 10, "b.pdf": 10}
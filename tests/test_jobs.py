@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+import torch
+
+import app.jobs as jobs
+from app.jobs import IngestJobQueue
+from app.retriever import FAISSRetriever
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+
+
+class FakeTokenizer:
+    model_max_length = 512
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+class FakeEmbedder:
+    tokenizer = FakeTokenizer()
+
+    def embed_texts(self, texts, batch_size=None, token_ids=None):
+        return torch.from_numpy(unit_vectors(len(texts), seed=len(texts)))
+
+
+class FakeChunker:
+    def split_pages(self, pages):
+        for page in pages:
+            for i in range(3):
+                yield f"{page} chunk {i}", [1, 2, 3]
+
+
+class FlakyRetriever(FAISSRetriever):
+    fail_saves = 0
+
+    def save(self):
+        if self.fail_saves:
+            self.fail_saves -= 1
+            raise OSError("disk full")
+        super().save()
+
+
+@pytest.fixture
+def job_queue(monkeypatch):
+    monkeypatch.setattr(jobs, "count_pages", lambda path: 1)
+    monkeypatch.setattr(jobs, "iter_pages", lambda path: iter([(0, path)]))
+
+    def make(retriever):
+        job_queue = IngestJobQueue(FakeEmbedder(), retriever, extract_workers=1, embed_batch_size=8)
+        job_queue.chunker = FakeChunker()
+        return job_queue
+    return make
+
+
+def run(job_queue, path, doc_id, **kwargs) -> dict:
+    finished = threading.Event()
+    job = job_queue.submit(path, doc_id, on_done=lambda job: finished.set(), **kwargs)
+    assert finished.wait(10), "job never finished"
+    return job_queue.get(job["job_id"])
+
+
+def test_failed_save_rolls_back_the_registration(store_dir, job_queue):
+    retriever = FlakyRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    retriever.fail_saves = 1
+    job_queue = job_queue(retriever)
+
+    job = run(job_queue, "a.pdf", "a")
+    assert job["status"] == "failed" and "disk full" in job["error"]
+    assert not retriever.has_document("a")
+    assert len(retriever) == 0
+
+    assert run(job_queue, "b.pdf", "b")["status"] == "done"
+    assert retriever.has_document("b")
+    assert len(retriever) == 3
+
+
+def test_worker_survives_an_unexpected_error(store_dir, job_queue, monkeypatch):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    job_queue = job_queue(retriever)
+    finish = job_queue._finish
+    calls = []
+
+    def broken_finish(finished):
+        if not calls:
+            calls.append(True)
+            raise RuntimeError("boom")
+        finish(finished)
+    monkeypatch.setattr(job_queue, "_finish", broken_finish)
+
+    job = run(job_queue, "a.pdf", "a")
+    assert job["status"] == "failed" and job["error"] == "boom"
+    assert len(retriever) == 0
+
+    assert run(job_queue, "b.pdf", "b")["status"] == "done"
+
+
+def test_replaced_document_is_deleted_after_the_save(store_dir, job_queue):
+    retriever = FlakyRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    job_queue = job_queue(retriever)
+    assert run(job_queue, "v1.pdf", "v1")["status"] == "done"
+
+    retriever.fail_saves = 1
+    assert run(job_queue, "v2.pdf", "v2", replaces="v1")["status"] == "failed"
+    assert retriever.has_document("v1") and not retriever.has_document("v2")
+
+    assert run(job_queue, "v2.pdf", "v2", replaces="v1")["status"] == "done"
+    assert not retriever.has_document("v1") and retriever.has_document("v2")
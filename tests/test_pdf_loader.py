@@ -0,0 +1,17 @@
+from bench.synthetic_pdf import write_pdf
+
+from app.pdf_loader import iter_pages, iter_pages_parallel
+
+
+def test_parallel_extraction_matches_serial_order(tmp_path):
+    paths = []
+    for doc in range(2):
+        path = str(tmp_path / f"doc{doc}.pdf")
+        write_pdf(path, [[f"document {doc} page {page}"] for page in range(5)])
+        paths.append(path)
+
+    pages = list(iter_pages_parallel(paths, max_workers=2, pages_per_task=2))
+
+    expected = [(path, num, text) for path in paths for num, text in iter_pages(path)]
+    assert pages == expected
+    assert "document 1 page 4" in pages[-1][2]
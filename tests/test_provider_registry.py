@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.llm_providers import FakeProvider, ProviderRegistry
+
+
+class CountingFactory:
+    """
+    Builds FakeProviders; `memory_bytes` per model stands in for local weights.
+    """
+
+    def __init__(self, memory_bytes=None, delay=0.0):
+        self.memory_bytes = memory_bytes or {}
+        self.delay = delay
+        self.built = []
+        self._lock = threading.Lock()
+
+    def __call__(self, provider, api_key=None, model=None):
+        time.sleep(self.delay)
+        with self._lock:
+            self.built.append((provider, model, api_key))
+        instance = FakeProvider(answer=model)
+        if model in self.memory_bytes:
+            instance.memory_bytes = self.memory_bytes[model]
+        return instance
+
+
+def test_same_provider_model_and_key_share_one_instance():
+    factory = CountingFactory()
+    registry = ProviderRegistry(factory)
+
+    first = registry.get("fake", api_key="key-1", model="m")
+    assert registry.get("FAKE", api_key="key-1", model="m") is first
+    assert registry.get("fake", api_key="key-2", model="m") is not first
+    assert registry.get("fake", api_key="key-1", model="other") is not first
+    assert len(factory.built) == 3
+
+
+def test_api_keys_are_not_kept_in_the_cache_keys():
+    registry = ProviderRegistry(CountingFactory())
+    registry.get("fake", api_key="secret-key", model="m")
+
+    assert all("secret-key" not in key for key in registry._instances)
+
+
+def test_concurrent_requests_build_once():
+    factory = CountingFactory(delay=0.05)
+    registry = ProviderRegistry(factory)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        instances = list(pool.map(lambda _: registry.get("fake", model="m"), range(8)))
+    assert len(factory.built) == 1
+    assert all(instance is instances[0] for instance in instances)
+
+
+def test_least_recently_used_is_evicted_past_max_instances():
+    factory = CountingFactory()
+    registry = ProviderRegistry(factory, max_instances=2)
+
+    a = registry.get("fake", model="a")
+    registry.get("fake", model="b")
+    assert registry.get("fake", model="a") is a  # b is now the least recently used
+    registry.get("fake", model="c")
+
+    assert len(registry) == 2
+    assert registry.get("fake", model="a") is a
+    registry.get("fake", model="b")
+    assert [model for _, model, _ in factory.built] == ["a", "b", "c", "b"]
+
+
+def test_local_models_are_evicted_past_the_memory_cap():
+    factory = CountingFactory(memory_bytes={"small": 100, "large": 300, "api": 0})
+    registry = ProviderRegistry(factory, max_local_bytes=350)
+
+    registry.get("fake", model="small")
+    registry.get("fake", model="api")
+    registry.get("fake", model="large")
+
+    # small goes to make room; the API provider takes no local memory and stays
+    assert sorted(model for _, model, _ in registry._instances) == ["api", "large"]
+
+
+def test_a_model_over_the_cap_is_still_served():
+    factory = CountingFactory(memory_bytes={"huge": 1000})
+    registry = ProviderRegistry(factory, max_local_bytes=100)
+
+    huge = registry.get("fake", model="huge")
+    assert registry.get("fake", model="huge") is huge
+    assert len(factory.built) == 1
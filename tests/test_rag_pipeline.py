@@ -0,0 +1,73 @@
+import torch
+
+from app.answer_cache import AnswerCache
+from app.rag_pipeline import RAGPipeline
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+
+
+class FakeEmbedder:
+    embedding_dim = EMBEDDING_DIM
+
+    def embed_texts(self, texts, batch_size=None):
+        return torch.from_numpy(unit_vectors(len(texts), seed=len(texts)))
+
+
+class FakeRetriever:
+    embedding_dim = EMBEDDING_DIM
+    generation = 0
+
+    def search_batch(self, query_embeddings, top_k=2, query_texts=None):
+        return [[{"score": 0.9, "text": "Paris is the capital of France."}] for _ in query_embeddings]
+
+
+class FakeLLM:
+    batched = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        return "Paris."
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+
+def make_pipeline():
+    retriever = FakeRetriever()
+    cache = AnswerCache(retriever)
+    rag = RAGPipeline(retriever, embedder=FakeEmbedder(), answer_cache=cache)
+    return rag, cache
+
+
+def test_explicit_none_disables_the_default_cache(monkeypatch):
+    rag, cache = make_pipeline()
+    llm = FakeLLM()
+    monkeypatch.setattr(RAGPipeline, "llm", property(lambda self: llm))
+
+    for _ in range(2):
+        records = list(rag.answer_batch(["What is the capital of France?"], answer_cache=None))
+        assert not records[0]["cached"]
+    assert llm.calls == 2
+    assert len(cache) == 0
+
+
+def test_other_retriever_never_uses_the_default_cache(monkeypatch):
+    rag, cache = make_pipeline()
+    llm = FakeLLM()
+    monkeypatch.setattr(RAGPipeline, "llm", property(lambda self: llm))
+
+    list(rag.answer_batch(["What is the capital of France?"], retriever=FakeRetriever()))
+    assert len(cache) == 0
+
+
+def test_default_cache_when_nothing_is_given(monkeypatch):
+    rag, cache = make_pipeline()
+    llm = FakeLLM()
+    monkeypatch.setattr(RAGPipeline, "llm", property(lambda self: llm))
+
+    first = list(rag.answer_batch(["What is the capital of France?"]))
+    second = list(rag.answer_batch(["What is the capital of France?"]))
+    assert not first[0]["cached"] and second[0]["cached"]
+    assert llm.calls == 1
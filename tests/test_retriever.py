@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.index_factory import index_type_of
+from app.retriever import FAISSRetriever
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+
+
+def add_doc(retriever, doc_id, count, seed):
+    retriever.add_embeddings(unit_vectors(count, seed), [f"{doc_id} chunk {i}" for i in range(count)], doc_id)
+    retriever.register_document(doc_id, f"{doc_id}.pdf", count)
+
+
+def test_deleting_unsaved_chunks_leaves_no_tombstones(store_dir):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    add_doc(retriever, "a", 5, seed=1)
+    add_doc(retriever, "b", 5, seed=2)
+
+    assert retriever.delete_document("a") == 5
+    assert retriever.deleted_ids == set()
+    assert len(retriever) == 5
+
+    retriever.save()
+    retriever.close()
+    reloaded = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    assert len(reloaded) == 5
+    assert {hit["text"].split()[0] for hit in reloaded.search(unit_vectors(1, 3), top_k=10)} == {"b"}
+
+
+def test_deleting_saved_chunks_tombstones_until_compaction(store_dir):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    add_doc(retriever, "a", 4, seed=1)
+    retriever.save()
+    add_doc(retriever, "b", 4, seed=2)
+    retriever.save()
+
+    retriever.delete_document("a")
+    assert len(retriever.deleted_ids) == 4
+    assert len(retriever) == 4
+    assert all(hit["text"].startswith("b") for hit in retriever.search(unit_vectors(1, 1), top_k=8))
+
+    retriever.compact(force=True)
+    assert retriever.deleted_ids == set()
+    assert len(retriever) == 4
+
+
+def test_stray_tombstones_are_dropped_on_load(store_dir):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    add_doc(retriever, "a", 5, seed=1)
+    retriever.save()
+    retriever.close()
+
+    # A manifest written by the old delete_document(): tombstones for IDs no segment holds
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["deleted_ids"] = [100, 101]
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    reloaded = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    assert reloaded.deleted_ids == set()
+    assert len(reloaded) == 5
+
+
+def test_concurrent_save_and_compaction_keep_every_segment(store_dir):
+    retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    for seed, doc_id in enumerate(["a", "b", "c"], 1):
+        add_doc(retriever, doc_id, 4, seed)
+        retriever.save()
+
+    # Hold the compaction between its snapshot of live files and the deletions
+    live_segment_files = retriever._live_segment_files
+    snapshot_taken = threading.Event()
+
+    def slow_live_segment_files():
+        live = live_segment_files()
+        if not snapshot_taken.is_set():
+            snapshot_taken.set()
+            time.sleep(0.3)
+        return live
+    retriever._live_segment_files = slow_live_segment_files
+
+    compaction = threading.Thread(target=retriever.compact, kwargs={"force": True})
+    compaction.start()
+    assert snapshot_taken.wait(10)
+    add_doc(retriever, "d", 4, seed=4)
+    retriever.save()
+    compaction.join()
+    retriever.close()
+
+    reloaded = FAISSRetriever(EMBEDDING_DIM, store_dir=store_dir)
+    assert len(reloaded) == 16
+    assert {d["doc_id"] for d in reloaded.list_documents()} == {"a", "b", "c", "d"}
+
+
+@pytest.mark.parametrize("index_type", ["fp16", "sq8"])
+def test_compressed_segments_rerank_to_the_flat_order(tmp_path, index_type):
+    # sq8 trains on 1000 vectors
+    vectors = unit_vectors(1200, seed=1)
+    queries = unit_vectors(20, seed=2)
+
+    results = {}
+    for kind in ("flat", index_type):
+        retriever = FAISSRetriever(EMBEDDING_DIM, store_dir=str(tmp_path / kind), index_type=kind)
+        retriever.add_embeddings(vectors, [f"chunk {i}" for i in range(len(vectors))], "a")
+        retriever.save()
+        retriever.compact(force=True)
+        assert [index_type_of(s.index) for s in retriever.segments] == [kind]
+        results[kind] = retriever.search_ids(queries, top_k=10)
+        retriever.close()
+
+    flat_scores, flat_ids = results["flat"]
+    scores, ids = results[index_type]
+    np.testing.assert_array_equal(ids, flat_ids)
+    np.testing.assert_allclose(scores, flat_scores, atol=1e-5)
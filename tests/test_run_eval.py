@@ -0,0 +1,24 @@
+import json
+import sys
+
+from scripts import run_eval
+
+
+def test_stdout_is_only_jsonl(tmp_path, monkeypatch, capsys):
+    questions = tmp_path / "questions.txt"
+    questions.write_text("first?\nsecond?\n")
+
+    def answer_local(questions, args):
+        for i, question in enumerate(questions):
+            # Like the pipeline's score and embedding progress prints
+            print("Result 0 | Score: 0.5000")
+            yield {"index": i, "question": question, "answer": "ok"}
+
+    monkeypatch.setattr(run_eval, "answer_local", answer_local)
+    monkeypatch.setattr(sys, "argv", ["run_eval.py", str(questions)])
+    run_eval.main()
+
+    out, err = capsys.readouterr()
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [record["question"] for record in records] == ["first?", "second?"]
+    assert "Score" in err
@@ -0,0 +1,133 @@
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+from app.answer_cache import AnswerCache
+from app.rag_pipeline import RAGPipeline
+from app.sharding import ShardedRetriever, ShardUnavailable
+from tests.conftest import EMBEDDING_DIM, unit_vectors
+from tests.test_rag_pipeline import FakeEmbedder, FakeLLM
+
+
+class FakeShards(ShardedRetriever):
+    """
+    Shards answered in-process; URLs in `down` fail, searches on URLs in `slow` hang
+    until `release` is set, and document uploads fail while `fail_uploads` is set.
+    """
+
+    def __init__(self, shard_hits: dict[str, list[dict]], down=(), slow=(), **kwargs):
+        kwargs.setdefault("timeout", 5.0)
+        super().__init__(list(shard_hits), embedding_dim=EMBEDDING_DIM, **kwargs)
+        self.shard_hits = shard_hits
+        self.down = set(down)
+        self.slow = set(slow)
+        self.release = threading.Event()
+        self.fail_uploads = False
+        self.documents = {url: {} for url in shard_hits}  # url -> doc_id -> document
+        self.requests = []
+
+    def _request(self, url, path, method="GET", body=None, timeout=None):
+        self.requests.append((method, url, path))
+        if url in self.down:
+            raise OSError("connection refused")
+        if path == "/search":
+            if url in self.slow:
+                self.release.wait(10)
+            rows = body["queries"]["shape"][0]
+            return {"results": [self.shard_hits[url][:body["top_k"]] for _ in range(rows)]}
+        if path.startswith("/documents?"):
+            filename = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)["filename"][0]
+            return {"documents": [d for d in self.documents[url].values() if d["filename"] == filename]}
+        if method == "GET":
+            return {"document": self.documents[url].get(path.rsplit("/", 1)[1])}
+        if method == "POST":
+            if self.fail_uploads:
+                raise TimeoutError("timed out")
+            self.documents[url][body["doc_id"]] = {
+                "doc_id": body["doc_id"], "filename": body["filename"], "added_at": time.time()
+            }
+            return {"doc_id": body["doc_id"], "chunks": len(body["chunks"])}
+        if method == "DELETE":
+            return {"removed": int(self.documents[url].pop(path.rsplit("/", 1)[1], None) is not None)}
+        raise AssertionError(f"unexpected request {method} {path}")
+
+
+SHARDS = {
+    "http://shard0": [{"score": 0.9, "text": "Paris is the capital of France."}],
+    "http://shard1": [{"score": 0.8, "text": "France is in Europe."}],
+}
+
+
+def test_hits_of_all_shards_are_merged_by_score():
+    retriever = FakeShards(SHARDS)
+    hits = retriever.search_batch(unit_vectors(2), top_k=2)
+
+    assert [hit["score"] for hit in hits[0]] == [0.9, 0.8]
+    assert not any(row.partial for row in hits)
+    assert retriever.last_status["partial"] is False
+
+
+def test_missing_shard_marks_hits_partial():
+    retriever = FakeShards(SHARDS, down=["http://shard1"])
+    hits = retriever.search(unit_vectors(1), top_k=2)
+
+    assert [hit["score"] for hit in hits] == [0.9]
+    assert hits.partial
+    assert retriever.last_status["failed"].keys() == {"http://shard1"}
+
+
+def test_no_shard_answering_fails():
+    with pytest.raises(ShardUnavailable):
+        FakeShards(SHARDS, down=list(SHARDS)).search(unit_vectors(1))
+
+
+def test_partial_answers_are_not_cached(monkeypatch):
+    retriever = FakeShards(SHARDS, down=["http://shard1"])
+    cache = AnswerCache(retriever)
+    rag = RAGPipeline(retriever, embedder=FakeEmbedder(), answer_cache=cache)
+    llm = FakeLLM()
+    monkeypatch.setattr(RAGPipeline, "llm", property(lambda self: llm))
+
+    records = list(rag.answer_batch(["What is the capital of France?"]))
+    assert records[0]["partial"] and records[0]["answer"] == "Paris."
+    assert rag.answer_question("What is the capital of France?") == "Paris."
+    assert len(cache) == 0
+
+    retriever.down.clear()
+    records = list(rag.answer_batch(["What is the capital of France?"]))
+    assert not records[0]["partial"]
+    assert len(cache) == 1
+
+
+def test_slow_shard_does_not_starve_the_others():
+    retriever = FakeShards(SHARDS, slow=["http://shard1"], timeout=0.05, max_in_flight=2)
+    try:
+        for _ in range(6):
+            hits = retriever.search(unit_vectors(1), top_k=2)
+            assert [hit["score"] for hit in hits] == [0.9]
+            assert hits.partial
+
+        # Only max_in_flight searches were ever sent to the slow shard
+        assert sum(1 for _, url, _ in retriever.requests if url == "http://shard1") == 2
+        assert "still running" in retriever.last_status["failed"]["http://shard1"]
+    finally:
+        retriever.release.set()
+        retriever.close()
+
+
+def test_new_version_is_stored_before_the_old_one_is_deleted():
+    retriever = FakeShards(SHARDS)
+    old_id, new_id = "0" * 64, "1" * 64
+    retriever.add_document(old_id, "manual.pdf", unit_vectors(2), ["a", "b"])
+
+    # The upload of the new version fails: the old version must survive
+    retriever.fail_uploads = True
+    with pytest.raises(TimeoutError):
+        retriever.add_document(new_id, "manual.pdf", unit_vectors(2), ["c", "d"])
+    retriever.fail_uploads = False
+    assert retriever.has_document(old_id)
+
+    retriever.add_document(new_id, "manual.pdf", unit_vectors(2), ["c", "d"])
+    assert retriever.has_document(new_id) and not retriever.has_document(old_id)
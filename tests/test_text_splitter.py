@@ -0,0 +1,105 @@
+import pytest
+from transformers import BertTokenizerFast
+
+from app.embeddings import EmbeddingGenerator
+from app.text_splitter import TokenChunker, model_max_length
+
+WORDS = [f"w{i}" for i in range(100)] + ["run", "##ning", "pump", "."]
+
+
+@pytest.fixture
+def tokenizer(tmp_path):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    # No model_max_length given: the tokenizer reports the int(1e30) placeholder
+    return BertTokenizerFast(vocab_file=str(vocab))
+
+
+def paragraph(first: int, count: int) -> tuple[str, list[int]]:
+    text = " ".join(f"w{i}" for i in range(first, first + count))
+    return text, list(range(first, first + count))
+
+
+def without_specials(tokenizer, ids: list[int]) -> list[int]:
+    assert ids[0] == tokenizer.cls_token_id and ids[-1] == tokenizer.sep_token_id
+    return ids[1:-1]
+
+
+def test_pack_fills_chunks_up_to_the_budget_with_overlap(tokenizer):
+    chunker = TokenChunker(tokenizer, chunk_tokens=10, overlap_tokens=4)
+    paragraphs = [paragraph(0, 4), paragraph(10, 4), paragraph(20, 4), paragraph(30, 3)]
+
+    chunks = list(chunker.pack(paragraphs))
+    assert [text for text, _ in chunks] == [
+        "w0 w1 w2 w3\n\nw10 w11 w12 w13",
+        "w10 w11 w12 w13\n\nw20 w21 w22 w23",
+        "w20 w21 w22 w23\n\nw30 w31 w32",
+    ]
+    for _, ids in chunks:
+        assert len(without_specials(tokenizer, ids)) <= 10
+
+
+def test_pack_drops_overlap_that_would_overflow(tokenizer):
+    chunker = TokenChunker(tokenizer, chunk_tokens=10, overlap_tokens=4)
+
+    chunks = list(chunker.pack([paragraph(0, 3), paragraph(10, 10)]))
+    assert [text for text, _ in chunks] == ["w0 w1 w2", paragraph(10, 10)[0]]
+    # A paragraph of exactly the budget is one chunk
+    assert without_specials(tokenizer, chunks[1][1]) == list(range(10, 20))
+
+
+def test_long_paragraph_is_cut_into_overlapping_windows(tokenizer):
+    chunker = TokenChunker(tokenizer, chunk_tokens=10, overlap_tokens=4)
+    text = " ".join(f"w{i}" for i in range(25))
+
+    windows = [without_specials(tokenizer, ids) for _, ids in chunker.split_text(text)]
+    words = [[tokenizer.convert_ids_to_tokens(i) for i in ids] for ids in windows]
+    assert all(len(ids) <= 10 for ids in windows)
+    for previous, current in zip(words, words[1:]):
+        assert previous[-4:] == current[:4]
+    assert words[0][0] == "w0" and words[-1][-1] == "w24"
+
+
+def test_windows_cut_between_words(tokenizer):
+    chunker = TokenChunker(tokenizer, chunk_tokens=5, overlap_tokens=2)
+    # "running" is two tokens (run ##ning); a 5-token window holds two whole words
+    for text, ids in chunker.split_text(" ".join(["running"] * 6)):
+        assert text.split() == ["running"] * (len(ids[1:-1]) // 2)
+
+
+def test_chunk_ids_are_what_the_tokenizer_gives_for_the_text(tokenizer):
+    chunker = TokenChunker(tokenizer, chunk_tokens=8, overlap_tokens=2)
+    pages = [
+        "w1 w2 w3\n\nw4 w5 pump.\n\nrunning w6",
+        " ".join(f"w{i}" for i in range(30, 50)),
+    ]
+
+    chunks = list(chunker.split_pages(pages))
+    assert len(chunks) > 2
+    for text, ids in chunks:
+        assert ids == tokenizer(text)["input_ids"]
+
+
+def test_placeholder_max_length_is_capped(tokenizer):
+    assert tokenizer.model_max_length > 1e20
+    assert model_max_length(tokenizer) == 512
+    assert model_max_length(tokenizer, limit=256) == 256
+    assert TokenChunker(tokenizer, chunk_tokens=4096).chunk_tokens == 510
+
+    tokenizer.model_max_length = 16
+    assert model_max_length(tokenizer, limit=512) == 16
+    assert TokenChunker(tokenizer, chunk_tokens=128).chunk_tokens == 14
+
+    tokenizer.model_max_length = None
+    assert model_max_length(tokenizer) == 512
+
+
+def test_pre_tokenized_inputs_are_truncated_to_the_model_limit(tokenizer):
+    embedder = object.__new__(EmbeddingGenerator)
+    embedder.tokenizer = tokenizer
+    embedder.max_length = model_max_length(tokenizer, limit=8)
+
+    encoded = embedder._pad_token_ids([list(range(20)), [1, 2, 3]])
+    assert encoded["input_ids"].shape == (2, 8)
+    assert encoded["attention_mask"].sum(dim=1).tolist() == [8, 3]
+    assert encoded["input_ids"][1, 3:].tolist() == [tokenizer.pad_token_id] * 5